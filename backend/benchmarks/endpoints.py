@@ -0,0 +1,318 @@
+"""Per-endpoint latency, DB round trips and allocations against stored baselines.
+
+Run from the backend directory (needs httpx: pip install httpx):
+
+    python -m benchmarks.endpoints --users 10000 --voters-per-option 100000
+    python -m benchmarks.endpoints --users 1000000 --update-baseline
+    python -m benchmarks.endpoints --in-memory --users 2000 --voters-per-option 2000
+
+Every route of the sample, voting, user, onboarding and subscription
+routers is driven in-process through an ASGI client, with the app's own
+lifespan, against a dataset from the synthetic data generator
+(services/datagen.py) with a fixed voter count per option. The
+--db-name database on MONGO_URL is dropped and reloaded unless --reuse is
+given. --in-memory uses the load test stand-in instead, which suits small
+datasets only and reports no round trips (the stand-in emits no driver
+command events).
+
+Per endpoint it records p50/p95 latency over --iterations requests, the
+round trips from the x-db-round-trips header, and the median tracemalloc
+peak of one request (client and app together). Results are compared with
+the baseline file for the backend (mongo or memory) and dataset size.
+Failed (4xx/5xx) responses among all requests sent, warmup included, are
+counted as errors and left out of the latency, round-trip and allocation
+figures. An endpoint regresses when its p50 or allocation peak grows by
+more than --tolerance, or when it makes more round trips or errors. The
+exit status is 1 if anything regressed.
+--update-baseline rewrites the baseline with this run.
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+
+BENCH_DOMAIN = "bench.example"
+BENCH_ADMIN_TOKEN = "bench-admin-token"
+
+# Absolute slack so sub-millisecond jitter on fast endpoints is not a regression
+LATENCY_FLOOR_MS = 0.5
+
+Request = Tuple[str, str, Optional[Any]]
+
+class BenchContext:
+    """Dataset facts the request builders need, plus per-run counters"""
+
+    def __init__(self, users: int):
+        self.users = users
+        self.option_id: Optional[str] = None
+        self.report_id: Optional[str] = None
+        self._fresh = itertools.count()
+        self._members = itertools.count(1)
+
+    def member(self, i: int) -> str:
+        """A registered user, spread across the dataset"""
+        return f"user{(i * 7919) % self.users}@{BENCH_DOMAIN}"
+
+    def unused_member(self) -> str:
+        """A registered user not yet handed out by this method, for once-per-user writes"""
+        return f"user{next(self._members) % self.users}@{BENCH_DOMAIN}"
+
+    def fresh_email(self, prefix: str) -> str:
+        return f"{prefix}-{next(self._fresh)}@{BENCH_DOMAIN}"
+
+# Each case builds its request; anything awaited in the builder is setup and is not timed
+Builder = Callable[[Any, BenchContext, int], Awaitable[Request]]
+
+async def _get(path: str) -> Request:
+    return "GET", path, None
+
+async def _post(path: str, body: Any) -> Request:
+    return "POST", path, body
+
+async def _create_order(client, context: BenchContext, i: int) -> Request:
+    response = await client.post("/api/v2/subscriptions/create-payment-order", json={
+        "email": context.member(i), "tier_id": "premium"
+    })
+    order_id = response.json()["data"]["order_id"]
+    return "POST", "/api/v2/subscriptions/verify-payment", {
+        "order_id": order_id, "payment_id": f"pay_{i}", "signature": "bench"
+    }
+
+CASES: Dict[str, Builder] = {
+    # sample_routes
+    "GET /samples/reports": lambda c, ctx, i: _get("/api/v2/samples/reports"),
+    "GET /samples/reports/{id}": lambda c, ctx, i: _get(f"/api/v2/samples/reports/{ctx.report_id}"),
+    "GET /samples/categories": lambda c, ctx, i: _get("/api/v2/samples/categories"),
+    "GET /samples/featured": lambda c, ctx, i: _get("/api/v2/samples/featured"),
+    "GET /samples/stats": lambda c, ctx, i: _get("/api/v2/samples/stats"),
+    # voting_routes
+    "GET /voting/options": lambda c, ctx, i: _get("/api/v2/voting/options"),
+    "POST /voting/cast-vote": lambda c, ctx, i: _post("/api/v2/voting/cast-vote", {
+        "email": ctx.fresh_email("voter"), "voting_option_id": ctx.option_id
+    }),
+    "GET /voting/user-votes/{email}": lambda c, ctx, i: _get(f"/api/v2/voting/user-votes/{ctx.member(i)}"),
+    "GET /voting/stats": lambda c, ctx, i: _get("/api/v2/voting/stats"),
+    "POST /voting/quick-signup": lambda c, ctx, i: _post("/api/v2/voting/quick-signup", {
+        "email": ctx.fresh_email("signup")
+    }),
+    # user_routes
+    "GET /users/dashboard/{email}": lambda c, ctx, i: _get(f"/api/v2/users/dashboard/{ctx.member(i)}"),
+    "POST /users/complete-profile/{email}": lambda c, ctx, i: _post(
+        f"/api/v2/users/complete-profile/{ctx.member(i)}", {"name": "Bench User", "location": "Pune"}
+    ),
+    "POST /users/track-report-view/{email}": lambda c, ctx, i: _post(
+        f"/api/v2/users/track-report-view/{ctx.unused_member()}", {"report_id": ctx.report_id}
+    ),
+    "GET /users/profile/{email}": lambda c, ctx, i: _get(f"/api/v2/users/profile/{ctx.member(i)}"),
+    "POST /users/profiles/batch": lambda c, ctx, i: _post("/api/v2/users/profiles/batch", {
+        "emails": [ctx.member(i + n) for n in range(100)]
+    }),
+    "GET /users/community-stats": lambda c, ctx, i: _get("/api/v2/users/community-stats"),
+    # onboarding_routes
+    "POST /onboarding/track-action": lambda c, ctx, i: _post("/api/v2/onboarding/track-action", {
+        "email": ctx.member(i), "action": "view_dashboard", "details": {"page": "dashboard"}
+    }),
+    "GET /onboarding/funnel-stats": lambda c, ctx, i: _get("/api/v2/onboarding/funnel-stats"),
+    "GET /onboarding/user-journey/{email}": lambda c, ctx, i: _get(f"/api/v2/onboarding/user-journey/{ctx.member(i)}"),
+    "POST /onboarding/complete-onboarding": lambda c, ctx, i: _post("/api/v2/onboarding/complete-onboarding", {
+        "email": ctx.member(i)
+    }),
+    # subscription_routes
+    "GET /subscriptions/tiers": lambda c, ctx, i: _get("/api/v2/subscriptions/tiers"),
+    "POST /subscriptions/start-trial": lambda c, ctx, i: _post("/api/v2/subscriptions/start-trial", {
+        "email": ctx.unused_member()
+    }),
+    "GET /subscriptions/status/{email}": lambda c, ctx, i: _get(f"/api/v2/subscriptions/status/{ctx.member(i)}"),
+    "POST /subscriptions/status/batch": lambda c, ctx, i: _post("/api/v2/subscriptions/status/batch", {
+        "emails": [ctx.member(i + n) for n in range(100)]
+    }),
+    "POST /subscriptions/create-payment-order": lambda c, ctx, i: _post(
+        "/api/v2/subscriptions/create-payment-order", {"email": ctx.member(i), "tier_id": "premium"}
+    ),
+    "POST /subscriptions/verify-payment": _create_order,
+    "GET /subscriptions/upgrade-prompts/{email}": lambda c, ctx, i: _get(
+        f"/api/v2/subscriptions/upgrade-prompts/{ctx.member(i)}"
+    ),
+}
+
+async def measure(client, context: BenchContext, build: Builder, args) -> Dict[str, Any]:
+    counter = itertools.count()
+    latencies: List[float] = []
+    round_trips: List[int] = []
+    peaks: List[float] = []
+    errors = 0
+
+    async def one(traced: bool) -> Optional[float]:
+        """Latency of one request, or None if it failed (failures are counted, not timed)"""
+        nonlocal errors
+        method, path, body = await build(client, context, next(counter))
+        if traced:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        response = await client.request(method, path, json=body)
+        elapsed = time.perf_counter() - started
+        if response.status_code >= 400:
+            errors += 1
+            return None
+        if traced:
+            peaks.append((tracemalloc.get_traced_memory()[1] - baseline) / 1024)
+        if not args.in_memory and "x-db-round-trips" in response.headers:
+            round_trips.append(int(response.headers["x-db-round-trips"]))
+        return elapsed
+
+    for _ in range(args.warmup):
+        await one(False)
+    for _ in range(args.iterations):
+        elapsed = await one(False)
+        if elapsed is not None:
+            latencies.append(elapsed)
+
+    tracemalloc.start()
+    try:
+        for _ in range(args.alloc_iterations):
+            await one(True)
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "p50_ms": round(statistics.median(latencies) * 1000, 3) if latencies else None,
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 3) if latencies else None,
+        "round_trips": max(round_trips) if round_trips else None,
+        "peak_kib": round(statistics.median(peaks), 1) if peaks else None,
+        "errors": errors
+    }
+
+def regressions(result: Dict[str, Any], baseline: Optional[Dict[str, Any]], tolerance: float) -> List[str]:
+    if not baseline:
+        return []
+    found = []
+    if result["errors"] > baseline.get("errors", 0):
+        found.append(f"errors {baseline.get('errors', 0)}->{result['errors']}")
+    if result["p50_ms"] is not None and baseline.get("p50_ms") is not None:
+        allowed_ms = max(baseline["p50_ms"] * (1 + tolerance), baseline["p50_ms"] + LATENCY_FLOOR_MS)
+        if result["p50_ms"] > allowed_ms:
+            found.append(f"p50 {baseline['p50_ms']}->{result['p50_ms']}ms")
+    if result["round_trips"] is not None and baseline.get("round_trips") is not None \
+            and result["round_trips"] > baseline["round_trips"]:
+        found.append(f"round trips {baseline['round_trips']}->{result['round_trips']}")
+    if result["peak_kib"] is not None and baseline.get("peak_kib") \
+            and result["peak_kib"] > baseline["peak_kib"] * (1 + tolerance):
+        found.append(f"alloc {baseline['peak_kib']}->{result['peak_kib']}KiB")
+    return found
+
+async def run(args) -> Dict[str, Dict[str, Any]]:
+    # Imported here: the app reads DEBUG and its database settings at import/startup
+    import server
+    from services.datagen import DataGenSpec, generate_dataset
+
+    if args.in_memory:
+        from loadtest.standin import InMemoryDatabaseProvider
+        server.DatabaseProvider = InMemoryDatabaseProvider
+
+    app = server.app
+    async with server.lifespan(app):
+        db = app.state.db
+        if not args.reuse:
+            started = time.perf_counter()
+            spec = DataGenSpec(
+                users=args.users,
+                options=args.options,
+                reports=30,
+                seed=args.seed,
+                domain=BENCH_DOMAIN,
+                voters_per_option=args.voters_per_option,
+                pending_orders=0
+            )
+            await generate_dataset(db, spec, drop=True)
+            print(f"Seeded {args.users} users, {args.options} options x {args.voters_per_option} voters "
+                  f"in {time.perf_counter() - started:.1f}s")
+        await app.state.index_reconciler.reconcile(db)
+        await app.state.community_snapshot.refresh(db)
+
+        context = BenchContext(args.users)
+        option = await db.voting_options.find_one({"status": "voting"}, {"_id": 1})
+        report = await db.sample_reports.find_one({}, {"_id": 1})
+        context.option_id = str(option["_id"]) if option else None
+        context.report_id = str(report["_id"]) if report else None
+
+        transport = httpx.ASGITransport(app=app)
+        results = {}
+        headers = {"X-Admin-Token": os.environ["ADMIN_TOKEN"]}
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+            for name, build in CASES.items():
+                if args.only and args.only not in name:
+                    continue
+                results[name] = await measure(client, context, build, args)
+        return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--voters-per-option", type=int, default=100000)
+    parser.add_argument("--options", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--db-name", default="choosepure_bench", help="Database to drop and seed on MONGO_URL")
+    parser.add_argument("--in-memory", action="store_true", help="Use the in-memory stand-in (small datasets only)")
+    parser.add_argument("--reuse", action="store_true", help="Keep the existing dataset instead of reseeding")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--alloc-iterations", type=int, default=10)
+    parser.add_argument("--only", help="Only endpoints whose name contains this text")
+    parser.add_argument("--baseline", help="Baseline file (default: baselines/endpoints-<backend>-<users>u-<voters>v.json)")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative growth before flagging")
+    args = parser.parse_args()
+
+    if httpx is None:
+        raise SystemExit("The benchmark client needs httpx: pip install httpx")
+    # Round-trip headers are only sent in debug mode; never drop the configured database
+    os.environ["DEBUG"] = "true"
+    os.environ["DB_NAME"] = args.db_name
+    # The bulk lookups require the admin token
+    os.environ.setdefault("ADMIN_TOKEN", BENCH_ADMIN_TOKEN)
+
+    results = asyncio.run(run(args))
+
+    backend = "memory" if args.in_memory else "mongo"
+    baseline_path = Path(args.baseline) if args.baseline else \
+        BASELINE_DIR / f"endpoints-{backend}-{args.users}u-{args.voters_per_option}v.json"
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else {}
+
+    regressed = 0
+    print(f"{'endpoint':<44} {'p50 ms':>8} {'p95 ms':>8} {'trips':>6} {'KiB':>8} {'errors':>6}  vs baseline")
+    for name, result in results.items():
+        found = regressions(result, baseline.get(name), args.tolerance)
+        regressed += bool(found)
+        status = "REGRESSED " + ", ".join(found) if found else ("ok" if name in baseline else "no baseline")
+        trips = "-" if result["round_trips"] is None else result["round_trips"]
+        p50, p95 = (f"{result[key]:.2f}" if result[key] is not None else "-" for key in ("p50_ms", "p95_ms"))
+        print(f"{name:<44} {p50:>8} {p95:>8} {trips:>6} "
+              f"{result['peak_kib'] or 0:>8.1f} {result['errors']:>6}  {status}")
+
+    if args.update_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline.update(results)
+        baseline_path.write_text(json.dumps(baseline, indent=2, sort_keys=True))
+        print(f"Baseline written to {baseline_path}")
+    elif regressed:
+        print(f"{regressed} endpoint(s) regressed")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""Per-endpoint response serialisation cost: ApiResponse path vs fast JSON path.
+
+Run from the backend directory:
+
+    python -m benchmarks.serialization [--number 2000]
+
+The "model" column is what a handler returning ApiResponse costs once the
+handler is done: model validation, jsonable_encoder and JSONResponse
+rendering. The "fast" column is FastJSONResponse rendering the same
+envelope directly.
+"""
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from typing import Any, Callable, Dict
+import argparse
+import timeit
+from datetime import datetime, timedelta
+
+from models import ApiResponse
+from services.responses import FastJSONResponse
+from services.dashboard import build_dashboard
+from services.profiles import build_profile
+from services.subscriptions import build_subscription_status
+
+NOW = datetime(2024, 6, 1, 12, 30, 15, 123456)
+
+def _user() -> Dict[str, Any]:
+    return {
+        "_id": ObjectId(),
+        "email": "member@example.com",
+        "name": "Member",
+        "mobile": "9999999999",
+        "location": "Mumbai",
+        "role": "member",
+        "created_at": NOW - timedelta(days=120),
+        "last_active": NOW,
+        "is_premium": True,
+        "subscription_expires": NOW + timedelta(days=20),
+        "trial_used": True,
+        "onboarding_step": 4,
+        "report_views_used": 2,
+        "report_views_limit": 3,
+        "votes_cast": 4,
+        "votes_limit": 5,
+        "engagement": {"action_count": 42}
+    }
+
+def _report(i: int) -> Dict[str, Any]:
+    return {
+        "_id": str(ObjectId()),
+        "product_name": f"Product {i}",
+        "brand": f"Brand {i % 7}",
+        "category": ["Dairy", "Snacks", "Bakery"][i % 3],
+        "purity_score": 7.5 + (i % 20) / 10,
+        "test_date": "2024-01-15",
+        "tested_by": "FSSAI Certified Lab - Mumbai",
+        "image": f"/images/product-{i}.jpg",
+        "key_findings": [
+            "No harmful additives detected",
+            "Fat content matches label claims",
+            "Safe bacterial levels"
+        ],
+        "safety_status": "Safe",
+        "is_featured": i % 4 == 0,
+        "created_at": NOW - timedelta(days=i)
+    }
+
+def _vote(i: int) -> Dict[str, Any]:
+    return {
+        "product_name": f"Product {i}",
+        "status": ["voting", "funded", "testing", "completed"][i % 4],
+        "votes": 100 + i,
+        "funding_raised": 5000 + 100 * i,
+        "funding_target": 15000
+    }
+
+def _community() -> Dict[str, Any]:
+    return {
+        "recent_reports": [_report(i) for i in range(3)],
+        "top_votes": [_vote(i) for i in range(3)],
+        "total_members": 125000
+    }
+
+# endpoint -> payload builder (the `data` of the response envelope)
+PAYLOADS: Dict[str, Callable[[], Any]] = {
+    "GET /users/dashboard/{email}": lambda: build_dashboard(_user(), [_vote(i) for i in range(20)], _community()),
+    "GET /users/profile/{email}": lambda: build_profile(_user()),
+    "GET /subscriptions/status/{email}": lambda: build_subscription_status(_user()),
+    "GET /samples/reports?limit=50": lambda: {
+        "reports": [_report(i) for i in range(50)],
+        "total": 50,
+        "category": None,
+        "featured_only": False
+    },
+    "GET /onboarding/journey/{email}": lambda: {
+        "email": "member@example.com",
+        "journey": {
+            "viewed_samples": True,
+            "cast_first_vote": True,
+            "page_views": {f"/page/{i}": i for i in range(30)},
+            "action_counts": {f"action_{i}": i for i in range(15)},
+            "created_at": NOW - timedelta(days=30),
+            "updated_at": NOW
+        },
+        "total_actions": 120
+    }
+}
+
+def model_path(data: Any) -> bytes:
+    response = ApiResponse(success=True, message="Retrieved", data=data)
+    return JSONResponse(content=jsonable_encoder(response)).body
+
+def fast_path(data: Any) -> bytes:
+    return FastJSONResponse({"success": True, "message": "Retrieved", "data": data}).body
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000, help="Encodings per measurement")
+    args = parser.parse_args()
+
+    print(f"{'endpoint':<36} {'bytes':>7} {'model us':>10} {'fast us':>10} {'speedup':>8}")
+    for endpoint, build in PAYLOADS.items():
+        data = build()
+        size = len(fast_path(data))
+        model = min(timeit.repeat(lambda: model_path(data), number=args.number, repeat=3)) / args.number
+        fast = min(timeit.repeat(lambda: fast_path(data), number=args.number, repeat=3)) / args.number
+        print(f"{endpoint:<36} {size:>7} {model * 1e6:>10.1f} {fast * 1e6:>10.1f} {model / fast:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1 @@
+# Load test package
\ No newline at end of file
@@ -0,0 +1,169 @@
+"""End-to-end load test: concurrent scenario workers against a running app.
+
+Run from the backend directory (needs httpx: pip install httpx):
+
+    python -m loadtest.run --in-memory --duration 30
+    python -m loadtest.run --duration 60 --scenarios homepage=50,vote_burst=100
+    python -m loadtest.run --target http://localhost:8001
+
+Unless --target is given, the app is started in a subprocess through
+loadtest.serve, either on the in-memory stand-in or on MONGO_URL with the
+--db-name database (seeded first; it is not cleaned up afterwards). Each
+scenario gets its own pool of workers that loop until the duration ends.
+The report lists per-scenario throughput, latency percentiles, error rate
+and status codes; --json writes the same figures to a file.
+"""
+from typing import Dict, List, Tuple
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+
+from loadtest.scenarios import SCENARIOS, LoadContext, ScenarioStats, Session, setup
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+DEFAULT_MIX = "homepage=20,quick_signup=5,vote_burst=20,dashboard=10,tracking=10"
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = {}
+    for item in value.split(","):
+        name, _, workers = item.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise SystemExit(f"Unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        mix[name] = int(workers or 1)
+    return mix
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+def summarise(stats: ScenarioStats, elapsed: float) -> Dict:
+    latencies = sorted(stats.latencies)
+    requests = len(latencies)
+    return {
+        "scenario": stats.name,
+        "requests": requests,
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "error_rate": round(stats.errors / requests, 4) if requests else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1000, 2),
+            "p90": round(percentile(latencies, 0.90) * 1000, 2),
+            "p99": round(percentile(latencies, 0.99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2) if latencies else 0.0
+        },
+        "statuses": stats.statuses
+    }
+
+def print_report(results: List[Dict], elapsed: float):
+    print(f"\n{elapsed:.1f}s run")
+    print(f"{'scenario':<14} {'requests':>9} {'rps':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7}  statuses")
+    for result in results:
+        latency = result["latency_ms"]
+        statuses = " ".join(f"{status}:{count}" for status, count in sorted(result["statuses"].items()))
+        print(
+            f"{result['scenario']:<14} {result['requests']:>9} {result['throughput_rps']:>8.1f} "
+            f"{latency['p50']:>8.2f} {latency['p90']:>8.2f} {latency['p99']:>8.2f} {latency['max']:>8.2f} "
+            f"{result['error_rate']:>7.2%}  {statuses}"
+        )
+
+async def worker(scenario, session: Session, context: LoadContext, deadline: float):
+    while time.perf_counter() < deadline:
+        await scenario(session, context)
+
+async def run(base_url: str, args, mix: Dict[str, int]) -> List[Dict]:
+    limits = httpx.Limits(max_connections=sum(mix.values()) * 5, max_keepalive_connections=sum(mix.values()) * 5)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        context = LoadContext(run_id=uuid.uuid4().hex[:8], seed=args.seed)
+        await setup(client, context, args.members)
+
+        stats = {name: ScenarioStats(name) for name in mix}
+        deadline = time.perf_counter() + args.duration
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            worker(SCENARIOS[name], Session(client, stats[name]), context, deadline)
+            for name, workers in mix.items()
+            for _ in range(workers)
+        ))
+        elapsed = time.perf_counter() - started
+
+    results = [summarise(stats[name], elapsed) for name in mix]
+    print_report(results, elapsed)
+    return results
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_app(args) -> Tuple[subprocess.Popen, str]:
+    """Start loadtest.serve in a subprocess and wait for it to answer"""
+    port = _free_port()
+    env = dict(os.environ, DB_NAME=args.db_name)
+    command = [sys.executable, "-m", "loadtest.serve", "--port", str(port), "--seed"]
+    if args.in_memory:
+        command.append("--in-memory")
+    process = subprocess.Popen(command, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"App exited during startup (code {process.returncode})")
+        try:
+            if httpx.get(f"{base_url}/api/v2/health/live", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("App did not become live within 30s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", help="Base URL of an already running app, e.g. http://localhost:8001")
+    parser.add_argument("--in-memory", action="store_true", help="Start the app on the in-memory stand-in")
+    parser.add_argument("--db-name", default="choosepure_loadtest", help="Database for a started app on MONGO_URL")
+    parser.add_argument("--scenarios", default=DEFAULT_MIX, help="name=workers,... (default: %(default)s)")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of load per run")
+    parser.add_argument("--members", type=int, default=200, help="Registered users for dashboard and tracking")
+    parser.add_argument("--timeout", type=float, default=10, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=1, help="Seed for member selection and action choice")
+    parser.add_argument("--json", help="Also write results to this file")
+    args = parser.parse_args()
+
+    if httpx is None:
+        raise SystemExit("The load test client needs httpx: pip install httpx")
+    mix = parse_mix(args.scenarios)
+
+    process = None
+    if args.target:
+        base_url = args.target.rstrip("/")
+    else:
+        process, base_url = start_app(args)
+    try:
+        results = asyncio.run(run(base_url, args, mix))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"target": base_url, "duration": args.duration, "results": results}, f, indent=2)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,134 @@
+"""Load test scenarios: one call of a scenario is one user iteration.
+
+Every scenario takes a Session (which times each request) and the shared
+LoadContext prepared by `setup`.
+"""
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import itertools
+import random
+import time
+
+API = "/api/v2"
+
+class ScenarioStats:
+    """Request latencies and outcomes for one scenario"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.statuses: Dict[str, int] = {}
+        self.errors = 0
+
+    def record(self, seconds: float, status: str, ok: bool):
+        self.latencies.append(seconds)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if not ok:
+            self.errors += 1
+
+class Session:
+    """Wraps the HTTP client so every request is timed against a scenario"""
+
+    def __init__(self, client, stats: ScenarioStats):
+        self.client = client
+        self.stats = stats
+
+    async def request(self, method: str, path: str, **kwargs) -> Optional[Any]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, API + path, **kwargs)
+        except Exception as e:
+            self.stats.record(time.perf_counter() - started, type(e).__name__, False)
+            return None
+        self.stats.record(time.perf_counter() - started, str(response.status_code), response.status_code < 400)
+        return response
+
+class LoadContext:
+    """State shared by all workers: seeded options, registered members and a seeded RNG"""
+
+    def __init__(self, run_id: str, seed: int):
+        self.run_id = run_id
+        self.rng = random.Random(seed)
+        self.option_ids: List[str] = []
+        self.hot_option_id: Optional[str] = None
+        self.report_ids: List[str] = []
+        self.members: List[str] = []
+        self._counter = itertools.count()
+
+    def new_email(self, prefix: str) -> str:
+        return f"{prefix}-{self.run_id}-{next(self._counter)}@loadtest.example"
+
+    def member(self) -> str:
+        return self.rng.choice(self.members)
+
+async def setup(client, context: LoadContext, members: int):
+    """Discover seeded options and reports, and register the member pool"""
+    stats = ScenarioStats("setup")
+    session = Session(client, stats)
+
+    response = await session.request("GET", "/voting/options")
+    if response is None or response.status_code != 200:
+        raise SystemExit("Could not list voting options; is the app up and seeded?")
+    context.option_ids = [option["id"] for option in response.json()["data"]["voting_options"]]
+    if not context.option_ids:
+        raise SystemExit("No voting options found; seed the database first (--seed)")
+    context.hot_option_id = context.option_ids[0]
+
+    response = await session.request("GET", "/samples/reports")
+    if response is not None and response.status_code == 200:
+        context.report_ids = [report["_id"] for report in response.json()["data"]["reports"]]
+
+    emails = [context.new_email("member") for _ in range(members)]
+    for start in range(0, len(emails), 50):
+        await asyncio.gather(*(
+            session.request("POST", "/voting/quick-signup", json={"email": email})
+            for email in emails[start:start + 50]
+        ))
+    context.members = emails
+    if stats.errors:
+        print(f"warning: {stats.errors} of {len(emails)} member signups failed during setup")
+
+async def homepage(session: Session, context: LoadContext):
+    """A landing page load: the page's API calls issued together, as a browser would"""
+    await asyncio.gather(
+        session.request("GET", "/samples/featured"),
+        session.request("GET", "/samples/categories"),
+        session.request("GET", "/voting/options"),
+        session.request("GET", "/users/community-stats"),
+        session.request("GET", "/subscriptions/tiers")
+    )
+
+async def quick_signup(session: Session, context: LoadContext):
+    await session.request("POST", "/voting/quick-signup", json={"email": context.new_email("signup")})
+
+async def vote_burst(session: Session, context: LoadContext):
+    """New voters all piling onto the same option"""
+    await session.request("POST", "/voting/cast-vote", json={
+        "email": context.new_email("voter"),
+        "voting_option_id": context.hot_option_id
+    })
+
+async def dashboard(session: Session, context: LoadContext):
+    email = context.member()
+    await asyncio.gather(
+        session.request("GET", f"/users/dashboard/{email}"),
+        session.request("GET", f"/subscriptions/status/{email}")
+    )
+
+async def tracking(session: Session, context: LoadContext):
+    email = context.member()
+    action = context.rng.choice(["view_sample_reports", "view_how_it_works", "view_dashboard"])
+    details = {"report_id": context.rng.choice(context.report_ids)} if context.report_ids else {}
+    await session.request("POST", "/onboarding/track-action", json={
+        "email": email,
+        "action": action,
+        "details": details
+    })
+
+SCENARIOS: Dict[str, Callable] = {
+    "homepage": homepage,
+    "quick_signup": quick_signup,
+    "vote_burst": vote_burst,
+    "dashboard": dashboard,
+    "tracking": tracking
+}
\ No newline at end of file
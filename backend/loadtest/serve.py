@@ -0,0 +1,51 @@
+"""Serve the app for a load test run.
+
+Run from the backend directory:
+
+    python -m loadtest.serve --port 8010 [--in-memory] [--seed]
+
+Without --in-memory the app uses MONGO_URL / DB_NAME as usual, so point
+them at a local mongod and a throwaway database. `python -m loadtest.run`
+starts this for you unless it is given --target.
+"""
+import argparse
+import asyncio
+
+from motor.motor_asyncio import AsyncIOMotorClient
+import uvicorn
+
+import server
+from services.database import DatabaseSettings
+from services.seed import seed_sample_data
+from loadtest.standin import InMemoryDatabaseProvider
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8010)
+    parser.add_argument("--in-memory", action="store_true", help="Use the mongomock stand-in instead of MONGO_URL")
+    parser.add_argument("--seed", action="store_true", help="Seed sample reports and voting options first")
+    args = parser.parse_args()
+
+    settings = DatabaseSettings()
+    if args.in_memory:
+        # The lifespan looks the provider class up at startup
+        server.DatabaseProvider = InMemoryDatabaseProvider
+
+    if args.seed:
+        if args.in_memory:
+            asyncio.run(seed_sample_data(InMemoryDatabaseProvider(settings).open()))
+        else:
+            async def seed():
+                client = AsyncIOMotorClient(settings.mongo_url)
+                try:
+                    await seed_sample_data(client[settings.db_name])
+                finally:
+                    client.close()
+            asyncio.run(seed())
+
+    # Access logging would dominate the log pipeline under load
+    uvicorn.run(server.app, host=args.host, port=args.port, log_config=None, access_log=False)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,92 @@
+"""In-memory MongoDB stand-in for load tests, backed by mongomock-motor.
+
+mongomock runs every command synchronously on the event loop, does not
+implement collations on writes and lacks some query features, so treat
+its numbers as a measure of the app stack rather than of the database.
+Collation arguments are dropped (emails are normalised before they are
+stored, so lookups still match), and find_one applies `$elemMatch`
+projections on arrays of scalars (as cast-vote uses) itself. Endpoints
+that need other unsupported operators show up as errors in the report.
+Driver command events are not emitted, so round-trip budgets and Mongo
+metrics stay empty.
+"""
+from typing import Any
+
+from services.database import DatabaseProvider
+
+try:
+    from mongomock_motor import AsyncMongoMockClient
+except ImportError:
+    AsyncMongoMockClient = None
+
+_client = None
+
+def in_memory_client():
+    """One mock client per process, so seeding and the app see the same data"""
+    global _client
+    if AsyncMongoMockClient is None:
+        raise SystemExit("The in-memory stand-in needs mongomock-motor: pip install mongomock-motor")
+    if _client is None:
+        _client = AsyncMongoMockClient()
+    return _client
+
+def _split_scalar_elem_match(projection):
+    """Pull `{field: {"$elemMatch": {"$eq": value}}}` entries out of a projection"""
+    if not isinstance(projection, dict):
+        return projection, {}
+    matches = {
+        field: spec["$elemMatch"]["$eq"]
+        for field, spec in projection.items()
+        if isinstance(spec, dict) and list(spec.get("$elemMatch") or {}) == ["$eq"]
+    }
+    if not matches:
+        return projection, {}
+    return {**projection, **{field: 1 for field in matches}}, matches
+
+class _CollationFreeCollection:
+    def __init__(self, collection):
+        self._collection = collection
+
+    async def find_one(self, filter=None, projection=None, *args, **kwargs):
+        kwargs.pop("collation", None)
+        projection, matches = _split_scalar_elem_match(projection)
+        document = await self._collection.find_one(filter, projection, *args, **kwargs)
+        if document is not None:
+            # Like the server: first matching element only, field omitted when none match
+            for field, value in matches.items():
+                found = [item for item in document.pop(field, None) or [] if item == value][:1]
+                if found:
+                    document[field] = found
+        return document
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._collection, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            kwargs.pop("collation", None)
+            return attr(*args, **kwargs)
+        return call
+
+class InMemoryDatabase:
+    """Database handle whose collections ignore collation arguments"""
+
+    def __init__(self, db):
+        self._db = db
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._db, name)
+        return _CollationFreeCollection(attr) if hasattr(attr, "find_one_and_update") else attr
+
+    def __getitem__(self, name: str) -> _CollationFreeCollection:
+        return _CollationFreeCollection(self._db[name])
+
+class InMemoryDatabaseProvider(DatabaseProvider):
+    """DatabaseProvider that hands out the in-memory stand-in instead of a Motor client"""
+
+    def open(self) -> InMemoryDatabase:
+        return InMemoryDatabase(in_memory_client()[self.settings.db_name])
+
+    def close(self):
+        pass
\ No newline at end of file
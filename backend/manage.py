@@ -0,0 +1,160 @@
+# Operational commands for the ChoosePure Simplified backend
+#
+# Usage: python manage.py <command> [options]
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# Load environment variables before importing modules that read their settings
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+from services.database import DatabaseSettings, DatabaseProvider
+from services.engagement import backfill_action_counters
+from services.retention import RetentionSettings, compact_engagement
+from services.identity import dedupe_emails
+from services.indexes import create_index_reconciler
+from services.seed import seed_sample_data
+from services.datagen import DataGenSpec, generate_dataset
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("manage")
+
+async def backfill_engagement_counters(db, args):
+    """Recompute action counters on engagement records not yet marked complete"""
+    await backfill_action_counters(db)
+
+async def compact_engagement_history(db, args):
+    """Archive and roll up engagement events older than the retention horizon"""
+    settings = RetentionSettings()
+    if args.days is not None:
+        settings.horizon_days = args.days
+    await compact_engagement(db, settings)
+
+async def dedupe_user_emails(db, args):
+    """Canonicalise stored emails, merging records that differ only by case"""
+    await dedupe_emails(db)
+
+async def ensure_indexes(db, args):
+    """Build missing declared indexes and wait for them to finish"""
+    index_reconciler = create_index_reconciler()
+    missing = await index_reconciler.missing(db)
+    for collection, indexes in missing.items():
+        logger.info(f"Missing on {collection}: {', '.join(index.document['name'] for index in indexes)}")
+    if args.dry_run:
+        return
+    await index_reconciler.reconcile(db)
+    if index_reconciler.errors:
+        raise SystemExit(1)
+
+async def seed(db, args):
+    """Insert the demonstration sample reports and voting options into empty collections"""
+    await seed_sample_data(db)
+
+async def generate_data(db, args):
+    """Bulk-load a reproducible synthetic dataset, then build the declared indexes"""
+    spec = DataGenSpec(
+        users=args.users,
+        options=args.options,
+        reports=args.reports,
+        seed=args.seed,
+        anchor=datetime.strptime(args.anchor, "%Y-%m-%d") if args.anchor else None,
+        domain=args.domain,
+        votes_mean=args.votes_mean,
+        zipf_exponent=args.zipf_exponent,
+        history_mean=args.history_mean,
+        history_max=args.history_max,
+        premium_active=args.premium_active,
+        premium_expired=args.premium_expired,
+        premium_lapsed=args.premium_lapsed,
+        pending_orders=args.pending_orders,
+        batch_size=args.batch_size
+    )
+    try:
+        await generate_dataset(db, spec, drop=args.drop)
+    except ValueError as e:
+        logger.error(str(e))
+        raise SystemExit(1)
+    await create_index_reconciler().reconcile(db)
+
+COMMANDS = {
+    "backfill-engagement-counters": backfill_engagement_counters,
+    "compact-engagement": compact_engagement_history,
+    "dedupe-emails": dedupe_user_emails,
+    "ensure-indexes": ensure_indexes,
+    "seed": seed,
+    "generate-data": generate_data,
+}
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="ChoosePure Simplified management commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser(
+        "backfill-engagement-counters",
+        help="Recompute action_count/action_counts from the action history of legacy engagement records"
+    )
+
+    compact = subparsers.add_parser(
+        "compact-engagement",
+        help="Archive, roll up and remove engagement events older than the retention horizon"
+    )
+    compact.add_argument("--days", type=int, help="Override ENGAGEMENT_RETENTION_DAYS")
+
+    subparsers.add_parser(
+        "dedupe-emails",
+        help="Lowercase stored emails, merge case-duplicates and create case-insensitive email indexes"
+    )
+
+    indexes = subparsers.add_parser(
+        "ensure-indexes",
+        help="Build declared indexes that are missing (the API also does this in the background on startup)"
+    )
+    indexes.add_argument("--dry-run", action="store_true", help="Only list the missing indexes")
+
+    subparsers.add_parser("seed", help="Seed sample reports and voting options if their collections are empty")
+
+    generate = subparsers.add_parser(
+        "generate-data",
+        help="Bulk-load synthetic users, Zipf-distributed votes, engagement histories and subscriptions"
+    )
+    generate.add_argument("--users", type=int, default=1_000_000)
+    generate.add_argument("--options", type=int, default=50, help="Voting options")
+    generate.add_argument("--reports", type=int, default=200, help="Sample reports")
+    generate.add_argument("--seed", type=int, default=1, help="Same seed and sizes give the same data")
+    generate.add_argument(
+        "--anchor",
+        help="YYYY-MM-DD that timestamps are relative to (default: 2026-01-01; pass today's date "
+             "for running subscriptions and unexpired pending orders)"
+    )
+    generate.add_argument("--domain", default="synthetic.example", help="Email domain of generated users")
+    generate.add_argument("--votes-mean", type=float, default=2.0, help="Average votes per user")
+    generate.add_argument("--zipf-exponent", type=float, default=1.1, help="Skew of votes across options")
+    generate.add_argument("--history-mean", type=float, default=40, help="Average engagement actions per user")
+    generate.add_argument("--history-max", type=int, default=2000, help="Longest engagement history")
+    generate.add_argument("--premium-active", type=float, default=0.08, help="Share of users with a running subscription")
+    generate.add_argument("--premium-expired", type=float, default=0.03, help="Share still premium past expiry")
+    generate.add_argument("--premium-lapsed", type=float, default=0.05, help="Share downgraded after a subscription")
+    generate.add_argument("--pending-orders", type=int, default=1000, help="Unpaid orders from the last hour")
+    generate.add_argument("--batch-size", type=int, default=5000, help="Documents per insert_many")
+    generate.add_argument("--drop", action="store_true", help="Drop the generated collections first")
+
+    return parser
+
+async def run(args):
+    provider = DatabaseProvider(DatabaseSettings())
+    db = provider.open()
+    try:
+        await COMMANDS[args.command](db, args)
+    finally:
+        provider.close()
+
+if __name__ == "__main__":
+    asyncio.run(run(build_parser().parse_args()))
\ No newline at end of file
@@ -0,0 +1,171 @@
+from collections import OrderedDict
+from starlette.datastructures import Headers, MutableHeaders
+from typing import Optional
+import gzip
+import os
+import zlib
+
+class CompressionSettings:
+    """Response compression configuration, read from the environment"""
+
+    def __init__(self):
+        self.minimum_size = int(os.environ.get("COMPRESSION_MIN_BYTES", 1024))
+        self.level = int(os.environ.get("COMPRESSION_LEVEL", 6))
+        self.content_types = [
+            content_type.strip()
+            for content_type in os.environ.get(
+                "COMPRESSION_CONTENT_TYPES", "application/json,application/x-ndjson,text/"
+            ).split(",")
+            if content_type.strip()
+        ]
+        self.cache_entries = int(os.environ.get("COMPRESSION_CACHE_ENTRIES", 64))
+
+# Appended to the ETag of a gzipped response: it is a different representation,
+# so it must not share the identity response's strong validator
+GZIP_ETAG_SUFFIX = "-gzip"
+
+def gzip_etag(etag: str) -> str:
+    """ETag of the gzipped representation of a response tagged `etag`"""
+    return etag[:-1] + GZIP_ETAG_SUFFIX + '"' if etag.endswith('"') else etag + GZIP_ETAG_SUFFIX
+
+class CompressedBodyCache:
+    """Gzipped bodies of ETag-tagged responses, keyed by the gzip ETag"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def get(self, etag: str) -> Optional[bytes]:
+        body = self._entries.get(etag)
+        if body is not None:
+            self._entries.move_to_end(etag)
+        return body
+
+    def put(self, etag: str, body: bytes):
+        if self.max_entries <= 0:
+            return
+        self._entries[etag] = body
+        self._entries.move_to_end(etag)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+class CompressionMiddleware:
+    """Gzip responses for clients that accept it.
+
+    Only allowlisted content types at or above the size threshold are
+    compressed. Streaming responses are compressed chunk by chunk. Bodies
+    that carry an ETag are compressed once and served from a cache after.
+    Compressed responses get their own ETag (GZIP_ETAG_SUFFIX); the suffix
+    is stripped from If-None-Match on the way in so the app's conditional
+    checks still match, and restored on the 304 that comes back.
+    """
+
+    def __init__(self, app, settings: Optional[CompressionSettings] = None):
+        self.app = app
+        self.settings = settings or CompressionSettings()
+        self.cache = CompressedBodyCache(self.settings.cache_entries)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or "gzip" not in Headers(scope=scope).get("accept-encoding", ""):
+            await self.app(scope, receive, send)
+            return
+
+        responder = _GzipResponder(self, send)
+        scope, responder.restore_etag = _strip_gzip_etags(scope)
+        await self.app(scope, receive, responder.send)
+
+    def compressible(self, headers: Headers) -> bool:
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return any(content_type.startswith(allowed) for allowed in self.settings.content_types)
+
+def _strip_gzip_etags(scope):
+    """Map gzip ETags in If-None-Match back to the app's own; returns (scope, whether any were)"""
+    headers = Headers(scope=scope)
+    condition = headers.get("if-none-match", "")
+    suffixed = GZIP_ETAG_SUFFIX + '"'
+    if suffixed not in condition:
+        return scope, False
+    mutable = MutableHeaders(scope=dict(scope, headers=list(scope["headers"])))
+    mutable["if-none-match"] = condition.replace(suffixed, '"')
+    return dict(scope, headers=mutable.raw), True
+
+class _GzipResponder:
+    """Per-response state: holds the start message until the first body chunk decides"""
+
+    def __init__(self, middleware: CompressionMiddleware, send):
+        self.middleware = middleware
+        self.downstream = send
+        self.start_message = None
+        self.passthrough = False
+        self.compressor = None
+        # The request's If-None-Match named a gzip ETag
+        self.restore_etag = False
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            if message["status"] == 304 and self.restore_etag:
+                headers = MutableHeaders(scope=message)
+                if "etag" in headers:
+                    headers["etag"] = gzip_etag(headers["etag"])
+            self.start_message = message
+            self.passthrough = not self.middleware.compressible(Headers(raw=message["headers"]))
+            if self.passthrough:
+                await self.downstream(message)
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is not None:
+            # Continuing a compressed stream
+            chunk = self.compressor.compress(body)
+            chunk += self.compressor.flush(zlib.Z_SYNC_FLUSH if more_body else zlib.Z_FINISH)
+            await self.downstream({"type": "http.response.body", "body": chunk, "more_body": more_body})
+            return
+
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        if not more_body:
+            await self._send_whole(headers, body)
+            return
+
+        # Streaming response: compress incrementally, length is unknown up front
+        self.compressor = zlib.compressobj(self.middleware.settings.level, zlib.DEFLATED, 31)
+        self._mark_compressed(headers)
+        if "etag" in headers:
+            headers["etag"] = gzip_etag(headers["etag"])
+        del headers["content-length"]
+        await self.downstream(self.start_message)
+        chunk = self.compressor.compress(body) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        await self.downstream({"type": "http.response.body", "body": chunk, "more_body": True})
+
+    async def _send_whole(self, headers: MutableHeaders, body: bytes):
+        settings = self.middleware.settings
+        if len(body) < settings.minimum_size:
+            await self.downstream(self.start_message)
+            await self.downstream({"type": "http.response.body", "body": body})
+            return
+
+        etag = gzip_etag(headers["etag"]) if "etag" in headers else None
+        compressed = self.middleware.cache.get(etag) if etag else None
+        if compressed is None:
+            compressed = gzip.compress(body, compresslevel=settings.level)
+            if etag:
+                self.middleware.cache.put(etag, compressed)
+
+        self._mark_compressed(headers)
+        if etag:
+            headers["etag"] = etag
+        headers["content-length"] = str(len(compressed))
+        await self.downstream(self.start_message)
+        await self.downstream({"type": "http.response.body", "body": compressed})
+
+    @staticmethod
+    def _mark_compressed(headers: MutableHeaders):
+        headers["content-encoding"] = "gzip"
+        headers.add_vary_header("Accept-Encoding")
\ No newline at end of file
@@ -0,0 +1,58 @@
+from starlette.datastructures import MutableHeaders
+import logging
+
+from services.db_budget import (
+    DEBUG,
+    ROUND_TRIPS_HEADER,
+    DB_TIME_HEADER,
+    BUDGET_HEADER,
+    begin_request_stats,
+    end_request_stats,
+    route_budget
+)
+
+logger = logging.getLogger(__name__)
+
+class DbBudgetMiddleware:
+    """Count Mongo round trips per request and flag routes that exceed their budget"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats, token = begin_request_stats()
+
+        async def send_with_counters(message):
+            if DEBUG and message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers[ROUND_TRIPS_HEADER] = str(stats.round_trips)
+                headers[DB_TIME_HEADER] = f"{stats.duration_micros / 1000:.3f}"
+                budget = route_budget(scope.get("route"))
+                if budget is not None:
+                    headers[BUDGET_HEADER] = str(budget)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_counters)
+        finally:
+            end_request_stats(token)
+            self._report(scope, stats)
+
+    @staticmethod
+    def _report(scope, stats):
+        route = scope.get("route")
+        path = getattr(route, "path_format", scope["path"])
+        budget = route_budget(route)
+        if budget is not None and stats.round_trips > budget:
+            logger.warning(
+                f"{scope['method']} {path} issued {stats.round_trips} Mongo round trips "
+                f"(budget {budget}, {stats.duration_micros / 1000:.1f} ms)"
+            )
+        for (command, collection), count in stats.repeated_commands().items():
+            logger.warning(
+                f"{scope['method']} {path} ran '{command}' on '{collection}' {count} times - possible N+1 query"
+            )
\ No newline at end of file
@@ -0,0 +1,32 @@
+import time
+
+from services.metrics import HTTP_REQUEST_DURATION, HTTP_RESPONSES
+
+class MetricsMiddleware:
+    """Record latency and status of every HTTP request against its route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the scope; templates keep label cardinality bounded
+            route = scope.get("route")
+            labels = (scope["method"], getattr(route, "path_format", "unmatched"))
+            HTTP_REQUEST_DURATION.observe(labels, time.perf_counter() - started)
+            HTTP_RESPONSES.inc(labels + (str(status),))
\ No newline at end of file
@@ -0,0 +1,39 @@
+from starlette.datastructures import MutableHeaders
+from services.log_pipeline import begin_request_id, end_request_id
+import re
+import uuid
+
+REQUEST_ID_HEADER = "x-request-id"
+
+# Accept caller-supplied IDs only if they are short and printable
+_VALID_REQUEST_ID = re.compile(rb"^[A-Za-z0-9._:-]{1,128}$")
+
+class RequestIdMiddleware:
+    """Tag each request with an ID (from X-Request-ID or generated) for log correlation, and echo it back"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id" and _VALID_REQUEST_ID.match(value):
+                request_id = value.decode()
+                break
+        if request_id is None:
+            request_id = uuid.uuid4().hex
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[REQUEST_ID_HEADER] = request_id
+            await send(message)
+
+        token = begin_request_id(request_id)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            end_request_id(token)
\ No newline at end of file
@@ -0,0 +1,18 @@
+from services.user_cache import begin_request_scope, end_request_scope
+
+class RequestScopeMiddleware:
+    """Give every HTTP request its own user memo so a handler never fetches the same user twice"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = begin_request_scope()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            end_request_scope(token)
\ No newline at end of file
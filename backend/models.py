@@ -1,12 +1,17 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List, Dict, Any
+from pydantic import AfterValidator, BaseModel, EmailStr, Field, field_validator
+from pydantic_core import core_schema
+from typing import Annotated, Optional, List, Dict, Any
 from datetime import datetime
 from bson import ObjectId
 
+from services.identity import normalize_email
+
 class PyObjectId(ObjectId):
     @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
+    def __get_pydantic_core_schema__(cls, source_type, handler):
+        return core_schema.no_info_plain_validator_function(
+            cls.validate, serialization=core_schema.to_string_ser_schema()
+        )
 
     @classmethod
     def validate(cls, v):
@@ -15,14 +20,19 @@ class PyObjectId(ObjectId):
         return ObjectId(v)
 
     @classmethod
-    def __modify_schema__(cls, field_schema):
-        field_schema.update(type="string")
+    def __get_pydantic_json_schema__(cls, schema, handler):
+        return {"type": "string"}
 
 # Simplified User Models
 class QuickSignup(BaseModel):
     """Email-only signup for voting"""
     email: EmailStr
 
+    @field_validator("email")
+    @classmethod
+    def canonical_email(cls, email: str) -> str:
+        return normalize_email(email)
+
 class UserComplete(BaseModel):
     """Complete user profile (optional)"""
     name: str
@@ -115,6 +125,15 @@ class CastVote(BaseModel):
     """Vote casting model"""
     email: EmailStr
     voting_option_id: str
+
+    @field_validator("email")
+    @classmethod
+    def canonical_email(cls, email: str) -> str:
+        return normalize_email(email)
+
+class BatchEmailLookup(BaseModel):
+    """Emails to resolve in a single batch lookup"""
+    emails: List[Annotated[str, AfterValidator(normalize_email)]]
     
 # User Engagement Models
 class UserEngagement(BaseModel):
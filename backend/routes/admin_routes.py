@@ -0,0 +1,38 @@
+from fastapi import APIRouter, HTTPException, Depends
+from services.responses import api_response
+from services.admin import require_admin
+from services.db_budget import db_budget
+from services.slow_queries import SlowQueryRecorder, get_slow_query_recorder
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/admin", tags=["Admin"], dependencies=[Depends(require_admin)])
+
+@router.get("/slow-queries")
+@db_budget(0)
+async def get_slow_queries(slow_query_recorder: SlowQueryRecorder = Depends(get_slow_query_recorder)):
+    """Slowest recorded query shapes with their winning plans"""
+    try:
+        entries = slow_query_recorder.top()
+        
+        return api_response(
+            success=True,
+            message=f"Retrieved {len(entries)} slow query shapes",
+            data={
+                "threshold_ms": slow_query_recorder.settings.threshold_ms,
+                "slow_queries": entries
+            }
+        )
+        
+    except Exception as e:
+        logger.error("Error getting slow queries: %s", e)
+        raise HTTPException(status_code=500, detail="Failed to get slow queries")
+
+@router.delete("/slow-queries")
+@db_budget(0)
+async def reset_slow_queries(slow_query_recorder: SlowQueryRecorder = Depends(get_slow_query_recorder)):
+    """Clear the recorded slow query shapes"""
+    slow_query_recorder.reset()
+    
+    return api_response(success=True, message="Slow query log cleared")
\ No newline at end of file
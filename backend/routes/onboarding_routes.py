@@ -1,6 +1,12 @@
 from fastapi import APIRouter, HTTPException, Depends
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from models import UserEngagement, ApiResponse
+from models import UserEngagement
+from services.responses import api_response
+from services.database import get_db
+from services.db_budget import db_budget
+from services.engagement import action_update, counter_key, JOURNEY_FIELDS
+from services.user_cache import invalidate_user
+from services.identity import normalize_email, EMAIL_COLLATION
 from typing import Dict, Any
 import logging
 from datetime import datetime
@@ -9,11 +15,19 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/onboarding", tags=["Onboarding"])
 
-async def get_db():
-    from server import db
-    return db
+# Action -> conversion funnel flag it completes
+FUNNEL_ACTIONS = {
+    "view_sample_reports": "viewed_samples",
+    "view_how_it_works": "understood_process",
+    "cast_vote": "cast_first_vote",
+    "view_dashboard": "explored_dashboard",
+    "hit_free_limit": "hit_free_limit",
+    "start_trial": "started_trial",
+    "convert_to_paid": "converted_to_paid"
+}
 
 @router.post("/track-action")
+@db_budget(1)
 async def track_user_action(
     action_data: Dict[str, Any],
     db: AsyncIOMotorDatabase = Depends(get_db)
@@ -26,68 +40,30 @@ async def track_user_action(
         
         if not email or not action:
             raise HTTPException(status_code=400, detail="Email and action are required")
+        email = normalize_email(email)
         
-        # Find or create user engagement record
-        engagement = await db.user_engagement.find_one({"email": email})
+        # Update funnel flags and page views alongside the action counters
+        set_fields = {}
+        funnel_flag = FUNNEL_ACTIONS.get(action)
+        if funnel_flag:
+            set_fields[funnel_flag] = True
         
-        if not engagement:
-            engagement = {
-                "email": email,
-                "page_views": {},
-                "actions": [],
-                "viewed_samples": False,
-                "understood_process": False,
-                "cast_first_vote": False,
-                "explored_dashboard": False,
-                "hit_free_limit": False,
-                "started_trial": False,
-                "converted_to_paid": False,
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
-            }
-        
-        # Update engagement based on action
-        engagement["actions"].append({
-            "timestamp": datetime.utcnow(),
-            "action": action,
-            "details": details
-        })
-        
-        # Update funnel flags
-        if action == "view_sample_reports":
-            engagement["viewed_samples"] = True
-        elif action == "view_how_it_works":
-            engagement["understood_process"] = True
-        elif action == "cast_vote":
-            engagement["cast_first_vote"] = True
-        elif action == "view_dashboard":
-            engagement["explored_dashboard"] = True
-        elif action == "hit_free_limit":
-            engagement["hit_free_limit"] = True
-        elif action == "start_trial":
-            engagement["started_trial"] = True
-        elif action == "convert_to_paid":
-            engagement["converted_to_paid"] = True
-        
-        # Track page views
+        inc_fields = {}
         page = details.get("page")
         if page:
-            if page not in engagement["page_views"]:
-                engagement["page_views"][page] = 0
-            engagement["page_views"][page] += 1
-        
-        engagement["updated_at"] = datetime.utcnow()
+            inc_fields[f"page_views.{counter_key(page)}"] = 1
         
-        # Upsert engagement record
+        # Single atomic upsert instead of read-modify-write of the whole record
         await db.user_engagement.update_one(
             {"email": email},
-            {"$set": engagement},
-            upsert=True
+            action_update(action, details, set_fields=set_fields, inc_fields=inc_fields),
+            upsert=True,
+            collation=EMAIL_COLLATION
         )
         
-        logger.info(f"Tracked action '{action}' for user {email}")
+        logger.info("Tracked action '%s' for user %s", action, email)
         
-        return ApiResponse(
+        return api_response(
             success=True,
             message="Action tracked successfully",
             data={"action": action, "email": email}
@@ -96,10 +72,11 @@ async def track_user_action(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error tracking user action: {str(e)}")
+        logger.error("Error tracking user action: %s", e)
         raise HTTPException(status_code=500, detail="Failed to track action")
 
 @router.get("/funnel-stats")
+@db_budget(1)
 async def get_funnel_stats(db: AsyncIOMotorDatabase = Depends(get_db)):
     """Get onboarding funnel statistics"""
     try:
@@ -154,21 +131,25 @@ async def get_funnel_stats(db: AsyncIOMotorDatabase = Depends(get_db)):
                 "absolute_numbers": {}
             }
         
-        return ApiResponse(
+        return api_response(
             success=True,
             message="Funnel statistics retrieved",
             data=funnel_stats
         )
         
     except Exception as e:
-        logger.error(f"Error getting funnel stats: {str(e)}")
+        logger.error("Error getting funnel stats: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get funnel statistics")
 
 @router.get("/user-journey/{email}")
+@db_budget(1)
 async def get_user_journey(email: str, db: AsyncIOMotorDatabase = Depends(get_db)):
     """Get specific user's onboarding journey"""
     try:
-        engagement = await db.user_engagement.find_one({"email": email})
+        email = normalize_email(email)
+        engagement = await db.user_engagement.find_one(
+            {"email": email}, JOURNEY_FIELDS, collation=EMAIL_COLLATION
+        )
         
         if not engagement:
             raise HTTPException(status_code=404, detail="User journey not found")
@@ -187,7 +168,7 @@ async def get_user_journey(email: str, db: AsyncIOMotorDatabase = Depends(get_db
         completed_steps = sum(1 for step in journey_steps if step["completed"])
         progress_percentage = (completed_steps / len(journey_steps)) * 100
         
-        return ApiResponse(
+        return api_response(
             success=True,
             message="User journey retrieved",
             data={
@@ -197,7 +178,8 @@ async def get_user_journey(email: str, db: AsyncIOMotorDatabase = Depends(get_db
                 "completed_steps": completed_steps,
                 "total_steps": len(journey_steps),
                 "page_views": engagement.get("page_views", {}),
-                "total_actions": len(engagement.get("actions", [])),
+                "total_actions": engagement.get("action_count", 0),
+                "action_counts": engagement.get("action_counts", {}),
                 "created_at": engagement.get("created_at"),
                 "last_activity": engagement.get("updated_at")
             }
@@ -206,10 +188,11 @@ async def get_user_journey(email: str, db: AsyncIOMotorDatabase = Depends(get_db
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting user journey: {str(e)}")
+        logger.error("Error getting user journey: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get user journey")
 
 @router.post("/complete-onboarding")
+@db_budget(2)
 async def complete_onboarding(
     completion_data: Dict[str, Any],
     db: AsyncIOMotorDatabase = Depends(get_db)
@@ -219,31 +202,26 @@ async def complete_onboarding(
         email = completion_data.get("email")
         if not email:
             raise HTTPException(status_code=400, detail="Email is required")
+        email = normalize_email(email)
         
         # Update user record
         await db.users.update_one(
             {"email": email},
             {"$set": {"onboarding_step": 999, "last_active": datetime.utcnow()}},
-            upsert=True
+            upsert=True,
+            collation=EMAIL_COLLATION
         )
+        invalidate_user(email)
         
         # Track completion action
         await db.user_engagement.update_one(
             {"email": email},
-            {
-                "$push": {
-                    "actions": {
-                        "timestamp": datetime.utcnow(),
-                        "action": "complete_onboarding",
-                        "details": completion_data
-                    }
-                },
-                "$set": {"updated_at": datetime.utcnow()}
-            },
-            upsert=True
+            action_update("complete_onboarding", completion_data),
+            upsert=True,
+            collation=EMAIL_COLLATION
         )
         
-        return ApiResponse(
+        return api_response(
             success=True,
             message="Onboarding completed successfully",
             data={"email": email}
@@ -252,5 +230,5 @@ async def complete_onboarding(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error completing onboarding: {str(e)}")
+        logger.error("Error completing onboarding: %s", e)
         raise HTTPException(status_code=500, detail="Failed to complete onboarding")
\ No newline at end of file
@@ -1,6 +1,9 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from models import SampleReport, ApiResponse
+from models import SampleReport
+from services.responses import api_response
+from services.database import get_db
+from services.db_budget import db_budget
 from typing import List, Optional
 import logging
 
@@ -8,11 +11,8 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/samples", tags=["Sample Reports"])
 
-async def get_db():
-    from server import db
-    return db
-
 @router.get("/reports")
+@db_budget(1)
 async def get_sample_reports(
     category: Optional[str] = Query(None, description="Filter by category"),
     featured_only: bool = Query(False, description="Show only featured reports"),
@@ -36,7 +36,7 @@ async def get_sample_reports(
         for report in reports:
             report["_id"] = str(report["_id"])
         
-        return ApiResponse(
+        return api_response(
             success=True,
             message=f"Retrieved {len(reports)} sample reports",
             data={
@@ -48,10 +48,11 @@ async def get_sample_reports(
         )
         
     except Exception as e:
-        logger.error(f"Error getting sample reports: {str(e)}")
+        logger.error("Error getting sample reports: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get sample reports")
 
 @router.get("/reports/{report_id}")
+@db_budget(1)
 async def get_sample_report_detail(
     report_id: str,
     db: AsyncIOMotorDatabase = Depends(get_db)
@@ -86,7 +87,7 @@ async def get_sample_report_detail(
             "premium_required": True  # Indicate premium needed for full details
         }
         
-        return ApiResponse(
+        return api_response(
             success=True,
             message="Sample report retrieved",
             data=sample_view
@@ -95,7 +96,7 @@ async def get_sample_report_detail(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting sample report detail: {str(e)}")
+        logger.error("Error getting sample report detail: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get report detail")
 
 @router.get("/categories")
@@ -117,7 +118,7 @@ async def get_report_categories(db: AsyncIOMotorDatabase = Depends(get_db)):
         # Sort by count descending
         category_stats.sort(key=lambda x: x["count"], reverse=True)
         
-        return ApiResponse(
+        return api_response(
             success=True,
             message="Categories retrieved",
             data={
@@ -127,10 +128,11 @@ async def get_report_categories(db: AsyncIOMotorDatabase = Depends(get_db)):
         )
         
     except Exception as e:
-        logger.error(f"Error getting categories: {str(e)}")
+        logger.error("Error getting categories: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get categories")
 
 @router.get("/featured")
+@db_budget(1)
 async def get_featured_reports(
     limit: int = Query(3, description="Number of featured reports"),
     db: AsyncIOMotorDatabase = Depends(get_db)
@@ -154,7 +156,7 @@ async def get_featured_reports(
                 "key_finding": report["key_findings"][0] if report["key_findings"] else "Lab tested for safety"
             })
         
-        return ApiResponse(
+        return api_response(
             success=True,
             message="Featured reports retrieved",
             data={
@@ -164,10 +166,11 @@ async def get_featured_reports(
         )
         
     except Exception as e:
-        logger.error(f"Error getting featured reports: {str(e)}")
+        logger.error("Error getting featured reports: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get featured reports")
 
 @router.get("/stats")
+@db_budget(4)
 async def get_sample_stats(db: AsyncIOMotorDatabase = Depends(get_db)):
     """Get statistics about sample reports"""
     try:
@@ -190,7 +193,7 @@ async def get_sample_stats(db: AsyncIOMotorDatabase = Depends(get_db)):
         
         safety_distribution = {stat["_id"]: stat["count"] for stat in safety_stats}
         
-        return ApiResponse(
+        return api_response(
             success=True,
             message="Sample statistics retrieved",
             data={
@@ -202,5 +205,5 @@ async def get_sample_stats(db: AsyncIOMotorDatabase = Depends(get_db)):
         )
         
     except Exception as e:
-        logger.error(f"Error getting sample stats: {str(e)}")
+        logger.error("Error getting sample stats: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get sample statistics")
\ No newline at end of file
@@ -1,6 +1,26 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse, Response
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from models import SubscriptionTier, ApiResponse
+from models import SubscriptionTier, BatchEmailLookup
+from services.responses import api_response
+from services.database import get_db
+from services.db_budget import db_budget
+from services.admin import require_admin
+from services.engagement import action_update
+from services.user_cache import get_user, invalidate_user
+from services.profiles import fetch_user_with_engagement, UPGRADE_PROMPT_FIELDS
+from services.subscriptions import build_subscription_status, stream_subscription_statuses
+from services.tiers import TierCatalogue, get_tier_catalogue
+from services.ids import new_order_id
+from services.batch import unique_emails, MAX_BATCH_EMAILS, NDJSON_MEDIA_TYPE
+from services.identity import normalize_email, EMAIL_COLLATION
+from services.payments import (
+    ORDER_PENDING,
+    pending_order_expiry,
+    subscription_expiry,
+    mark_order_paid,
+    activate_subscription
+)
 from typing import Dict, Any
 import logging
 from datetime import datetime, timedelta
@@ -9,80 +29,31 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/subscriptions", tags=["Subscriptions"])
 
-async def get_db():
-    from server import db
-    return db
-
 @router.get("/tiers")
-async def get_subscription_tiers(db: AsyncIOMotorDatabase = Depends(get_db)):
+@db_budget(0)
+async def get_subscription_tiers(
+    request: Request,
+    tier_catalogue: TierCatalogue = Depends(get_tier_catalogue)
+):
     """Get available subscription tiers"""
     try:
-        # Define subscription tiers (could be stored in DB)
-        tiers = [
-            {
-                "id": "free",
-                "name": "Free",
-                "price": 0,
-                "duration_days": 30,
-                "features": [
-                    "3 test report views per month",
-                    "5 votes per month",
-                    "1 forum post per month",
-                    "Basic community access"
-                ],
-                "is_trial": False,
-                "popular": False,
-                "limitations": {
-                    "report_views": 3,
-                    "votes": 5,
-                    "forum_posts": 1
-                }
-            },
-            {
-                "id": "premium",
-                "name": "Premium",
-                "price": 99,
-                "duration_days": 30,
-                "features": [
-                    "Unlimited test report access",
-                    "Detailed lab parameters",
-                    "Unlimited voting",
-                    "Priority voting on new tests",
-                    "Unlimited forum participation",
-                    "Expert Q&A sessions",
-                    "Early access to new features"
-                ],
-                "is_trial": False,
-                "popular": True,
-                "trial_available": True,
-                "trial_days": 7
-            },
-            {
-                "id": "premium_trial",
-                "name": "Premium Trial",
-                "price": 0,
-                "duration_days": 7,
-                "features": [
-                    "All Premium features",
-                    "7-day free trial",
-                    "Cancel anytime"
-                ],
-                "is_trial": True,
-                "popular": False
-            }
-        ]
-        
-        return ApiResponse(
-            success=True,
-            message="Subscription tiers retrieved",
-            data={"tiers": tiers}
+        # Served straight from the pre-serialised catalogue
+        headers = {"ETag": tier_catalogue.etag, "Cache-Control": "public, max-age=60"}
+        if request.headers.get("if-none-match") == tier_catalogue.etag:
+            return Response(status_code=304, headers=headers)
+        
+        return Response(
+            content=tier_catalogue.response_body,
+            media_type="application/json",
+            headers=headers
         )
         
     except Exception as e:
-        logger.error(f"Error getting subscription tiers: {str(e)}")
+        logger.error("Error getting subscription tiers: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get subscription tiers")
 
 @router.post("/start-trial")
+@db_budget(3)
 async def start_premium_trial(
     trial_data: Dict[str, Any],
     db: AsyncIOMotorDatabase = Depends(get_db)
@@ -92,9 +63,10 @@ async def start_premium_trial(
         email = trial_data.get("email")
         if not email:
             raise HTTPException(status_code=400, detail="Email is required")
+        email = normalize_email(email)
         
         # Get user
-        user = await db.users.find_one({"email": email})
+        user = await get_user(db, email)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -122,28 +94,22 @@ async def start_premium_trial(
                     "votes_cast": 0,
                     "forum_posts": 0
                 }
-            }
+            },
+            collation=EMAIL_COLLATION
         )
+        invalidate_user(email)
         
         # Track engagement
         await db.user_engagement.update_one(
             {"email": email},
-            {
-                "$set": {"started_trial": True, "updated_at": datetime.utcnow()},
-                "$push": {
-                    "actions": {
-                        "timestamp": datetime.utcnow(),
-                        "action": "start_trial",
-                        "details": {"trial_end": trial_end}
-                    }
-                }
-            },
-            upsert=True
+            action_update("start_trial", {"trial_end": trial_end}, set_fields={"started_trial": True}),
+            upsert=True,
+            collation=EMAIL_COLLATION
         )
         
-        logger.info(f"Premium trial started for {email}")
+        logger.info("Premium trial started for %s", email)
         
-        return ApiResponse(
+        return api_response(
             success=True,
             message="Premium trial started successfully!",
             data={
@@ -162,75 +128,26 @@ async def start_premium_trial(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error starting trial: {str(e)}")
+        logger.error("Error starting trial: %s", e)
         raise HTTPException(status_code=500, detail="Failed to start trial")
 
 @router.get("/status/{email}")
+@db_budget(1)
 async def get_subscription_status(
     email: str,
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Get user's subscription status"""
     try:
-        user = await db.users.find_one({"email": email})
+        email = normalize_email(email)
+        user = await get_user(db, email)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        is_premium = user.get("is_premium", False)
-        subscription_expires = user.get("subscription_expires")
-        trial_used = user.get("trial_used", False)
+        # Expired subscriptions are downgraded by the background sweeper
+        status_data = build_subscription_status(user)
         
-        # Check if subscription expired
-        if is_premium and subscription_expires and subscription_expires < datetime.utcnow():
-            # Expire the subscription
-            await db.users.update_one(
-                {"email": email},
-                {
-                    "$set": {
-                        "is_premium": False,
-                        "subscription_expires": None
-                    }
-                }
-            )
-            is_premium = False
-            subscription_expires = None
-        
-        # Calculate days remaining
-        days_remaining = 0
-        if is_premium and subscription_expires:
-            days_remaining = max(0, (subscription_expires - datetime.utcnow()).days)
-        
-        # Get current usage
-        usage_stats = {
-            "report_views": {
-                "used": user.get("report_views_used", 0),
-                "limit": "unlimited" if is_premium else user.get("report_views_limit", 3)
-            },
-            "votes": {
-                "used": user.get("votes_cast", 0),
-                "limit": "unlimited" if is_premium else user.get("votes_limit", 5)
-            },
-            "forum_posts": {
-                "used": user.get("forum_posts", 0),
-                "limit": "unlimited" if is_premium else user.get("forum_posts_limit", 1)
-            }
-        }
-        
-        status_data = {
-            "email": email,
-            "is_premium": is_premium,
-            "subscription_expires": subscription_expires,
-            "days_remaining": days_remaining,
-            "trial_used": trial_used,
-            "trial_available": not trial_used and not is_premium,
-            "usage_stats": usage_stats,
-            "upgrade_recommended": not is_premium and (
-                user.get("report_views_used", 0) >= user.get("report_views_limit", 3) * 0.8 or
-                user.get("votes_cast", 0) >= user.get("votes_limit", 5) * 0.8
-            )
-        }
-        
-        return ApiResponse(
+        return api_response(
             success=True,
             message="Subscription status retrieved",
             data=status_data
@@ -239,13 +156,29 @@ async def get_subscription_status(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting subscription status: {str(e)}")
+        logger.error("Error getting subscription status: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get subscription status")
 
+@router.post("/status/batch", dependencies=[Depends(require_admin)])
+async def get_subscription_statuses_batch(
+    lookup: BatchEmailLookup,
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    """Get subscription status for many users at once, streamed back as NDJSON"""
+    emails = unique_emails(lookup.emails)
+    if not emails:
+        raise HTTPException(status_code=400, detail="At least one email is required")
+    if len(emails) > MAX_BATCH_EMAILS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_EMAILS} emails per batch")
+    
+    return StreamingResponse(stream_subscription_statuses(db, emails), media_type=NDJSON_MEDIA_TYPE)
+
 @router.post("/create-payment-order")
+@db_budget(2)
 async def create_payment_order(
     order_data: Dict[str, Any],
-    db: AsyncIOMotorDatabase = Depends(get_db)
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    tier_catalogue: TierCatalogue = Depends(get_tier_catalogue)
 ):
     """Create Razorpay order for subscription payment"""
     try:
@@ -254,40 +187,42 @@ async def create_payment_order(
         
         if not email or not tier_id:
             raise HTTPException(status_code=400, detail="Email and tier_id are required")
+        email = normalize_email(email)
         
         # Get user
-        user = await db.users.find_one({"email": email})
+        user = await get_user(db, email)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        # Get tier details (simplified - in real app, get from DB)
-        tier_prices = {
-            "premium": 99,
-            "premium_annual": 999
-        }
-        
-        if tier_id not in tier_prices:
+        # Get tier details from the shared catalogue
+        tier = tier_catalogue.purchasable(tier_id)
+        if not tier:
             raise HTTPException(status_code=400, detail="Invalid tier")
         
-        amount = tier_prices[tier_id]
+        amount = tier["price"]
         
         # Here you would integrate with Razorpay
         # For now, return mock order data
-        order_id = f"order_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{email.split('@')[0]}"
+        order_id = new_order_id()
         
-        # Store pending order
+        # Store pending order; unpaid orders expire via the TTL index
+        now = datetime.utcnow()
         pending_order = {
+            # Time-sortable, so the _id index doubles as the creation-time index
+            "_id": order_id,
             "order_id": order_id,
             "email": email,
             "tier_id": tier_id,
             "amount": amount,
-            "status": "pending",
-            "created_at": datetime.utcnow()
+            "duration_days": tier["duration_days"],
+            "status": ORDER_PENDING,
+            "created_at": now,
+            "expires_at": pending_order_expiry(now)
         }
         
         await db.pending_orders.insert_one(pending_order)
         
-        return ApiResponse(
+        return api_response(
             success=True,
             message="Payment order created",
             data={
@@ -302,10 +237,11 @@ async def create_payment_order(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error creating payment order: {str(e)}")
+        logger.error("Error creating payment order: %s", e)
         raise HTTPException(status_code=500, detail="Failed to create payment order")
 
 @router.post("/verify-payment")
+@db_budget(5)
 async def verify_payment(
     payment_data: Dict[str, Any],
     db: AsyncIOMotorDatabase = Depends(get_db)
@@ -319,70 +255,42 @@ async def verify_payment(
         if not all([order_id, payment_id, signature]):
             raise HTTPException(status_code=400, detail="Missing payment verification data")
         
-        # Get pending order
-        pending_order = await db.pending_orders.find_one({"order_id": order_id})
-        if not pending_order:
-            raise HTTPException(status_code=404, detail="Order not found")
-        
         # Here you would verify the Razorpay signature
         # For now, assume verification is successful
         
+        # Single conditional pending -> paid transition; safe to retry
+        pending_order = await mark_order_paid(db, order_id, payment_id)
+        if not pending_order:
+            raise HTTPException(status_code=404, detail="Order not found")
+        if pending_order.get("payment_id") != payment_id:
+            raise HTTPException(status_code=409, detail="Order already paid by a different payment")
+        
         email = pending_order["email"]
         tier_id = pending_order["tier_id"]
         
-        # Activate subscription
-        subscription_end = datetime.utcnow() + timedelta(days=30)  # 1 month
+        # Activate subscription (no-op if this order was already applied)
+        activated = await activate_subscription(db, pending_order)
+        subscription_end = subscription_expiry(pending_order)
         
-        await db.users.update_one(
-            {"email": email},
-            {
-                "$set": {
-                    "is_premium": True,
-                    "subscription_expires": subscription_end,
-                    "last_active": datetime.utcnow(),
-                    # Reset usage limits
-                    "report_views_used": 0,
-                    "votes_cast": 0,
-                    "forum_posts": 0
-                }
-            }
-        )
-        
-        # Update order status
-        await db.pending_orders.update_one(
-            {"order_id": order_id},
-            {
-                "$set": {
-                    "status": "completed",
-                    "payment_id": payment_id,
-                    "completed_at": datetime.utcnow()
-                }
-            }
-        )
-        
-        # Track conversion
-        await db.user_engagement.update_one(
-            {"email": email},
-            {
-                "$set": {"converted_to_paid": True, "updated_at": datetime.utcnow()},
-                "$push": {
-                    "actions": {
-                        "timestamp": datetime.utcnow(),
-                        "action": "convert_to_paid",
-                        "details": {
-                            "tier_id": tier_id,
-                            "amount": pending_order["amount"],
-                            "payment_id": payment_id
-                        }
-                    }
-                }
-            },
-            upsert=True
-        )
-        
-        logger.info(f"Subscription activated for {email}")
+        # Track conversion once per order
+        if activated:
+            logger.info("Subscription activated for %s", email)
+            await db.user_engagement.update_one(
+                {"email": email},
+                action_update(
+                    "convert_to_paid",
+                    {
+                        "tier_id": tier_id,
+                        "amount": pending_order["amount"],
+                        "payment_id": payment_id
+                    },
+                    set_fields={"converted_to_paid": True}
+                ),
+                upsert=True,
+                collation=EMAIL_COLLATION
+            )
         
-        return ApiResponse(
+        return api_response(
             success=True,
             message="Payment verified and subscription activated!",
             data={
@@ -402,22 +310,25 @@ async def verify_payment(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error verifying payment: {str(e)}")
+        logger.error("Error verifying payment: %s", e)
         raise HTTPException(status_code=500, detail="Failed to verify payment")
 
 @router.get("/upgrade-prompts/{email}")
+@db_budget(1)
 async def get_upgrade_prompts(
     email: str,
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Get personalized upgrade prompts based on user behavior"""
     try:
-        user = await db.users.find_one({"email": email})
+        email = normalize_email(email)
+        # User and engagement counter in a single round trip
+        user = await fetch_user_with_engagement(db, email, UPGRADE_PROMPT_FIELDS)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
         if user.get("is_premium", False):
-            return ApiResponse(
+            return api_response(
                 success=True,
                 message="User is already premium",
                 data={"prompts": []}
@@ -460,8 +371,8 @@ async def get_upgrade_prompts(
             })
         
         # Engagement-based prompts
-        engagement = await db.user_engagement.find_one({"email": email})
-        if engagement and len(engagement.get("actions", [])) >= 10:
+        engagement = user.get("engagement")
+        if engagement and engagement.get("action_count", 0) >= 10:
             prompts.append({
                 "type": "engagement_reward",
                 "title": "You're an Active Member!",
@@ -481,7 +392,7 @@ async def get_upgrade_prompts(
                 "urgency": "low"
             })
         
-        return ApiResponse(
+        return api_response(
             success=True,
             message="Upgrade prompts retrieved",
             data={
@@ -499,5 +410,5 @@ async def get_upgrade_prompts(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting upgrade prompts: {str(e)}")
+        logger.error("Error getting upgrade prompts: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get upgrade prompts")
\ No newline at end of file
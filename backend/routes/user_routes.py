@@ -1,6 +1,19 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from models import User, UserComplete, UserStats, ApiResponse
+from models import User, UserComplete, UserStats, BatchEmailLookup
+from services.responses import api_response
+from services.database import get_db
+from services.db_budget import db_budget
+from services.admin import require_admin
+from services.engagement import action_update
+from services.dashboard import assemble_dashboard
+from services.community import CommunitySnapshot, get_community_snapshot
+from services.quota import consume_quota, quota_status
+from services.user_cache import get_user, invalidate_user
+from services.profiles import fetch_user_with_engagement, build_profile, stream_profiles, PROFILE_FIELDS
+from services.batch import unique_emails, MAX_BATCH_EMAILS, NDJSON_MEDIA_TYPE
+from services.identity import normalize_email, EMAIL_COLLATION
 from typing import Optional
 import logging
 from datetime import datetime
@@ -9,103 +22,21 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
-async def get_db():
-    from server import db
-    return db
-
 @router.get("/dashboard/{email}")
+@db_budget(3)
 async def get_user_dashboard(
     email: str,
-    db: AsyncIOMotorDatabase = Depends(get_db)
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    community_snapshot: CommunitySnapshot = Depends(get_community_snapshot)
 ):
     """Get user dashboard data"""
     try:
-        # Get user data
-        user = await db.users.find_one({"email": email})
-        if not user:
+        email = normalize_email(email)
+        dashboard_data = await assemble_dashboard(db, email, community_snapshot)
+        if dashboard_data is None:
             raise HTTPException(status_code=404, detail="User not found")
         
-        # Get user's voting history
-        user_votes = await db.voting_options.find(
-            {"voters": email}
-        ).to_list(length=100)
-        
-        # Calculate community impact (simplified)
-        total_community_members = await db.users.count_documents({})
-        tests_influenced = len([v for v in user_votes if v["status"] in ["funded", "testing", "completed"]])
-        
-        # Get recent community activity
-        recent_activity = []
-        
-        # Recent test completions
-        completed_tests = await db.sample_reports.find().sort("created_at", -1).limit(3).to_list(3)
-        for test in completed_tests:
-            recent_activity.append({
-                "type": "test_completed",
-                "message": f"New test result: {test['product_name']} ({test['purity_score']}/10)",
-                "timestamp": test["created_at"]
-            })
-        
-        # Recent voting activity
-        active_votes = await db.voting_options.find({"status": "voting"}).sort("votes", -1).limit(2).to_list(2)
-        for vote in active_votes:
-            recent_activity.append({
-                "type": "voting_update",
-                "message": f"Trending vote: {vote['product_name']} ({vote['votes']} votes)",
-                "timestamp": datetime.utcnow()
-            })
-        
-        # Sort by timestamp
-        recent_activity.sort(key=lambda x: x["timestamp"], reverse=True)
-        
-        # Build dashboard data
-        dashboard_data = {
-            "user_info": {
-                "email": user["email"],
-                "name": user.get("name"),
-                "member_since": user["created_at"],
-                "last_active": user.get("last_active"),
-                "onboarding_step": user.get("onboarding_step", 1)
-            },
-            "stats": {
-                "votes_cast": len(user_votes),
-                "tests_influenced": tests_influenced,
-                "community_impact": total_community_members,  # Simplified metric
-                "report_views_remaining": max(0, user.get("report_views_limit", 3) - user.get("report_views_used", 0)),
-                "is_premium": user.get("is_premium", False)
-            },
-            "recent_votes": [
-                {
-                    "product_name": vote["product_name"],
-                    "status": vote["status"],
-                    "votes": vote["votes"],
-                    "funding_progress": round((vote["funding_raised"] / vote["funding_target"]) * 100, 1)
-                }
-                for vote in user_votes[:5]
-            ],
-            "recent_activity": recent_activity[:5],
-            "limits": {
-                "report_views": {
-                    "used": user.get("report_views_used", 0),
-                    "limit": user.get("report_views_limit", 3),
-                    "remaining": max(0, user.get("report_views_limit", 3) - user.get("report_views_used", 0))
-                },
-                "votes": {
-                    "used": user.get("votes_cast", 0),
-                    "limit": user.get("votes_limit", 5),
-                    "remaining": max(0, user.get("votes_limit", 5) - user.get("votes_cast", 0))
-                }
-            },
-            "upgrade_prompt": {
-                "show": not user.get("is_premium", False) and (
-                    user.get("report_views_used", 0) >= user.get("report_views_limit", 3) or
-                    user.get("votes_cast", 0) >= user.get("votes_limit", 5)
-                ),
-                "reason": "free_limit_reached" if user.get("report_views_used", 0) >= user.get("report_views_limit", 3) else "vote_limit_reached"
-            }
-        }
-        
-        return ApiResponse(
+        return api_response(
             success=True,
             message="Dashboard data retrieved",
             data=dashboard_data
@@ -114,10 +45,11 @@ async def get_user_dashboard(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting user dashboard: {str(e)}")
+        logger.error("Error getting user dashboard: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get dashboard data")
 
 @router.post("/complete-profile/{email}")
+@db_budget(3)
 async def complete_user_profile(
     email: str,
     profile_data: UserComplete,
@@ -125,8 +57,9 @@ async def complete_user_profile(
 ):
     """Complete user profile with additional information"""
     try:
+        email = normalize_email(email)
         # Check if user exists
-        user = await db.users.find_one({"email": email})
+        user = await get_user(db, email)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -144,32 +77,26 @@ async def complete_user_profile(
         
         await db.users.update_one(
             {"email": email},
-            {"$set": update_data}
+            {"$set": update_data},
+            collation=EMAIL_COLLATION
         )
+        invalidate_user(email)
         
         # Track engagement
         await db.user_engagement.update_one(
             {"email": email},
-            {
-                "$push": {
-                    "actions": {
-                        "timestamp": datetime.utcnow(),
-                        "action": "complete_profile",
-                        "details": {
-                            "name": profile_data.name,
-                            "has_mobile": bool(profile_data.mobile),
-                            "has_location": bool(profile_data.location)
-                        }
-                    }
-                },
-                "$set": {"updated_at": datetime.utcnow()}
-            },
-            upsert=True
+            action_update("complete_profile", {
+                "name": profile_data.name,
+                "has_mobile": bool(profile_data.mobile),
+                "has_location": bool(profile_data.location)
+            }),
+            upsert=True,
+            collation=EMAIL_COLLATION
         )
         
-        logger.info(f"Profile completed for {email}")
+        logger.info("Profile completed for %s", email)
         
-        return ApiResponse(
+        return api_response(
             success=True,
             message="Profile completed successfully",
             data={
@@ -182,10 +109,11 @@ async def complete_user_profile(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error completing profile: {str(e)}")
+        logger.error("Error completing profile: %s", e)
         raise HTTPException(status_code=500, detail="Failed to complete profile")
 
 @router.post("/track-report-view/{email}")
+@db_budget(3)
 async def track_report_view(
     email: str,
     report_data: dict,
@@ -193,31 +121,28 @@ async def track_report_view(
 ):
     """Track when user views a report (for freemium limits)"""
     try:
-        # Get user
-        user = await db.users.find_one({"email": email})
+        email = normalize_email(email)
+        # Check the view limit and count the view in one atomic step
+        allowed, user = await consume_quota(db, email, "report_views")
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        # Check if user has reached view limit
-        views_used = user.get("report_views_used", 0)
-        views_limit = user.get("report_views_limit", 3)
+        views = quota_status(user, "report_views")
+        views_used = views["used"]
+        views_limit = views["limit"]
         is_premium = user.get("is_premium", False)
         
-        if not is_premium and views_used >= views_limit:
+        if not allowed:
             # Track that user hit the limit
             await db.user_engagement.update_one(
                 {"email": email},
-                {
-                    "$set": {"hit_free_limit": True, "updated_at": datetime.utcnow()},
-                    "$push": {
-                        "actions": {
-                            "timestamp": datetime.utcnow(),
-                            "action": "hit_free_limit",
-                            "details": {"limit_type": "report_views", "report_id": report_data.get("report_id")}
-                        }
-                    }
-                },
-                upsert=True
+                action_update(
+                    "hit_free_limit",
+                    {"limit_type": "report_views", "report_id": report_data.get("report_id")},
+                    set_fields={"hit_free_limit": True}
+                ),
+                upsert=True,
+                collation=EMAIL_COLLATION
             )
             
             raise HTTPException(
@@ -231,34 +156,15 @@ async def track_report_view(
                 }
             )
         
-        # Increment view count for non-premium users
-        if not is_premium:
-            await db.users.update_one(
-                {"email": email},
-                {
-                    "$inc": {"report_views_used": 1},
-                    "$set": {"last_active": datetime.utcnow()}
-                }
-            )
-            views_used += 1
-        
         # Track the view
         await db.user_engagement.update_one(
             {"email": email},
-            {
-                "$push": {
-                    "actions": {
-                        "timestamp": datetime.utcnow(),
-                        "action": "view_report",
-                        "details": report_data
-                    }
-                },
-                "$set": {"updated_at": datetime.utcnow()}
-            },
-            upsert=True
+            action_update("view_report", report_data),
+            upsert=True,
+            collation=EMAIL_COLLATION
         )
         
-        return ApiResponse(
+        return api_response(
             success=True,
             message="Report view tracked",
             data={
@@ -272,88 +178,65 @@ async def track_report_view(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error tracking report view: {str(e)}")
+        logger.error("Error tracking report view: %s", e)
         raise HTTPException(status_code=500, detail="Failed to track report view")
 
 @router.get("/profile/{email}")
+@db_budget(1)
 async def get_user_profile(
     email: str,
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Get user profile information"""
     try:
-        user = await db.users.find_one({"email": email})
+        email = normalize_email(email)
+        # User and engagement counter in a single round trip
+        user = await fetch_user_with_engagement(db, email, PROFILE_FIELDS)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        # Get engagement data
-        engagement = await db.user_engagement.find_one({"email": email})
-        
-        profile_data = {
-            "email": user["email"],
-            "name": user.get("name"),
-            "mobile": user.get("mobile"),
-            "location": user.get("location"),
-            "role": user.get("role", "member"),
-            "member_since": user["created_at"],
-            "last_active": user.get("last_active"),
-            "is_premium": user.get("is_premium", False),
-            "subscription_expires": user.get("subscription_expires"),
-            "trial_used": user.get("trial_used", False),
-            "onboarding_step": user.get("onboarding_step", 1),
-            "profile_complete": bool(user.get("name")),
-            "engagement_score": len(engagement.get("actions", [])) if engagement else 0
-        }
-        
-        return ApiResponse(
+        return api_response(
             success=True,
             message="Profile retrieved",
-            data=profile_data
+            data=build_profile(user)
         )
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error getting user profile: {str(e)}")
+        logger.error("Error getting user profile: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get user profile")
 
+@router.post("/profiles/batch", dependencies=[Depends(require_admin)])
+async def get_user_profiles_batch(
+    lookup: BatchEmailLookup,
+    db: AsyncIOMotorDatabase = Depends(get_db)
+):
+    """Get profiles for many users at once, streamed back as NDJSON"""
+    emails = unique_emails(lookup.emails)
+    if not emails:
+        raise HTTPException(status_code=400, detail="At least one email is required")
+    if len(emails) > MAX_BATCH_EMAILS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_EMAILS} emails per batch")
+    
+    return StreamingResponse(stream_profiles(db, emails), media_type=NDJSON_MEDIA_TYPE)
+
 @router.get("/community-stats")
-async def get_community_stats(db: AsyncIOMotorDatabase = Depends(get_db)):
-    """Get community statistics for display"""
+@db_budget(1)
+async def get_community_stats(
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    community_snapshot: CommunitySnapshot = Depends(get_community_snapshot)
+):
+    """Get community statistics for display (served from the in-memory snapshot)"""
     try:
-        # Get basic counts
-        total_members = await db.users.count_documents({})
-        total_votes = await db.voting_options.aggregate([
-            {"$group": {"_id": None, "total": {"$sum": "$votes"}}}
-        ]).to_list(1)
-        total_votes = total_votes[0]["total"] if total_votes else 0
-        
-        completed_tests = await db.sample_reports.count_documents({})
-        active_voting = await db.voting_options.count_documents({"status": "voting"})
+        snapshot = await community_snapshot.get(db)
         
-        # Get recent activity for community feed
-        recent_reports = await db.sample_reports.find().sort("created_at", -1).limit(3).to_list(3)
-        recent_activity = [
-            {
-                "type": "test_completed",
-                "message": f"New test: {report['product_name']} scored {report['purity_score']}/10",
-                "timestamp": report["created_at"]
-            }
-            for report in recent_reports
-        ]
-        
-        return ApiResponse(
+        return api_response(
             success=True,
             message="Community statistics retrieved",
-            data={
-                "total_members": total_members,
-                "total_votes_cast": total_votes,
-                "completed_tests": completed_tests,
-                "active_voting_options": active_voting,
-                "recent_activity": recent_activity
-            }
+            data=snapshot["community_stats"]
         )
         
     except Exception as e:
-        logger.error(f"Error getting community stats: {str(e)}")
+        logger.error("Error getting community stats: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get community statistics")
\ No newline at end of file
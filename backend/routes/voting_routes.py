@@ -1,6 +1,14 @@
 from fastapi import APIRouter, HTTPException, Depends
 from motor.motor_asyncio import AsyncIOMotorDatabase
-from models import VotingOption, CastVote, QuickSignup, User, ApiResponse
+from pymongo import ReturnDocument
+from models import VotingOption, CastVote, QuickSignup, User
+from services.responses import api_response
+from services.database import get_db
+from services.db_budget import db_budget
+from services.engagement import action_update
+from services.quota import consume_quota, refund_quota, quota_status
+from services.user_cache import get_user, invalidate_user
+from services.identity import normalize_email, EMAIL_COLLATION
 from typing import List
 import logging
 from datetime import datetime
@@ -9,11 +17,8 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/voting", tags=["Voting"])
 
-async def get_db():
-    from server import db
-    return db
-
 @router.get("/options")
+@db_budget(1)
 async def get_voting_options(
     status: str = "voting",
     db: AsyncIOMotorDatabase = Depends(get_db)
@@ -40,7 +45,7 @@ async def get_voting_options(
                 "status": option["status"]
             })
         
-        return ApiResponse(
+        return api_response(
             success=True,
             message=f"Retrieved {len(voting_options)} voting options",
             data={
@@ -50,10 +55,11 @@ async def get_voting_options(
         )
         
     except Exception as e:
-        logger.error(f"Error getting voting options: {str(e)}")
+        logger.error("Error getting voting options: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get voting options")
 
 @router.post("/cast-vote")
+@db_budget(5)
 async def cast_vote(
     vote_data: CastVote,
     db: AsyncIOMotorDatabase = Depends(get_db)
@@ -62,128 +68,122 @@ async def cast_vote(
     try:
         from bson import ObjectId
         
-        # Validate voting option exists
-        voting_option = await db.voting_options.find_one({"_id": ObjectId(vote_data.voting_option_id)})
+        option_id = ObjectId(vote_data.voting_option_id)
+        
+        # Validate voting option exists, fetching only this voter from the voters array
+        voting_option = await db.voting_options.find_one(
+            {"_id": option_id},
+            {"product_name": 1, "voters": {"$elemMatch": {"$eq": vote_data.email}}}
+        )
         if not voting_option:
             raise HTTPException(status_code=404, detail="Voting option not found")
         
         # Check if user already voted for this option
-        if vote_data.email in voting_option.get("voters", []):
+        if voting_option.get("voters"):
             raise HTTPException(status_code=400, detail="You have already voted for this option")
         
-        # Create or update user record (email-only initially)
-        user = await db.users.find_one({"email": vote_data.email})
-        if not user:
-            # Create new user with minimal data
-            new_user = {
-                "email": vote_data.email,
-                "role": "member",
-                "report_views_used": 0,
-                "report_views_limit": 3,
-                "votes_cast": 0,
-                "votes_limit": 5,
-                "forum_posts": 0,
-                "forum_posts_limit": 1,
-                "is_premium": False,
-                "trial_used": False,
-                "first_vote_date": datetime.utcnow(),
-                "last_active": datetime.utcnow(),
-                "onboarding_step": 3,  # Completed voting step
-                "created_at": datetime.utcnow()
-            }
-            
-            result = await db.users.insert_one(new_user)
-            user_id = str(result.inserted_id)
-            
-            # Send welcome email (implement email service)
-            # await send_welcome_email(vote_data.email)
-            
-        else:
-            user_id = str(user["_id"])
-            
-            # Update existing user
-            await db.users.update_one(
-                {"email": vote_data.email},
-                {
-                    "$set": {
-                        "last_active": datetime.utcnow(),
-                        "onboarding_step": max(user.get("onboarding_step", 1), 3)
-                    },
-                    "$inc": {"votes_cast": 1}
-                }
-            )
+        # Create or update user record (email-only initially) in one upsert
+        now = datetime.utcnow()
+        user = await db.users.find_one_and_update(
+            {"email": vote_data.email},
+            {
+                "$setOnInsert": {
+                    "email": vote_data.email,
+                    "role": "member",
+                    "report_views_used": 0,
+                    "report_views_limit": 3,
+                    "votes_cast": 0,
+                    "votes_limit": 5,
+                    "forum_posts": 0,
+                    "forum_posts_limit": 1,
+                    "is_premium": False,
+                    "trial_used": False,
+                    "first_vote_date": now,
+                    "created_at": now
+                },
+                "$set": {"last_active": now},
+                "$max": {"onboarding_step": 3}  # Completed voting step
+            },
+            projection={"_id": 1},
+            upsert=True,
+            collation=EMAIL_COLLATION,
+            return_document=ReturnDocument.BEFORE
+        )
+        invalidate_user(vote_data.email)
+        is_new_user = user is None
+        
+        # Send welcome email (implement email service)
+        # if is_new_user:
+        #     await send_welcome_email(vote_data.email)
         
-        # Check vote limits for non-premium users
-        current_user = await db.users.find_one({"email": vote_data.email})
-        if not current_user.get("is_premium", False):
-            if current_user.get("votes_cast", 0) >= current_user.get("votes_limit", 5):
-                raise HTTPException(
-                    status_code=403, 
-                    detail="Vote limit reached. Upgrade to premium for unlimited voting."
-                )
+        # Check the vote limit and count the vote in one atomic step
+        allowed, current_user = await consume_quota(db, vote_data.email, "votes")
+        if not allowed:
+            raise HTTPException(
+                status_code=403, 
+                detail="Vote limit reached. Upgrade to premium for unlimited voting."
+            )
         
-        # Update voting option
-        await db.voting_options.update_one(
-            {"_id": ObjectId(vote_data.voting_option_id)},
+        # Record the vote unless a concurrent request already did
+        updated_option = await db.voting_options.find_one_and_update(
+            {"_id": option_id, "voters": {"$ne": vote_data.email}},
             {
                 "$inc": {"votes": 1},
                 "$addToSet": {"voters": vote_data.email}
-            }
+            },
+            projection={"votes": 1},
+            return_document=ReturnDocument.AFTER
         )
+        if not updated_option:
+            await refund_quota(db, vote_data.email, "votes")
+            raise HTTPException(status_code=400, detail="You have already voted for this option")
         
         # Track engagement
         await db.user_engagement.update_one(
             {"email": vote_data.email},
-            {
-                "$set": {
-                    "cast_first_vote": True,
-                    "updated_at": datetime.utcnow()
+            action_update(
+                "cast_vote",
+                {
+                    "voting_option_id": vote_data.voting_option_id,
+                    "product_name": voting_option["product_name"]
                 },
-                "$push": {
-                    "actions": {
-                        "timestamp": datetime.utcnow(),
-                        "action": "cast_vote",
-                        "details": {
-                            "voting_option_id": vote_data.voting_option_id,
-                            "product_name": voting_option["product_name"]
-                        }
-                    }
-                }
-            },
-            upsert=True
+                set_fields={"cast_first_vote": True}
+            ),
+            upsert=True,
+            collation=EMAIL_COLLATION
         )
         
-        # Get updated voting option
-        updated_option = await db.voting_options.find_one({"_id": ObjectId(vote_data.voting_option_id)})
+        logger.info("Vote cast by %s for %s", vote_data.email, voting_option["product_name"])
         
-        logger.info(f"Vote cast by {vote_data.email} for {voting_option['product_name']}")
-        
-        return ApiResponse(
+        return api_response(
             success=True,
             message="Vote cast successfully! Welcome to ChoosePure community.",
             data={
-                "user_id": user_id,
+                "user_id": str(current_user["_id"]),
                 "email": vote_data.email,
                 "product_voted": voting_option["product_name"],
                 "total_votes": updated_option["votes"],
-                "is_new_user": user is None,
-                "votes_remaining": max(0, current_user.get("votes_limit", 5) - current_user.get("votes_cast", 0) - 1)
+                "is_new_user": is_new_user,
+                "votes_remaining": quota_status(current_user, "votes")["remaining"]
             }
         )
         
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error casting vote: {str(e)}")
+        logger.error("Error casting vote: %s", e)
         raise HTTPException(status_code=500, detail="Failed to cast vote")
 
 @router.get("/user-votes/{email}")
+@db_budget(2)
 async def get_user_votes(
     email: str,
     db: AsyncIOMotorDatabase = Depends(get_db)
 ):
     """Get voting history for a user"""
     try:
+        email = normalize_email(email)
+        
         # Find all voting options where user has voted
         user_votes = await db.voting_options.find(
             {"voters": email}
@@ -203,14 +203,14 @@ async def get_user_votes(
             })
         
         # Get user stats
-        user = await db.users.find_one({"email": email})
+        user = await get_user(db, email)
         user_stats = {
             "total_votes_cast": len(votes_history),
             "votes_remaining": max(0, user.get("votes_limit", 5) - user.get("votes_cast", 0)) if user else 5,
             "is_premium": user.get("is_premium", False) if user else False
         }
         
-        return ApiResponse(
+        return api_response(
             success=True,
             message="User votes retrieved",
             data={
@@ -220,10 +220,11 @@ async def get_user_votes(
         )
         
     except Exception as e:
-        logger.error(f"Error getting user votes: {str(e)}")
+        logger.error("Error getting user votes: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get user votes")
 
 @router.get("/stats")
+@db_budget(4)
 async def get_voting_stats(db: AsyncIOMotorDatabase = Depends(get_db)):
     """Get voting statistics"""
     try:
@@ -250,7 +251,7 @@ async def get_voting_stats(db: AsyncIOMotorDatabase = Depends(get_db)):
             all_voters.extend(option.get("voters", []))
         unique_voters = len(set(all_voters))
         
-        return ApiResponse(
+        return api_response(
             success=True,
             message="Voting statistics retrieved",
             data={
@@ -263,10 +264,11 @@ async def get_voting_stats(db: AsyncIOMotorDatabase = Depends(get_db)):
         )
         
     except Exception as e:
-        logger.error(f"Error getting voting stats: {str(e)}")
+        logger.error("Error getting voting stats: %s", e)
         raise HTTPException(status_code=500, detail="Failed to get voting statistics")
 
 @router.post("/quick-signup")
+@db_budget(3)
 async def quick_signup_for_voting(
     signup_data: QuickSignup,
     db: AsyncIOMotorDatabase = Depends(get_db)
@@ -274,9 +276,9 @@ async def quick_signup_for_voting(
     """Quick email-only signup for voting (alternative endpoint)"""
     try:
         # Check if user already exists
-        existing_user = await db.users.find_one({"email": signup_data.email})
+        existing_user = await get_user(db, signup_data.email)
         if existing_user:
-            return ApiResponse(
+            return api_response(
                 success=True,
                 message="Welcome back! You can now vote.",
                 data={
@@ -304,30 +306,20 @@ async def quick_signup_for_voting(
         }
         
         result = await db.users.insert_one(new_user)
+        invalidate_user(signup_data.email)
         user_id = str(result.inserted_id)
         
         # Track engagement
         await db.user_engagement.update_one(
             {"email": signup_data.email},
-            {
-                "$set": {
-                    "understood_process": True,
-                    "updated_at": datetime.utcnow()
-                },
-                "$push": {
-                    "actions": {
-                        "timestamp": datetime.utcnow(),
-                        "action": "quick_signup",
-                        "details": {"purpose": "voting"}
-                    }
-                }
-            },
-            upsert=True
+            action_update("quick_signup", {"purpose": "voting"}, set_fields={"understood_process": True}),
+            upsert=True,
+            collation=EMAIL_COLLATION
         )
         
-        logger.info(f"Quick signup completed for {signup_data.email}")
+        logger.info("Quick signup completed for %s", signup_data.email)
         
-        return ApiResponse(
+        return api_response(
             success=True,
             message="Welcome to ChoosePure! You can now vote for products to be tested.",
             data={
@@ -339,5 +331,5 @@ async def quick_signup_for_voting(
         )
         
     except Exception as e:
-        logger.error(f"Error in quick signup: {str(e)}")
+        logger.error("Error in quick signup: %s", e)
         raise HTTPException(status_code=500, detail="Failed to complete signup")
\ No newline at end of file
@@ -1,47 +1,162 @@
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, Depends, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 import os
+import asyncio
 import logging
+import signal
 from pathlib import Path
 
+# Load environment variables before importing modules that read their settings
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
 # Import simplified routes
 from routes import (
     onboarding_routes,
     sample_routes, 
     voting_routes,
     user_routes,
-    subscription_routes
+    subscription_routes,
+    admin_routes
 )
+from services.retention import RetentionSettings, run_compaction_job
+from services.scheduler import start_periodic
+from services.community import create_community_snapshot
+from services.subscriptions import ExpirySweepSettings, run_expiry_sweep_job
+from services.indexes import create_index_reconciler
+from services.health import create_database_health
+from services.database import DatabaseSettings, DatabaseProvider, get_db
+from services.db_budget import RoundTripListener, db_budget
+from services.metrics import METRICS_ENABLED, registry as metrics_registry, event_listeners as metrics_listeners
+from services.tiers import create_tier_catalogue
+from services.slow_queries import SlowQueryRecorder, SlowQuerySettings
+from middleware.request_scope import RequestScopeMiddleware
+from middleware.compression import CompressionMiddleware
+from middleware.metrics import MetricsMiddleware
+from middleware.db_budget import DbBudgetMiddleware
+from middleware.request_id import RequestIdMiddleware
+from services.log_pipeline import configure_logging
+
+# Configure logging: records are queued here and written by a background thread
+configure_logging()
+logger = logging.getLogger(__name__)
 
-# Load environment variables
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
-
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ.get('DB_NAME', 'choosepure_simplified')]
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Own the MongoDB client and background work for the lifetime of the app"""
+    logger.info("ChoosePure Simplified API starting up...")
+    # Services holding per-database state belong to this app, not the process
+    database_health = app.state.database_health = create_database_health()
+    slow_query_recorder = app.state.slow_query_recorder = SlowQueryRecorder(SlowQuerySettings())
+    index_reconciler = app.state.index_reconciler = create_index_reconciler()
+    tier_catalogue = app.state.tier_catalogue = create_tier_catalogue()
+    app.state.community_snapshot = create_community_snapshot()
+    provider = DatabaseProvider(
+        DatabaseSettings(),
+        event_listeners=[
+            database_health.pool_monitor, RoundTripListener(), slow_query_recorder, *metrics_listeners()
+        ]
+    )
+    db = provider.open()
+    app.state.db = db
+    slow_query_recorder.attach(db, asyncio.get_running_loop())
+    app.state.background_tasks = []
+    logger.info(f"Connected to database: {db.name}")
+    
+    # Build any missing indexes in the background rather than blocking startup
+    app.state.background_tasks.append(asyncio.create_task(
+        index_reconciler.reconcile(db), name="index_reconciliation"
+    ))
+    
+    # Load the subscription tier catalogue, serving the built-in tiers if the
+    # source is slow or down; SIGHUP reloads it without a restart
+    try:
+        await asyncio.wait_for(tier_catalogue.load(db), timeout=tier_catalogue.load_timeout_seconds)
+    except asyncio.TimeoutError:
+        logger.warning(
+            f"Subscription tiers not loaded within {tier_catalogue.load_timeout_seconds}s; "
+            "serving the built-in catalogue and retrying in the background"
+        )
+        app.state.background_tasks.append(tier_catalogue.reload_in_background(db))
+    try:
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGHUP, tier_catalogue.reload_in_background, db
+        )
+    except (NotImplementedError, AttributeError, RuntimeError):
+        logger.warning("Signal handlers unavailable; tier catalogue reload requires a restart")
+    
+    # Start scheduled maintenance jobs
+    start_background_jobs(app, db)
+    
+    app.state.ready = True
+    try:
+        yield
+    finally:
+        logger.info("Shutting down...")
+        app.state.ready = False
+        for task in app.state.background_tasks:
+            task.cancel()
+        await asyncio.gather(*app.state.background_tasks, return_exceptions=True)
+        slow_query_recorder.detach()
+        provider.close()
 
 # Create the main app
 app = FastAPI(
     title="ChoosePure Simplified API", 
     version="2.0.0",
-    description="Simplified user flow for ChoosePure platform"
+    description="Simplified user flow for ChoosePure platform",
+    lifespan=lifespan
 )
 
+# Set once startup has finished; reported by the readiness probe
+app.state.ready = False
+
 # Create API router
 api_router = APIRouter(prefix="/api/v2")
 
 # Health check
 @api_router.get("/")
+@db_budget(0)
 async def root():
     return {"message": "ChoosePure Simplified API is running", "version": "2.0.0"}
 
 @api_router.get("/health")
-async def health_check():
-    return {"status": "healthy", "database": "connected"}
+@db_budget(1)
+async def health_check(request: Request, db: AsyncIOMotorDatabase = Depends(get_db)):
+    database = await request.app.state.database_health.check(db)
+    return JSONResponse(
+        {"status": "healthy" if database["reachable"] else "unhealthy", "database": database},
+        status_code=200 if database["reachable"] else 503
+    )
+
+@api_router.get("/health/live")
+@db_budget(1)
+async def liveness_check(request: Request, db: AsyncIOMotorDatabase = Depends(get_db)):
+    """The process is up and serving requests; database state is reported, not enforced"""
+    return {"status": "alive", "database": await request.app.state.database_health.check(db)}
+
+@api_router.get("/health/ready")
+@db_budget(1)
+async def readiness_check(request: Request, db: AsyncIOMotorDatabase = Depends(get_db)):
+    """Startup has finished and the database answers within the latency thresholds"""
+    started = request.app.state.ready
+    database_health = request.app.state.database_health
+    database = await database_health.check(db)
+    ready = started and database_health.ready(database)
+    if not started:
+        status = "starting"
+    else:
+        status = "ready" if ready else "degraded"
+    body = {
+        "status": status,
+        "database": database,
+        "indexes": request.app.state.index_reconciler.status()
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
 
 # Include simplified route modules
 api_router.include_router(onboarding_routes.router)
@@ -49,10 +164,20 @@ api_router.include_router(sample_routes.router)
 api_router.include_router(voting_routes.router)
 api_router.include_router(user_routes.router)
 api_router.include_router(subscription_routes.router)
+api_router.include_router(admin_routes.router)
 
 # Include the router in the main app
 app.include_router(api_router)
 
+# Per-request user memo
+app.add_middleware(RequestScopeMiddleware)
+
+# Per-request Mongo round-trip counting and budget warnings
+app.add_middleware(DbBudgetMiddleware)
+
+# Gzip API payloads (threshold, content types and level from the environment)
+app.add_middleware(CompressionMiddleware)
+
 # CORS middleware - more permissive for development
 app.add_middleware(
     CORSMiddleware,
@@ -62,163 +187,46 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
-
-@app.on_event("startup")
-async def startup_event():
-    logger.info("ChoosePure Simplified API starting up...")
-    logger.info(f"Connected to database: {db.name}")
+# Outermost, so recorded latency covers every other middleware
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
     
-    # Create indexes for better performance
-    await create_indexes()
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus scrape endpoint"""
+        return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+# Request ID for log correlation, set before anything else runs
+app.add_middleware(RequestIdMiddleware)
+
+def start_background_jobs(app: FastAPI, db: AsyncIOMotorDatabase):
+    """Start periodic maintenance jobs for this worker"""
+    background_tasks = app.state.background_tasks
+    community_snapshot = app.state.community_snapshot
+    background_tasks.append(start_periodic(
+        "community_snapshot_refresh",
+        community_snapshot.refresh_seconds,
+        lambda: community_snapshot.refresh(db),
+        initial_delay=0
+    ))
     
-    # Seed sample data if needed
-    await seed_sample_data()
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    logger.info("Shutting down...")
-    client.close()
-
-async def create_indexes():
-    """Create database indexes for better performance"""
-    try:
-        # User indexes
-        await db.users.create_index("email", unique=True)
-        await db.users.create_index("created_at")
-        
-        # Voting indexes
-        await db.voting_options.create_index("status")
-        await db.voting_options.create_index("votes", background=True)
-        
-        # Engagement indexes
-        await db.user_engagement.create_index("email", unique=True)
-        await db.user_engagement.create_index("updated_at")
-        
-        # Sample reports indexes
-        await db.sample_reports.create_index("category")
-        await db.sample_reports.create_index("is_featured")
-        
-        logger.info("Database indexes created successfully")
-    except Exception as e:
-        logger.error(f"Error creating indexes: {str(e)}")
-
-async def seed_sample_data():
-    """Seed sample data for demonstration"""
-    try:
-        # Check if sample reports exist
-        sample_count = await db.sample_reports.count_documents({})
-        if sample_count == 0:
-            logger.info("Seeding sample reports...")
-            
-            sample_reports = [
-                {
-                    "product_name": "Amul Taaza Milk",
-                    "brand": "Amul",
-                    "category": "Dairy",
-                    "purity_score": 8.5,
-                    "test_date": "2024-01-15",
-                    "tested_by": "FSSAI Certified Lab - Mumbai",
-                    "image": "/images/amul-milk.jpg",
-                    "key_findings": [
-                        "No harmful additives detected",
-                        "Fat content matches label claims",
-                        "Safe bacterial levels",
-                        "No antibiotic residues"
-                    ],
-                    "safety_status": "Safe",
-                    "is_featured": True
-                },
-                {
-                    "product_name": "Parle-G Biscuits",
-                    "brand": "Parle",
-                    "category": "Snacks",
-                    "purity_score": 7.2,
-                    "test_date": "2024-01-10",
-                    "tested_by": "NABL Certified Lab - Delhi",
-                    "image": "/images/parle-g.jpg",
-                    "key_findings": [
-                        "Trans fat within safe limits",
-                        "Sugar content as per label",
-                        "No harmful preservatives",
-                        "Slight excess sodium detected"
-                    ],
-                    "safety_status": "Caution",
-                    "is_featured": True
-                },
-                {
-                    "product_name": "Mother Dairy Butter",
-                    "brand": "Mother Dairy",
-                    "category": "Dairy",
-                    "purity_score": 9.1,
-                    "test_date": "2024-01-20",
-                    "tested_by": "FSSAI Certified Lab - Bangalore",
-                    "image": "/images/mother-dairy-butter.jpg",
-                    "key_findings": [
-                        "100% pure milk fat",
-                        "No artificial colors",
-                        "Excellent quality standards",
-                        "No harmful additives"
-                    ],
-                    "safety_status": "Safe",
-                    "is_featured": True
-                }
-            ]
-            
-            await db.sample_reports.insert_many(sample_reports)
-            logger.info("Sample reports seeded successfully")
-        
-        # Check if voting options exist
-        voting_count = await db.voting_options.count_documents({})
-        if voting_count == 0:
-            logger.info("Seeding voting options...")
-            
-            voting_options = [
-                {
-                    "product_name": "Maggi Noodles",
-                    "category": "Instant Food",
-                    "description": "Test for MSG, lead content, and preservatives in popular instant noodles",
-                    "votes": 245,
-                    "funding_raised": 12000,
-                    "funding_target": 15000,
-                    "estimated_test_date": "2024-02-15",
-                    "status": "voting",
-                    "voters": []
-                },
-                {
-                    "product_name": "Britannia Bread",
-                    "category": "Bakery",
-                    "description": "Check for harmful preservatives and gluten quality in packaged bread",
-                    "votes": 189,
-                    "funding_raised": 8500,
-                    "funding_target": 12000,
-                    "estimated_test_date": "2024-02-20",
-                    "status": "voting",
-                    "voters": []
-                },
-                {
-                    "product_name": "Amul Cheese",
-                    "category": "Dairy",
-                    "description": "Verify milk quality and check for artificial additives in processed cheese",
-                    "votes": 156,
-                    "funding_raised": 6200,
-                    "funding_target": 10000,
-                    "estimated_test_date": "2024-02-25",
-                    "status": "voting",
-                    "voters": []
-                }
-            ]
-            
-            await db.voting_options.insert_many(voting_options)
-            logger.info("Voting options seeded successfully")
-            
-    except Exception as e:
-        logger.error(f"Error seeding sample data: {str(e)}")
+    sweep_settings = ExpirySweepSettings()
+    if sweep_settings.interval_seconds > 0:
+        background_tasks.append(start_periodic(
+            "subscription_expiry_sweep",
+            sweep_settings.interval_seconds,
+            lambda: run_expiry_sweep_job(db, sweep_settings),
+            initial_delay=0
+        ))
+    
+    retention_settings = RetentionSettings()
+    if retention_settings.interval_hours > 0:
+        background_tasks.append(start_periodic(
+            "engagement_compaction",
+            retention_settings.interval_hours * 3600,
+            lambda: run_compaction_job(db, retention_settings),
+            initial_delay=300
+        ))
 
 if __name__ == "__main__":
     import uvicorn
@@ -227,5 +235,5 @@ if __name__ == "__main__":
     # Get port from environment variable (for production deployment)
     port = int(os.environ.get("PORT", 8001))
     
-    # Run the server
-    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
+    # Run the server; log_config=None sends uvicorn's logs through the same queue
+    uvicorn.run(app, host="0.0.0.0", port=port, log_config=None)
\ No newline at end of file
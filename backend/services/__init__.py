@@ -0,0 +1 @@
+# Shared services package
\ No newline at end of file
@@ -0,0 +1,15 @@
+from fastapi import HTTPException, Header
+from typing import Optional
+import hmac
+import os
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Dependency guarding admin and bulk lookup endpoints with the ADMIN_TOKEN shared secret.
+
+    They are disabled (404) while no token is configured.
+    """
+    admin_token = os.environ.get("ADMIN_TOKEN", "")
+    if not admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
\ No newline at end of file
@@ -0,0 +1,11 @@
+from typing import List
+import os
+
+# Upper bound on emails accepted by the batch lookup endpoints
+MAX_BATCH_EMAILS = int(os.environ.get("BATCH_LOOKUP_MAX_EMAILS", 5000))
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def unique_emails(emails: List[str]) -> List[str]:
+    """Drop blanks and duplicates while keeping the caller's order"""
+    return list(dict.fromkeys(email for email in emails if email))
\ No newline at end of file
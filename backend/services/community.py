@@ -0,0 +1,106 @@
+from fastapi import Request
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Dict, Any, Optional
+import asyncio
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+class CommunitySnapshot:
+    """Background-refreshed community data that is identical for every user, one per app"""
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._data: Optional[Dict[str, Any]] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def age_seconds(self) -> float:
+        return time.monotonic() - self._loaded_at
+
+    def _is_usable(self) -> bool:
+        # Serve from memory while the background refresher keeps up; only fall
+        # back to an inline reload if it has missed several refreshes
+        return self._data is not None and self.age_seconds < self.refresh_seconds * 3
+
+    async def get(self, db: AsyncIOMotorDatabase) -> Dict[str, Any]:
+        """Return the in-memory snapshot, loading it inline only on a cold start"""
+        if self._is_usable():
+            return self._data
+
+        async with self._lock:
+            # Concurrent callers wait for a single reload instead of stampeding Mongo
+            if not self._is_usable():
+                await self._reload(db)
+        return self._data
+
+    async def refresh(self, db: AsyncIOMotorDatabase):
+        """Reload the snapshot; called periodically by the background refresher"""
+        async with self._lock:
+            try:
+                await self._reload(db)
+            except Exception as e:
+                if self._data is None:
+                    raise
+                # Keep serving the previous snapshot
+                logger.error(f"Error refreshing community snapshot: {str(e)}")
+
+    async def _reload(self, db: AsyncIOMotorDatabase):
+        self._data = await self._load(db)
+        self._loaded_at = time.monotonic()
+
+    async def _load(self, db: AsyncIOMotorDatabase) -> Dict[str, Any]:
+        (
+            recent_reports,
+            top_votes,
+            total_members,
+            total_votes,
+            completed_tests,
+            active_voting
+        ) = await asyncio.gather(
+            db.sample_reports.find(
+                {}, {"product_name": 1, "purity_score": 1, "created_at": 1}
+            ).sort("created_at", -1).limit(3).to_list(3),
+            db.voting_options.find(
+                {"status": "voting"}, {"product_name": 1, "votes": 1}
+            ).sort("votes", -1).limit(2).to_list(2),
+            # Collection metadata counts instead of scanning the collections
+            db.users.estimated_document_count(),
+            db.voting_options.aggregate([
+                {"$group": {"_id": None, "total": {"$sum": "$votes"}}}
+            ]).to_list(1),
+            db.sample_reports.estimated_document_count(),
+            db.voting_options.count_documents({"status": "voting"})
+        )
+
+        return {
+            "recent_reports": recent_reports,
+            "top_votes": top_votes,
+            "total_members": total_members,
+            "community_stats": {
+                "total_members": total_members,
+                "total_votes_cast": total_votes[0]["total"] if total_votes else 0,
+                "completed_tests": completed_tests,
+                "active_voting_options": active_voting,
+                "recent_activity": [
+                    {
+                        "type": "test_completed",
+                        "message": f"New test: {report['product_name']} scored {report['purity_score']}/10",
+                        "timestamp": report["created_at"]
+                    }
+                    for report in recent_reports
+                ]
+            }
+        }
+
+def create_community_snapshot() -> CommunitySnapshot:
+    return CommunitySnapshot(
+        refresh_seconds=float(os.environ.get("COMMUNITY_SNAPSHOT_REFRESH_SECONDS", 30))
+    )
+
+def get_community_snapshot(request: Request) -> CommunitySnapshot:
+    """Dependency returning the community snapshot of the app serving the request"""
+    return request.app.state.community_snapshot
\ No newline at end of file
@@ -0,0 +1,111 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Dict, Any, List, Optional
+import asyncio
+import logging
+from datetime import datetime
+
+from services.community import CommunitySnapshot
+from services.user_cache import get_user
+
+logger = logging.getLogger(__name__)
+
+# Voting option fields shown on the dashboard - never the voters array
+VOTE_FIELDS = {
+    "product_name": 1,
+    "status": 1,
+    "votes": 1,
+    "funding_raised": 1,
+    "funding_target": 1
+}
+
+async def assemble_dashboard(
+    db: AsyncIOMotorDatabase,
+    email: str,
+    community_snapshot: CommunitySnapshot
+) -> Optional[Dict[str, Any]]:
+    """Fetch everything the user dashboard needs concurrently and build the payload.
+
+    The per-user queries run in parallel; the community pieces come from the
+    shared snapshot. Returns None when the user does not exist.
+    """
+    user, user_votes, community = await asyncio.gather(
+        get_user(db, email),
+        db.voting_options.find({"voters": email}, VOTE_FIELDS).to_list(length=100),
+        community_snapshot.get(db)
+    )
+    if not user:
+        return None
+
+    return build_dashboard(user, user_votes, community)
+
+def build_dashboard(user: Dict[str, Any], user_votes: List[Dict[str, Any]], community: Dict[str, Any]) -> Dict[str, Any]:
+    """Build dashboard data from the user, their votes and the community snapshot"""
+    tests_influenced = len([v for v in user_votes if v["status"] in ["funded", "testing", "completed"]])
+
+    # Get recent community activity
+    recent_activity = []
+
+    # Recent test completions
+    for test in community["recent_reports"]:
+        recent_activity.append({
+            "type": "test_completed",
+            "message": f"New test result: {test['product_name']} ({test['purity_score']}/10)",
+            "timestamp": test["created_at"]
+        })
+
+    # Recent voting activity
+    for vote in community["top_votes"]:
+        recent_activity.append({
+            "type": "voting_update",
+            "message": f"Trending vote: {vote['product_name']} ({vote['votes']} votes)",
+            "timestamp": datetime.utcnow()
+        })
+
+    # Sort by timestamp
+    recent_activity.sort(key=lambda x: x["timestamp"], reverse=True)
+
+    return {
+        "user_info": {
+            "email": user["email"],
+            "name": user.get("name"),
+            "member_since": user["created_at"],
+            "last_active": user.get("last_active"),
+            "onboarding_step": user.get("onboarding_step", 1)
+        },
+        "stats": {
+            "votes_cast": len(user_votes),
+            "tests_influenced": tests_influenced,
+            "community_impact": community["total_members"],  # Simplified metric
+            "report_views_remaining": max(0, user.get("report_views_limit", 3) - user.get("report_views_used", 0)),
+            "is_premium": user.get("is_premium", False)
+        },
+        "recent_votes": [
+            {
+                "product_name": vote["product_name"],
+                "status": vote["status"],
+                "votes": vote["votes"],
+                "funding_progress": round((vote["funding_raised"] / vote["funding_target"]) * 100, 1)
+            }
+            for vote in user_votes[:5]
+        ],
+        "recent_activity": recent_activity[:5],
+        "limits": {
+            "report_views": {
+                "used": user.get("report_views_used", 0),
+                "limit": user.get("report_views_limit", 3),
+                "remaining": max(0, user.get("report_views_limit", 3) - user.get("report_views_used", 0))
+            },
+            "votes": {
+                "used": user.get("votes_cast", 0),
+                "limit": user.get("votes_limit", 5),
+                "remaining": max(0, user.get("votes_limit", 5) - user.get("votes_cast", 0))
+            }
+        },
+        "upgrade_prompt": {
+            "show": not user.get("is_premium", False) and (
+                user.get("report_views_used", 0) >= user.get("report_views_limit", 3) or
+                user.get("votes_cast", 0) >= user.get("votes_limit", 5)
+            ),
+            "reason": "free_limit_reached" if user.get("report_views_used", 0) >= user.get("report_views_limit", 3) else "vote_limit_reached"
+        }
+    }
\ No newline at end of file
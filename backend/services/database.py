@@ -0,0 +1,57 @@
+from fastapi import Request
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from typing import Dict, Any, Optional, Sequence
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+class DatabaseSettings:
+    """MongoDB connection and pool configuration, read from the environment"""
+
+    def __init__(self):
+        self.mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+        self.db_name = os.environ.get('DB_NAME', 'choosepure_simplified')
+        self.max_pool_size = int(os.environ.get("MONGO_MAX_POOL_SIZE", 100))
+        self.min_pool_size = int(os.environ.get("MONGO_MIN_POOL_SIZE", 0))
+        # 0 keeps idle connections open indefinitely (the driver default)
+        self.max_idle_time_ms = int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", 0))
+        # Comma-separated, in order of preference, e.g. "zstd,snappy,zlib"
+        self.compressors = os.environ.get("MONGO_COMPRESSORS", "")
+
+    def client_options(self) -> Dict[str, Any]:
+        options: Dict[str, Any] = {
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size
+        }
+        if self.max_idle_time_ms:
+            options["maxIdleTimeMS"] = self.max_idle_time_ms
+        if self.compressors:
+            options["compressors"] = self.compressors
+        return options
+
+class DatabaseProvider:
+    """Owns the Motor client for one app instance, opened and closed by its lifespan"""
+
+    def __init__(self, settings: DatabaseSettings, event_listeners: Sequence = ()):
+        self.settings = settings
+        self.event_listeners = list(event_listeners)
+        self.client: Optional[AsyncIOMotorClient] = None
+
+    def open(self) -> AsyncIOMotorDatabase:
+        self.client = AsyncIOMotorClient(
+            self.settings.mongo_url,
+            event_listeners=self.event_listeners,
+            **self.settings.client_options()
+        )
+        logger.info(f"MongoDB client opened with {self.settings.client_options()}")
+        return self.client[self.settings.db_name]
+
+    def close(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+def get_db(request: Request) -> AsyncIOMotorDatabase:
+    """Dependency returning the database of the app serving the request"""
+    return request.app.state.db
\ No newline at end of file
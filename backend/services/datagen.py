@@ -0,0 +1,379 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+import bisect
+import itertools
+import logging
+import math
+import random
+from bson import ObjectId
+from datetime import datetime, timedelta, timezone
+
+from services.engagement import COUNTERS_VERSION
+from services.ids import order_id_at
+from services.payments import ORDER_APPLIED, ORDER_PENDING, pending_order_expiry
+from services.tiers import DEFAULT_TIERS
+
+logger = logging.getLogger(__name__)
+
+GENERATED_COLLECTIONS = ["users", "user_engagement", "voting_options", "sample_reports", "pending_orders"]
+
+CATEGORIES = ["Dairy", "Snacks", "Bakery", "Beverages", "Staples", "Spices", "Oils", "Sweeteners"]
+
+# Relative frequency of actions in generated engagement histories
+ACTION_WEIGHTS = {
+    "view_sample_reports": 30,
+    "view_report": 25,
+    "view_dashboard": 15,
+    "view_how_it_works": 8,
+    "cast_vote": 10,
+    "page_view": 10,
+    "hit_free_limit": 2
+}
+
+FUNNEL_FLAGS = {
+    "view_sample_reports": "viewed_samples",
+    "view_how_it_works": "understood_process",
+    "cast_vote": "cast_first_vote",
+    "view_dashboard": "explored_dashboard",
+    "hit_free_limit": "hit_free_limit"
+}
+
+PAGES = ["home", "reports", "voting", "dashboard", "pricing"]
+
+# Default point in time that generated timestamps are offsets from; fixed so the
+# same spec gives the same data on any day
+DEFAULT_ANCHOR = datetime(2026, 1, 1)
+
+# The voters array lives inside the option document, which is capped at 16MB
+MAX_VOTERS_PER_OPTION = 250_000
+
+_TIERS = {tier["id"]: tier for tier in DEFAULT_TIERS}
+
+class DataGenSpec:
+    """Shape of a synthetic dataset.
+
+    The same spec always generates the same documents, `_id`s included:
+    every random draw comes from RNGs seeded with `seed`, and timestamps
+    are offsets from `anchor` (DEFAULT_ANCHOR unless given).
+    """
+
+    def __init__(
+        self,
+        users: int = 1_000_000,
+        options: int = 50,
+        reports: int = 200,
+        seed: int = 1,
+        anchor: Optional[datetime] = None,
+        domain: str = "synthetic.example",
+        votes_mean: float = 2.0,
+        zipf_exponent: float = 1.1,
+        voters_per_option: Optional[int] = None,
+        history_mean: float = 40,
+        history_max: int = 2000,
+        premium_active: float = 0.08,
+        premium_expired: float = 0.03,
+        premium_lapsed: float = 0.05,
+        trial_share: float = 0.3,
+        pending_orders: int = 1000,
+        batch_size: int = 5000
+    ):
+        self.users = users
+        self.options = options
+        self.reports = reports
+        self.seed = seed
+        self.anchor = anchor or DEFAULT_ANCHOR
+        self.domain = domain
+        self.votes_mean = votes_mean
+        self.zipf_exponent = zipf_exponent
+        # Fixed voter count per option (voters user0..userN-1) instead of Zipf-distributed votes
+        self.voters_per_option = voters_per_option
+        self.history_mean = history_mean
+        self.history_max = history_max
+        self.premium_active = premium_active
+        self.premium_expired = premium_expired
+        self.premium_lapsed = premium_lapsed
+        self.trial_share = trial_share
+        self.pending_orders = pending_orders
+        self.batch_size = batch_size
+
+    def email(self, i: int) -> str:
+        return f"user{i}@{self.domain}"
+
+    def rng(self, stream: str) -> random.Random:
+        """Independent RNG per stream, so changing one distribution leaves the others as they were"""
+        return random.Random(f"{self.seed}-{stream}")
+
+    @property
+    def fixed_voters(self) -> int:
+        """Voters per option when `voters_per_option` is set, bounded by the users that exist"""
+        return min(self.voters_per_option or 0, self.users, MAX_VOTERS_PER_OPTION)
+
+def _object_id(rng: random.Random, created_at: datetime) -> ObjectId:
+    """ObjectId with `created_at` as its timestamp and the rest drawn from `rng`"""
+    seconds = int(created_at.replace(tzinfo=timezone.utc).timestamp())
+    return ObjectId(seconds.to_bytes(4, "big") + rng.getrandbits(64).to_bytes(8, "big"))
+
+def zipf_cumulative_weights(count: int, exponent: float) -> List[float]:
+    """Cumulative weights where rank r (from 1) has weight 1 / r^exponent"""
+    return list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+def _pick_distinct(rng: random.Random, cumulative: List[float], k: int) -> List[int]:
+    total = cumulative[-1]
+    picked: List[int] = []
+    while len(picked) < k:
+        choice = bisect.bisect_left(cumulative, rng.random() * total)
+        if choice not in picked:
+            picked.append(choice)
+    return picked
+
+def _subscription(spec: DataGenSpec, rng: random.Random, created_at: datetime) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """User subscription fields, and the paid order behind them if any"""
+    draw = rng.random()
+    if draw < spec.premium_active + spec.premium_expired:
+        # Expired subscriptions are still flagged premium until the sweeper catches them
+        expires = spec.anchor + timedelta(days=rng.randrange(1, 365)) if draw < spec.premium_active \
+            else spec.anchor - timedelta(minutes=rng.randrange(1, 7 * 24 * 60))
+        fields = {"is_premium": True, "subscription_expires": expires, "trial_used": True}
+        if rng.random() < spec.trial_share:
+            return fields, None
+        tier = _TIERS["premium_annual"] if rng.random() < 0.25 else _TIERS["premium"]
+        paid_at = max(created_at, expires - timedelta(days=tier["duration_days"]))
+        order_id = order_id_at(paid_at - timedelta(minutes=5), rng.getrandbits(80))
+        fields["applied_orders"] = [order_id]
+        order = {
+            "_id": order_id,
+            "order_id": order_id,
+            "tier_id": tier["id"],
+            "amount": tier["price"],
+            "duration_days": tier["duration_days"],
+            "status": ORDER_APPLIED,
+            "payment_id": f"pay_{order_id[-16:]}",
+            "created_at": paid_at - timedelta(minutes=5),
+            "paid_at": paid_at,
+            "applied_at": paid_at
+        }
+        return fields, order
+    if draw < spec.premium_active + spec.premium_expired + spec.premium_lapsed:
+        # Swept: downgraded after the trial or subscription ran out
+        return {"is_premium": False, "subscription_expires": None, "trial_used": True}, None
+    return {"is_premium": False, "subscription_expires": None, "trial_used": False}, None
+
+def _history(spec: DataGenSpec, rng: random.Random, created_at: datetime, votes: int) -> Dict[str, Any]:
+    """Engagement summary with a long-tailed (log-normal) action history"""
+    length = min(spec.history_max, max(1, int(rng.lognormvariate(math.log(spec.history_mean) - 0.5, 1.0))))
+    span = max(60, int((spec.anchor - created_at).total_seconds()))
+    offsets = sorted(rng.randrange(span) for _ in range(length))
+    names = rng.choices(list(ACTION_WEIGHTS), weights=list(ACTION_WEIGHTS.values()), k=length)
+    # One cast_vote action per recorded vote
+    names[:votes] = ["cast_vote"] * min(votes, length)
+    rng.shuffle(names)
+
+    actions = []
+    action_counts: Dict[str, int] = {}
+    page_views: Dict[str, int] = {}
+    for offset, name in zip(offsets, names):
+        details: Dict[str, Any] = {}
+        if name == "page_view":
+            page = rng.choice(PAGES)
+            details = {"page": page}
+            page_views[page] = page_views.get(page, 0) + 1
+        actions.append({"timestamp": created_at + timedelta(seconds=offset), "action": name, "details": details})
+        action_counts[name] = action_counts.get(name, 0) + 1
+
+    summary = {
+        "actions": actions,
+        "action_count": length,
+        "action_counts": action_counts,
+        "page_views": page_views,
+        "counters_version": COUNTERS_VERSION,
+        "created_at": created_at,
+        "updated_at": actions[-1]["timestamp"]
+    }
+    for action, flag in FUNNEL_FLAGS.items():
+        summary[flag] = action in action_counts
+    return summary
+
+def _users(spec: DataGenSpec, voters: List[List[int]]) -> Iterator[Tuple[Dict[str, Any], Dict[str, Any], Optional[Dict[str, Any]]]]:
+    """(user, engagement, paid order) per user; records Zipf votes into `voters` as it goes"""
+    profile_rng = spec.rng("users")
+    vote_rng = spec.rng("votes")
+    subscription_rng = spec.rng("subscriptions")
+    history_rng = spec.rng("engagement")
+    id_rng = spec.rng("user_ids")
+    cumulative = zipf_cumulative_weights(spec.options, spec.zipf_exponent) if spec.options else []
+
+    for i in range(spec.users):
+        email = spec.email(i)
+        created_at = spec.anchor - timedelta(minutes=profile_rng.randrange(60, 3 * 365 * 24 * 60))
+        subscription, order = _subscription(spec, subscription_rng, created_at)
+
+        votes = 0
+        limit = spec.options if subscription["is_premium"] else min(5, spec.options)
+        if spec.voters_per_option is None and cumulative:
+            wanted = min(limit, int(round(vote_rng.expovariate(1 / spec.votes_mean)))) if spec.votes_mean else 0
+            for option in _pick_distinct(vote_rng, cumulative, wanted):
+                if len(voters[option]) < MAX_VOTERS_PER_OPTION:
+                    voters[option].append(i)
+                    votes += 1
+        elif spec.voters_per_option is not None:
+            # Capped at the free tier's votes_limit like real votes, although the
+            # user is in every option's voters array
+            votes = limit if i < spec.fixed_voters else 0
+
+        views_used = profile_rng.randrange(0, 4)
+        user = {
+            "_id": _object_id(id_rng, created_at),
+            "email": email,
+            "name": f"User {i}" if profile_rng.random() < 0.6 else None,
+            "role": "member",
+            "report_views_used": 0 if subscription["is_premium"] else views_used,
+            "report_views_limit": 3,
+            "votes_cast": votes,
+            "votes_limit": 5,
+            "forum_posts": 0,
+            "forum_posts_limit": 1,
+            **subscription,
+            "onboarding_step": profile_rng.choice([1, 2, 3, 4, 4, 999]),
+            "first_vote_date": created_at if votes else None,
+            "created_at": created_at,
+            "last_active": min(spec.anchor, created_at + timedelta(days=profile_rng.randrange(0, 90)))
+        }
+        engagement = {"_id": _object_id(id_rng, created_at), "email": email, **_history(spec, history_rng, created_at, votes)}
+        if subscription["trial_used"]:
+            engagement["started_trial"] = True
+        if order is not None:
+            order["email"] = email
+            engagement["converted_to_paid"] = True
+        yield user, engagement, order
+
+def _reports(spec: DataGenSpec) -> Iterator[Dict[str, Any]]:
+    rng = spec.rng("reports")
+    id_rng = spec.rng("report_ids")
+    for i in range(spec.reports):
+        created_at = spec.anchor - timedelta(days=spec.reports - i)
+        yield {
+            "_id": _object_id(id_rng, created_at),
+            "product_name": f"Product {i}",
+            "brand": f"Brand {i % 40}",
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "purity_score": round(rng.uniform(4, 10), 1),
+            "test_date": created_at.strftime("%Y-%m-%d"),
+            "tested_by": "FSSAI Certified Lab - Mumbai",
+            "image": f"/images/product-{i}.jpg",
+            "key_findings": rng.sample([
+                "No harmful additives detected",
+                "Fat content matches label claims",
+                "Safe bacterial levels",
+                "No antibiotic residues",
+                "Trace preservatives found",
+                "Sugar content higher than labelled"
+            ], 3),
+            "safety_status": rng.choice(["Safe", "Safe", "Safe", "Caution"]),
+            "is_featured": i >= spec.reports - 3,
+            "created_at": created_at
+        }
+
+def _voting_option(spec: DataGenSpec, rng: random.Random, id_rng: random.Random, i: int, voter_ids) -> Dict[str, Any]:
+    funding_target = rng.choice([10000, 15000, 25000])
+    created_at = spec.anchor - timedelta(days=60)
+    return {
+        "_id": _object_id(id_rng, created_at),
+        "product_name": f"Option {i}",
+        "category": CATEGORIES[i % len(CATEGORIES)],
+        "description": f"Community-requested test of option {i}",
+        "votes": len(voter_ids),
+        "voters": [spec.email(v) for v in voter_ids],
+        "funding_raised": rng.randrange(0, funding_target),
+        "funding_target": funding_target,
+        "estimated_test_date": (spec.anchor + timedelta(days=14 + i)).strftime("%Y-%m-%d"),
+        "status": "voting",
+        "created_at": created_at
+    }
+
+def _pending_orders(spec: DataGenSpec) -> Iterator[Dict[str, Any]]:
+    """Recent unpaid orders, which the TTL index removes as they expire"""
+    rng = spec.rng("pending_orders")
+    for _ in range(min(spec.pending_orders, spec.users)):
+        created_at = spec.anchor - timedelta(seconds=rng.randrange(0, 3600))
+        tier = _TIERS[rng.choice(["premium", "premium_annual"])]
+        order_id = order_id_at(created_at, rng.getrandbits(80))
+        yield {
+            "_id": order_id,
+            "order_id": order_id,
+            "email": spec.email(rng.randrange(spec.users)),
+            "tier_id": tier["id"],
+            "amount": tier["price"],
+            "duration_days": tier["duration_days"],
+            "status": ORDER_PENDING,
+            "created_at": created_at,
+            "expires_at": pending_order_expiry(created_at)
+        }
+
+class _BatchWriter:
+    """Buffers documents per collection and flushes them with insert_many"""
+
+    def __init__(self, db: AsyncIOMotorDatabase, batch_size: int):
+        self.db = db
+        self.batch_size = batch_size
+        self.buffers: Dict[str, List[Dict[str, Any]]] = {}
+        self.counts: Dict[str, int] = {}
+
+    async def add(self, collection: str, document: Dict[str, Any]):
+        buffer = self.buffers.setdefault(collection, [])
+        buffer.append(document)
+        if len(buffer) >= self.batch_size:
+            await self.flush(collection)
+
+    async def flush(self, collection: Optional[str] = None):
+        for name in [collection] if collection else list(self.buffers):
+            buffer = self.buffers.get(name)
+            if buffer:
+                await self.db[name].insert_many(buffer, ordered=False)
+                self.counts[name] = self.counts.get(name, 0) + len(buffer)
+                self.buffers[name] = []
+
+async def generate_dataset(db: AsyncIOMotorDatabase, spec: DataGenSpec, drop: bool = False) -> Dict[str, int]:
+    """Bulk-load a synthetic dataset; returns documents inserted per collection.
+
+    Refuses to write into a non-empty users collection unless `drop` is set,
+    in which case every generated collection is dropped first. Indexes are
+    left to the index reconciler, which is cheaper after the load than
+    during it.
+    """
+    if drop:
+        for name in GENERATED_COLLECTIONS:
+            await db[name].drop()
+    elif await db.users.estimated_document_count():
+        raise ValueError(f"{db.name}.users is not empty; drop it first to generate into this database")
+
+    writer = _BatchWriter(db, spec.batch_size)
+    if spec.voters_per_option is not None:
+        voters = [range(spec.fixed_voters)] * spec.options
+    else:
+        voters = [[] for _ in range(spec.options)]
+
+    for generated, (user, engagement, order) in enumerate(_users(spec, voters), start=1):
+        await writer.add("users", user)
+        await writer.add("user_engagement", engagement)
+        if order is not None:
+            await writer.add("pending_orders", order)
+        if generated % 100_000 == 0:
+            logger.info(f"Generated {generated} of {spec.users} users")
+
+    for report in _reports(spec):
+        await writer.add("sample_reports", report)
+    for order in _pending_orders(spec):
+        await writer.add("pending_orders", order)
+    await writer.flush()
+
+    # Large voter arrays make each option a large document; write them one at a time
+    option_rng = spec.rng("options")
+    option_id_rng = spec.rng("option_ids")
+    for i, voter_ids in enumerate(voters):
+        await db.voting_options.insert_one(_voting_option(spec, option_rng, option_id_rng, i, voter_ids))
+    writer.counts["voting_options"] = spec.options
+
+    logger.info(
+        "Generated " + ", ".join(f"{count} {name}" for name, count in sorted(writer.counts.items()))
+    )
+    return writer.counts
\ No newline at end of file
@@ -0,0 +1,87 @@
+from pymongo import monitoring
+from contextvars import ContextVar, Token
+from typing import Callable, Dict, Optional, Tuple
+import os
+import threading
+
+from services.metrics import command_collection
+
+# Debug mode sends the per-request counters back as response headers
+DEBUG = os.environ.get("DEBUG", "false").lower() in ("1", "true", "yes")
+
+# Repeats of the same command on the same collection within one request
+# that are reported as a likely N+1 query pattern
+N_PLUS_ONE_THRESHOLD = int(os.environ.get("DB_N_PLUS_ONE_THRESHOLD", 5))
+
+ROUND_TRIPS_HEADER = "x-db-round-trips"
+DB_TIME_HEADER = "x-db-time-ms"
+BUDGET_HEADER = "x-db-round-trip-budget"
+
+def db_budget(round_trips: int) -> Callable:
+    """Declare how many Mongo round trips an endpoint may issue per request"""
+    def decorate(endpoint: Callable) -> Callable:
+        endpoint.__db_budget__ = round_trips
+        return endpoint
+    return decorate
+
+def route_budget(route) -> Optional[int]:
+    """Budget declared on a matched route's endpoint, if any"""
+    return getattr(getattr(route, "endpoint", None), "__db_budget__", None)
+
+class RequestDbStats:
+    """Mongo commands issued while serving one request.
+
+    Updated from driver threads, hence the lock.
+    """
+
+    def __init__(self):
+        self.round_trips = 0
+        self.duration_micros = 0
+        self.commands: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def started(self, command_name: str, collection: str):
+        with self._lock:
+            self.round_trips += 1
+            key = (command_name, collection)
+            self.commands[key] = self.commands.get(key, 0) + 1
+
+    def finished(self, duration_micros: int):
+        with self._lock:
+            self.duration_micros += duration_micros
+
+    def repeated_commands(self) -> Dict[Tuple[str, str], int]:
+        """Commands repeated often enough to suggest an N+1 pattern (cursor batches excluded)"""
+        return {
+            key: count for key, count in self.commands.items()
+            if count >= N_PLUS_ONE_THRESHOLD and key[0] != "getMore"
+        }
+
+# Motor runs driver calls in executor threads with a copy of the caller's
+# context, so the listener sees the stats object of the request that issued them
+_request_stats: ContextVar[Optional[RequestDbStats]] = ContextVar("request_db_stats", default=None)
+
+def begin_request_stats() -> Tuple[RequestDbStats, Token]:
+    stats = RequestDbStats()
+    return stats, _request_stats.set(stats)
+
+def end_request_stats(token: Token):
+    _request_stats.reset(token)
+
+class RoundTripListener(monitoring.CommandListener):
+    """Attributes every Mongo command to the request that issued it"""
+
+    def started(self, event):
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.started(event.command_name, command_collection(event.command_name, event.command))
+
+    def succeeded(self, event):
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.finished(event.duration_micros)
+
+    def failed(self, event):
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.finished(event.duration_micros)
\ No newline at end of file
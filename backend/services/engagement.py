@@ -0,0 +1,139 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Dict, Any, Optional
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Fields read by the journey endpoint - everything except the raw action history
+JOURNEY_FIELDS = {
+    "_id": 0,
+    "viewed_samples": 1,
+    "understood_process": 1,
+    "cast_first_vote": 1,
+    "explored_dashboard": 1,
+    "hit_free_limit": 1,
+    "started_trial": 1,
+    "converted_to_paid": 1,
+    "page_views": 1,
+    "action_count": 1,
+    "action_counts": 1,
+    "created_at": 1,
+    "updated_at": 1
+}
+
+# Marks engagement records whose counters are complete: created by
+# action_update, or recomputed by backfill_action_counters
+COUNTERS_VERSION = 1
+
+def counter_key(name: Any) -> str:
+    """Make a client-supplied name safe to use as a sub-document key"""
+    if name is None:
+        return "unknown"
+    return str(name).replace(".", "_").lstrip("$") or "unknown"
+
+def _counter_key_expression(name: Any) -> Dict[str, Any]:
+    """counter_key as an aggregation expression, so stored keys match either way"""
+    return {
+        "$let": {
+            "vars": {
+                "key": {
+                    "$ltrim": {
+                        "input": {
+                            "$replaceAll": {
+                                "input": {"$toString": {"$ifNull": [name, "unknown"]}},
+                                "find": ".",
+                                "replacement": "_"
+                            }
+                        },
+                        "chars": {"$literal": "$"}
+                    }
+                }
+            },
+            "in": {"$cond": [{"$eq": ["$$key", ""]}, "unknown", "$$key"]}
+        }
+    }
+
+def action_update(
+    action: str,
+    details: Optional[Dict[str, Any]] = None,
+    set_fields: Optional[Dict[str, Any]] = None,
+    inc_fields: Optional[Dict[str, int]] = None
+) -> Dict[str, Any]:
+    """Build the upsert document that records an action on a user's engagement summary.
+
+    Keeps `action_count` and `action_counts.<action>` in step with the `actions`
+    history so readers never have to load the history just to count it.
+    """
+    now = datetime.utcnow()
+    inc = {"action_count": 1, f"action_counts.{counter_key(action)}": 1}
+    if inc_fields:
+        inc.update(inc_fields)
+
+    return {
+        "$push": {
+            "actions": {
+                "timestamp": now,
+                "action": action,
+                "details": details or {}
+            }
+        },
+        "$inc": inc,
+        "$set": {**(set_fields or {}), "updated_at": now},
+        "$setOnInsert": {"created_at": now, "counters_version": COUNTERS_VERSION}
+    }
+
+async def backfill_action_counters(db: AsyncIOMotorDatabase) -> int:
+    """Recompute action counters from the action history of every record not yet marked complete.
+
+    Legacy records updated by action_update before this ran have counters
+    that started at that update, so they are recomputed rather than skipped.
+    Compaction leaves unmarked records alone until then, keeping their
+    history whole.
+    """
+    result = await db.user_engagement.update_many(
+        {"counters_version": {"$ne": COUNTERS_VERSION}},
+        [
+            {
+                "$set": {
+                    "_counter_keys": {
+                        "$map": {
+                            "input": {"$ifNull": ["$actions", []]},
+                            "as": "a",
+                            "in": _counter_key_expression("$$a.action")
+                        }
+                    }
+                }
+            },
+            {
+                "$set": {
+                    "action_count": {"$size": "$_counter_keys"},
+                    "action_counts": {
+                        "$arrayToObject": {
+                            "$map": {
+                                "input": {"$setUnion": ["$_counter_keys"]},
+                                "as": "name",
+                                "in": {
+                                    "k": "$$name",
+                                    "v": {
+                                        "$size": {
+                                            "$filter": {
+                                                "input": "$_counter_keys",
+                                                "as": "key",
+                                                "cond": {"$eq": ["$$key", "$$name"]}
+                                            }
+                                        }
+                                    }
+                                }
+                            }
+                        }
+                    },
+                    "counters_version": COUNTERS_VERSION
+                }
+            },
+            {"$unset": "_counter_keys"}
+        ]
+    )
+
+    logger.info(f"Backfilled action counters on {result.modified_count} engagement records")
+    return result.modified_count
\ No newline at end of file
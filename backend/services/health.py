@@ -0,0 +1,143 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import monitoring
+from collections import deque
+from typing import Dict, Any, Optional
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class HealthSettings:
+    """Database probe configuration, read from the environment"""
+
+    def __init__(self):
+        self.cache_seconds = float(os.environ.get("HEALTH_PING_CACHE_SECONDS", 2))
+        self.timeout_seconds = float(os.environ.get("HEALTH_PING_TIMEOUT_SECONDS", 1))
+        self.max_ping_ms = float(os.environ.get("READINESS_MAX_PING_MS", 250))
+        self.max_checkout_wait_ms = float(os.environ.get("READINESS_MAX_CHECKOUT_WAIT_MS", 100))
+        self.checkout_window_seconds = float(os.environ.get("HEALTH_CHECKOUT_WINDOW_SECONDS", 30))
+
+class PoolWaitMonitor(monitoring.ConnectionPoolListener):
+    """Measures how long operations queue to check a connection out of the pool.
+
+    Check-out and connection setup events fire on the thread doing the
+    check-out, so its state is kept thread-locally. Time spent opening a new
+    connection (TCP, TLS and auth handshakes) is subtracted, leaving only the
+    wait for a free connection. Only checkouts from the last `window_seconds`
+    count, so a past spike stops failing readiness.
+    """
+
+    def __init__(self, window_seconds: float = 30, max_samples: int = 2000):
+        self.window_seconds = window_seconds
+        self._local = threading.local()
+        self._waits_ms = deque(maxlen=max_samples)
+        self.failed_checkouts = 0
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+        self._local.connecting = None
+        self._local.connect_seconds = 0.0
+
+    def connection_created(self, event):
+        # Also fires on the background thread that maintains minPoolSize; only
+        # connections opened for a check-out on this thread are subtracted
+        if getattr(self._local, "started", None) is not None:
+            self._local.connecting = time.perf_counter()
+
+    def connection_ready(self, event):
+        connecting = getattr(self._local, "connecting", None)
+        if connecting is not None:
+            self._local.connect_seconds += time.perf_counter() - connecting
+            self._local.connecting = None
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, "started", None)
+        if started is not None:
+            now = time.perf_counter()
+            wait = now - started - self._local.connect_seconds
+            self._waits_ms.append((now, max(0.0, wait) * 1000))
+            self._local.started = None
+
+    def connection_check_out_failed(self, event):
+        self.failed_checkouts += 1
+        self._local.started = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Checkout wait over the recent window"""
+        horizon = time.perf_counter() - self.window_seconds
+        waits = sorted(wait for at, wait in list(self._waits_ms) if at >= horizon)
+        return {
+            "samples": len(waits),
+            "avg_ms": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "p95_ms": round(waits[math.ceil(0.95 * len(waits)) - 1], 3) if waits else 0.0,
+            "max_ms": round(waits[-1], 3) if waits else 0.0,
+            "failed_checkouts": self.failed_checkouts
+        }
+
+    # Remaining pool events are not needed for wait tracking
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_closed(self, event): pass
+    def connection_checked_in(self, event): pass
+
+class DatabaseHealth:
+    """Cached Mongo ping shared by the health endpoints.
+
+    Probes arriving within `cache_seconds` of the last ping reuse its result,
+    and concurrent probes share one in-flight ping, so load balancer traffic
+    never adds more than one ping per interval.
+    """
+
+    def __init__(self, settings: HealthSettings, pool_monitor: PoolWaitMonitor):
+        self.settings = settings
+        self.pool_monitor = pool_monitor
+        self._result: Optional[Dict[str, Any]] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def check(self, db: AsyncIOMotorDatabase) -> Dict[str, Any]:
+        if self._result is not None and time.monotonic() - self._checked_at < self.settings.cache_seconds:
+            return self._result
+
+        async with self._lock:
+            if self._result is None or time.monotonic() - self._checked_at >= self.settings.cache_seconds:
+                self._result = await self._ping(db)
+                self._checked_at = time.monotonic()
+        return self._result
+
+    async def _ping(self, db: AsyncIOMotorDatabase) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(db.command("ping"), timeout=self.settings.timeout_seconds)
+        except Exception as e:
+            logger.warning(f"Database ping failed: {type(e).__name__}: {str(e)}")
+            return {
+                "reachable": False,
+                "error": "timeout" if isinstance(e, asyncio.TimeoutError) else type(e).__name__,
+                "pool_checkout_wait": self.pool_monitor.stats()
+            }
+
+        return {
+            "reachable": True,
+            "ping_ms": round((time.perf_counter() - started) * 1000, 3),
+            "pool_checkout_wait": self.pool_monitor.stats()
+        }
+
+    def ready(self, result: Dict[str, Any]) -> bool:
+        """Whether a check result is within the readiness thresholds"""
+        return (
+            result["reachable"]
+            and result["ping_ms"] <= self.settings.max_ping_ms
+            and result["pool_checkout_wait"]["p95_ms"] <= self.settings.max_checkout_wait_ms
+        )
+
+def create_database_health() -> DatabaseHealth:
+    """Probe and pool monitor for one app; register `pool_monitor` on its client"""
+    settings = HealthSettings()
+    return DatabaseHealth(settings, PoolWaitMonitor(settings.checkout_window_seconds))
\ No newline at end of file
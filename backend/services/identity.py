@@ -0,0 +1,156 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.collation import Collation
+from pymongo.errors import OperationFailure
+from typing import Dict, Any, List
+import logging
+from datetime import datetime
+
+from services.engagement import COUNTERS_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Case-insensitive comparison for email identity; lookups must pass the same
+# collation as the unique email indexes for those indexes to be used
+EMAIL_COLLATION = Collation(locale="en", strength=2)
+
+EMAIL_INDEX_NAME = "email_ci_unique"
+LEGACY_EMAIL_INDEX_NAME = "email_1"
+
+# Set on a merged survivor until the records merged into it are deleted
+MERGED_IDS_FIELD = "merged_ids"
+
+CANONICAL_EMAIL = {"$trim": {"input": {"$toLower": "$email"}}}
+
+def normalize_email(email: str) -> str:
+    """Canonical form of an email address used as identity everywhere"""
+    return email.strip().lower()
+
+async def ensure_email_indexes(db: AsyncIOMotorDatabase):
+    """Create the case-insensitive unique email indexes and drop the case-sensitive ones"""
+    for collection in (db.users, db.user_engagement):
+        await collection.create_index(
+            "email", unique=True, collation=EMAIL_COLLATION, name=EMAIL_INDEX_NAME
+        )
+        try:
+            await collection.drop_index(LEGACY_EMAIL_INDEX_NAME)
+            logger.info(f"Dropped case-sensitive email index on {collection.name}")
+        except OperationFailure:
+            # Already gone
+            pass
+
+def _merge_users(docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge user records that differ only by email case into one"""
+    # Profile fields come from the most recently active record
+    docs = sorted(docs, key=lambda d: d.get("last_active") or datetime.min, reverse=True)
+    merged = dict(docs[0])
+
+    for field in ("name", "mobile", "location", "role"):
+        merged[field] = next((d[field] for d in docs if d.get(field)), merged.get(field))
+    for field in ("report_views_used", "votes_cast", "forum_posts"):
+        merged[field] = sum(d.get(field, 0) for d in docs)
+    for field in ("report_views_limit", "votes_limit", "forum_posts_limit", "onboarding_step"):
+        values = [d[field] for d in docs if d.get(field) is not None]
+        if values:
+            merged[field] = max(values)
+    for field in ("is_premium", "trial_used"):
+        merged[field] = any(d.get(field, False) for d in docs)
+    for field, pick in (("subscription_expires", max), ("last_active", max), ("first_vote_date", min), ("created_at", min)):
+        values = [d[field] for d in docs if d.get(field)]
+        merged[field] = pick(values) if values else None
+
+    # Keep the oldest record's _id as the surviving identity
+    merged["_id"] = min(d["_id"] for d in docs)
+    return merged
+
+def _merge_engagement(docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Merge engagement records that differ only by email case into one"""
+    # The oldest record survives
+    merged = dict(min(docs, key=lambda d: d["_id"]))
+
+    merged["actions"] = sorted(
+        (action for d in docs for action in d.get("actions", [])),
+        key=lambda a: a["timestamp"]
+    )
+    merged["action_count"] = sum(d.get("action_count", len(d.get("actions", []))) for d in docs)
+    for field in ("action_counts", "page_views"):
+        totals: Dict[str, int] = {}
+        for d in docs:
+            for key, count in d.get(field, {}).items():
+                totals[key] = totals.get(key, 0) + count
+        merged[field] = totals
+    for flag in (
+        "viewed_samples", "understood_process", "cast_first_vote", "explored_dashboard",
+        "hit_free_limit", "started_trial", "converted_to_paid"
+    ):
+        merged[flag] = any(d.get(flag, False) for d in docs)
+    updated = [d["updated_at"] for d in docs if d.get("updated_at")]
+    merged["updated_at"] = max(updated) if updated else None
+    # Counters are only complete if every merged record's were; otherwise the backfill recomputes them
+    if not all(d.get("counters_version") == COUNTERS_VERSION for d in docs):
+        merged.pop("counters_version", None)
+    return merged
+
+async def _dedupe_collection(db: AsyncIOMotorDatabase, collection_name: str, merge) -> int:
+    collection = db[collection_name]
+    duplicates = collection.aggregate([
+        {"$group": {"_id": CANONICAL_EMAIL, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ], allowDiskUse=True)
+
+    merged_groups = 0
+    async for group in duplicates:
+        docs = await collection.find({"_id": {"$in": group["ids"]}}).to_list(None)
+        survivor = min(docs, key=lambda d: d["_id"])
+        # A survivor written by an interrupted run already holds these records' data
+        already_merged = set(survivor.get(MERGED_IDS_FIELD, []))
+        merged = merge([d for d in docs if d["_id"] not in already_merged])
+        others = [d["_id"] for d in docs if d["_id"] != survivor["_id"]]
+
+        # Write the survivor before deleting anything, recording what it absorbed so a
+        # rerun after a failure neither loses nor double-counts data. It keeps its own
+        # email until the others are gone, as they may hold the canonical one.
+        merged["email"] = survivor["email"]
+        merged[MERGED_IDS_FIELD] = others
+        await collection.replace_one({"_id": survivor["_id"]}, merged)
+        await collection.delete_many({"_id": {"$in": others}})
+        await collection.update_one(
+            {"_id": survivor["_id"]},
+            {"$set": {"email": group["_id"]}, "$unset": {MERGED_IDS_FIELD: ""}}
+        )
+        merged_groups += 1
+
+    # Survivors of a run interrupted after its deletes
+    await collection.update_many({MERGED_IDS_FIELD: {"$exists": True}}, {"$unset": {MERGED_IDS_FIELD: ""}})
+
+    # Canonicalise the remaining records that only needed their case fixed
+    result = await collection.update_many(
+        {"email": {"$regex": r"[A-Z]|^\s|\s$"}},
+        [{"$set": {"email": CANONICAL_EMAIL}}]
+    )
+    logger.info(
+        f"{collection_name}: merged {merged_groups} duplicate groups, "
+        f"normalised {result.modified_count} emails"
+    )
+    return merged_groups
+
+async def _dedupe_voters(db: AsyncIOMotorDatabase) -> int:
+    """Canonicalise voter emails, dropping votes duplicated only by case"""
+    fixed = 0
+    async for option in db.voting_options.find({"voters": {"$regex": r"[A-Z]|^\s|\s$"}}, {"voters": 1}):
+        voters = list(dict.fromkeys(normalize_email(voter) for voter in option["voters"]))
+        removed = len(option["voters"]) - len(voters)
+        await db.voting_options.update_one(
+            {"_id": option["_id"]},
+            {"$set": {"voters": voters}, "$inc": {"votes": -removed}}
+        )
+        fixed += 1
+
+    logger.info(f"voting_options: normalised voters on {fixed} options")
+    return fixed
+
+async def dedupe_emails(db: AsyncIOMotorDatabase):
+    """Backfill canonical emails, merging case-duplicates, then switch to case-insensitive indexes"""
+    await _dedupe_collection(db, "users", _merge_users)
+    await _dedupe_collection(db, "user_engagement", _merge_engagement)
+    await _dedupe_voters(db)
+    await ensure_email_indexes(db)
\ No newline at end of file
@@ -0,0 +1,65 @@
+from datetime import datetime, timezone
+import os
+import threading
+import time
+
+# Crockford base32, whose character order matches numeric order
+_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_RANDOM_BITS = 80
+_RANDOM_MAX = (1 << _RANDOM_BITS) - 1
+
+ORDER_ID_PREFIX = "order_"
+
+class UlidGenerator:
+    """Monotonic ULIDs: 48-bit millisecond timestamp + 80 random bits.
+
+    IDs sort by creation time. Within a millisecond the random part is
+    incremented rather than redrawn, so IDs from one process are strictly
+    increasing; across processes uniqueness comes from the 80 random bits.
+    The state is reseeded in forked children so pre-forked workers never
+    continue the same sequence.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._last_ms = 0
+        self._last_random = 0
+
+    def new(self) -> str:
+        with self._lock:
+            now_ms = time.time_ns() // 1_000_000
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._last_random = int.from_bytes(os.urandom(10), "big")
+            elif self._last_random < _RANDOM_MAX:
+                # Same millisecond (or the clock stepped back): keep counting
+                self._last_random += 1
+            else:
+                # Random space exhausted for this millisecond - borrow the next one
+                self._last_ms += 1
+                self._last_random = int.from_bytes(os.urandom(10), "big")
+            return _encode(self._last_ms, self._last_random)
+
+def _encode(timestamp_ms: int, randomness: int) -> str:
+    value = (timestamp_ms << _RANDOM_BITS) | randomness
+    chars = []
+    for _ in range(26):
+        chars.append(_ALPHABET[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+_generator = UlidGenerator()
+
+def new_order_id() -> str:
+    """Unique, time-sortable payment order ID"""
+    return ORDER_ID_PREFIX + _generator.new()
+
+def order_id_at(moment: datetime, randomness: int) -> str:
+    """Order ID for a given creation time and 80-bit random part, for reproducible synthetic data"""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return ORDER_ID_PREFIX + _encode(int(moment.timestamp() * 1000), randomness & _RANDOM_MAX)
\ No newline at end of file
@@ -0,0 +1,164 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import IndexModel, ASCENDING
+from pymongo.errors import OperationFailure
+from typing import Dict, Any, List, Mapping
+import logging
+
+from services.identity import EMAIL_COLLATION, EMAIL_INDEX_NAME, LEGACY_EMAIL_INDEX_NAME
+
+logger = logging.getLogger(__name__)
+
+# Every index the application relies on, by collection
+DECLARED_INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel("email", name=EMAIL_INDEX_NAME, unique=True, collation=EMAIL_COLLATION),
+        IndexModel("created_at", name="created_at_1"),
+        # Only premium users can expire, which keeps the sweeper's index small
+        IndexModel(
+            "subscription_expires",
+            name="subscription_expires_1",
+            partialFilterExpression={"is_premium": True}
+        ),
+    ],
+    "user_engagement": [
+        IndexModel("email", name=EMAIL_INDEX_NAME, unique=True, collation=EMAIL_COLLATION),
+        IndexModel("updated_at", name="updated_at_1"),
+        IndexModel("actions.timestamp", name="actions.timestamp_1"),
+    ],
+    "user_engagement_daily": [
+        IndexModel([("email", ASCENDING), ("day", ASCENDING)], name="email_1_day_1", unique=True),
+    ],
+    "voting_options": [
+        IndexModel("status", name="status_1"),
+        IndexModel("votes", name="votes_1"),
+        IndexModel("voters", name="voters_1"),
+    ],
+    "sample_reports": [
+        IndexModel("category", name="category_1"),
+        IndexModel("is_featured", name="is_featured_1"),
+    ],
+    "pending_orders": [
+        # Abandoned orders are removed once expires_at passes
+        IndexModel("expires_at", name="expires_at_1", expireAfterSeconds=0),
+    ],
+}
+
+# Indexes superseded by a declared one, dropped once their replacement exists
+RETIRED_INDEXES: Dict[str, Dict[str, str]] = {
+    "users": {LEGACY_EMAIL_INDEX_NAME: EMAIL_INDEX_NAME},
+    "user_engagement": {LEGACY_EMAIL_INDEX_NAME: EMAIL_INDEX_NAME},
+    # Orders are looked up by _id, which is the order ID
+    "pending_orders": {"order_id_1": "_id_"},
+}
+
+# Options that make two indexes on the same keys different indexes
+_IDENTITY_FLAGS = ("unique", "sparse")
+_IDENTITY_OPTIONS = ("partialFilterExpression", "expireAfterSeconds")
+
+def _normalise(value: Any) -> Any:
+    """Comparable form of an index option (listIndexes returns SON and may return floats)"""
+    if isinstance(value, Mapping):
+        return tuple(sorted((key, _normalise(item)) for key, item in value.items()))
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def _signature(spec: Mapping[str, Any]) -> tuple:
+    collation = spec.get("collation")
+    return (
+        tuple((field, _normalise(direction)) for field, direction in spec["key"].items()),
+        tuple(bool(spec.get(flag)) for flag in _IDENTITY_FLAGS),
+        tuple(_normalise(spec.get(option)) for option in _IDENTITY_OPTIONS),
+        (collation.get("locale"), collation.get("strength")) if collation else None
+    )
+
+def _declared_spec(index: IndexModel) -> Dict[str, Any]:
+    spec = dict(index.document)
+    if "collation" in spec and not isinstance(spec["collation"], dict):
+        spec["collation"] = spec["collation"].document
+    return spec
+
+class IndexReconciler:
+    """Diffs the declared indexes against the live ones and builds what is missing.
+
+    Existing indexes are never rebuilt, so restarts cost one listIndexes per
+    collection. Progress is kept on the instance for the readiness probe.
+    """
+
+    def __init__(self, declared: Dict[str, List[IndexModel]], retired: Dict[str, Dict[str, str]]):
+        self.declared = declared
+        self.retired = retired
+        self.state = "pending"
+        self.built: List[str] = []
+        self.errors: Dict[str, str] = {}
+
+    async def missing(self, db: AsyncIOMotorDatabase) -> Dict[str, List[IndexModel]]:
+        """Declared indexes with no live index of the same keys and options"""
+        missing = {}
+        for collection, indexes in self.declared.items():
+            existing = {
+                _signature(spec): spec["name"]
+                async for spec in db[collection].list_indexes()
+            }
+            absent = [index for index in indexes if _signature(_declared_spec(index)) not in existing]
+            if absent:
+                missing[collection] = absent
+        return missing
+
+    async def reconcile(self, db: AsyncIOMotorDatabase):
+        """Build missing indexes and drop retired ones whose replacement exists.
+
+        Each step's failure is recorded and the rest carry on; the final state
+        is always set, even if the task is cancelled.
+        """
+        self.state = "running"
+        self.built, self.errors = [], {}
+        finished = False
+        try:
+            try:
+                missing = await self.missing(db)
+            except Exception as e:
+                self.errors["listIndexes"] = str(e)
+                logger.error(f"Error listing indexes: {str(e)}")
+                return
+
+            if not missing:
+                logger.info("All declared indexes present")
+
+            for collection, indexes in missing.items():
+                for index in indexes:
+                    name = f"{collection}.{index.document['name']}"
+                    try:
+                        await db[collection].create_indexes([index])
+                        self.built.append(name)
+                        logger.info(f"Built index {name}")
+                    except Exception as e:
+                        self.errors[name] = str(e)
+                        hint = " (run 'python manage.py dedupe-emails')" \
+                            if isinstance(e, OperationFailure) and index.document["name"] == EMAIL_INDEX_NAME else ""
+                        logger.error(f"Error building index {name}{hint}: {str(e)}")
+
+            await self._drop_retired(db)
+            finished = True
+        finally:
+            if not finished and not self.errors:
+                self.errors["reconcile"] = "interrupted"
+            self.state = "failed" if self.errors else "done"
+
+    async def _drop_retired(self, db: AsyncIOMotorDatabase):
+        for collection, replacements in self.retired.items():
+            try:
+                live = {spec["name"] async for spec in db[collection].list_indexes()}
+                for retired_name, replacement in replacements.items():
+                    if retired_name in live and replacement in live:
+                        await db[collection].drop_index(retired_name)
+                        logger.info(f"Dropped superseded index {collection}.{retired_name}")
+            except Exception as e:
+                self.errors[f"{collection}.retired"] = str(e)
+                logger.error(f"Error dropping retired indexes on {collection}: {str(e)}")
+
+    def status(self) -> Dict[str, Any]:
+        return {"state": self.state, "built": self.built, "errors": self.errors}
+
+def create_index_reconciler() -> IndexReconciler:
+    return IndexReconciler(DECLARED_INDEXES, RETIRED_INDEXES)
\ No newline at end of file
@@ -0,0 +1,191 @@
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+import atexit
+import copy
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+
+import orjson
+
+from services.metrics import LOG_RECORDS_DROPPED
+
+# Set by RequestIdMiddleware for the duration of each request
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+def begin_request_id(request_id: str):
+    return _request_id.set(request_id)
+
+def end_request_id(token):
+    _request_id.reset(token)
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+def _parse_sample_rates(value: str) -> Dict[str, float]:
+    rates = {}
+    for item in value.split(","):
+        if "=" in item:
+            name, rate = item.split("=", 1)
+            rates[name.strip()] = float(rate)
+    return rates
+
+class LoggingSettings:
+    """Log pipeline configuration, read from the environment"""
+
+    def __init__(self):
+        self.level = os.environ.get("LOG_LEVEL", "INFO").upper()
+        self.format = os.environ.get("LOG_FORMAT", "json").lower()
+        self.queue_size = int(os.environ.get("LOG_QUEUE_SIZE", 10000))
+        # e.g. "routes.voting_routes=0.1,uvicorn.access=0.01"
+        self.sample_rates = _parse_sample_rates(os.environ.get("LOG_SAMPLE_RATES", ""))
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the current request ID while still on the emitting thread"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of INFO-and-below records per logger; warnings always pass.
+
+    A rate configured for a logger also applies to its children, the most
+    specific name winning.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._resolved: Dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate, candidate = 1.0, name
+            while candidate:
+                if candidate in self.rates:
+                    rate = self.rates[candidate]
+                    break
+                candidate = candidate.rpartition(".")[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or not self.rates:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Enqueue records for the listener thread; drop instead of waiting when the queue is full.
+
+    As with the stdlib handler, the message is merged and the traceback
+    rendered to exc_text before the record is queued, so no arguments or
+    live exception objects cross threads. Formatting the output line (JSON
+    encoding included) and writing it happen on the listener thread.
+    """
+
+    _traceback_formatter = logging.Formatter()
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self._traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc((record.levelname,))
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        if record.stack_info:
+            entry["stack_info"] = self.formatStack(record.stack_info)
+        return orjson.dumps(entry, default=str).decode()
+
+class TextFormatter(logging.Formatter):
+    """The previous plain-text layout, with the request ID appended when there is one"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        request_id = getattr(record, "request_id", None)
+        return f"{line} [request_id={request_id}]" if request_id else line
+
+_listener: Optional[QueueListener] = None
+_lock = threading.Lock()
+
+def configure_logging(settings: Optional[LoggingSettings] = None) -> QueueListener:
+    """Route the root logger through a queue drained by a background thread.
+
+    Safe to call more than once; later calls return the running listener.
+    """
+    global _listener
+    with _lock:
+        if _listener is not None:
+            return _listener
+        settings = settings or LoggingSettings()
+
+        log_queue = queue.Queue(maxsize=settings.queue_size)
+        queue_handler = NonBlockingQueueHandler(log_queue)
+        queue_handler.addFilter(SamplingFilter(settings.sample_rates))
+        queue_handler.addFilter(RequestIdFilter())
+
+        stream_handler = logging.StreamHandler(sys.stderr)
+        stream_handler.setFormatter(JsonFormatter() if settings.format == "json" else TextFormatter())
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(settings.level)
+
+        _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+        return _listener
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
\ No newline at end of file
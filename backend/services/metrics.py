@@ -0,0 +1,210 @@
+from pymongo import monitoring
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+import os
+import threading
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Seconds; covers sub-millisecond Mongo commands up to slow aggregations
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    """Monotonic counter keyed by a tuple of label values"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, labels)} {value}" for labels, value in values]
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    kind = "gauge"
+
+    def dec(self, labels: Tuple[str, ...] = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values.
+
+    Observing is a bisect and three additions under a lock; bucket
+    cumulation is deferred to scrape time.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: Tuple[str, ...], value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            snapshot = [(labels, list(series[0]), series[1], series[2]) for labels, series in self._series.items()]
+
+        lines = []
+        for labels, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = registry.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+))
+HTTP_RESPONSES = registry.register(Counter(
+    "http_responses_total", "HTTP responses by route and status code", ("method", "route", "status")
+))
+MONGO_COMMAND_DURATION = registry.register(Histogram(
+    "mongo_command_duration_seconds", "MongoDB command latency", ("collection", "command")
+))
+MONGO_COMMAND_FAILURES = registry.register(Counter(
+    "mongo_command_failures_total", "Failed MongoDB commands", ("collection", "command")
+))
+MONGO_POOL_CONNECTIONS = registry.register(Gauge(
+    "mongo_pool_connections", "Open pooled connections", ("address",)
+))
+MONGO_POOL_CHECKED_OUT = registry.register(Gauge(
+    "mongo_pool_checked_out_connections", "Connections currently checked out", ("address",)
+))
+MONGO_POOL_CHECKOUT_FAILURES = registry.register(Counter(
+    "mongo_pool_checkout_failures_total", "Failed connection checkouts", ("address", "reason")
+))
+MONGO_POOL_CLEARED = registry.register(Counter(
+    "mongo_pool_cleared_total", "Times a connection pool was cleared", ("address",)
+))
+LOG_RECORDS_DROPPED = registry.register(Counter(
+    "log_records_dropped_total", "Log records dropped because the log queue was full", ("level",)
+))
+
+def command_collection(command_name: str, command: dict) -> str:
+    """Collection a command targets, or '' for database-level commands"""
+    target = command.get(command_name)
+    if isinstance(target, str):
+        return target
+    # getMore carries the cursor id under its name and the collection separately
+    return command.get("collection", "") if isinstance(command.get("collection"), str) else ""
+
+class CommandMetrics(monitoring.CommandListener):
+    """Times every MongoDB command by collection and command name"""
+
+    def __init__(self):
+        # request_id -> collection of commands in flight
+        self._collections: Dict[int, str] = {}
+
+    def started(self, event):
+        self._collections[event.request_id] = command_collection(event.command_name, event.command)
+
+    def succeeded(self, event):
+        collection = self._collections.pop(event.request_id, "")
+        MONGO_COMMAND_DURATION.observe((collection, event.command_name), event.duration_micros / 1e6)
+
+    def failed(self, event):
+        collection = self._collections.pop(event.request_id, "")
+        MONGO_COMMAND_DURATION.observe((collection, event.command_name), event.duration_micros / 1e6)
+        MONGO_COMMAND_FAILURES.inc((collection, event.command_name))
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool sizes and failures per server"""
+
+    @staticmethod
+    def _address(event) -> Tuple[str]:
+        host, port = event.address
+        return (f"{host}:{port}",)
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+
+    def pool_cleared(self, event):
+        MONGO_POOL_CLEARED.inc(self._address(event))
+
+    def pool_closed(self, event): pass
+
+    def connection_created(self, event):
+        MONGO_POOL_CONNECTIONS.inc(self._address(event))
+
+    def connection_ready(self, event): pass
+
+    def connection_closed(self, event):
+        MONGO_POOL_CONNECTIONS.dec(self._address(event))
+
+    def connection_check_out_started(self, event): pass
+
+    def connection_check_out_failed(self, event):
+        MONGO_POOL_CHECKOUT_FAILURES.inc(self._address(event) + (str(event.reason),))
+
+    def connection_checked_out(self, event):
+        MONGO_POOL_CHECKED_OUT.inc(self._address(event))
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CHECKED_OUT.dec(self._address(event))
+
+def event_listeners() -> list:
+    """Listeners to register on the MongoDB client when metrics are enabled"""
+    return [CommandMetrics(), PoolMetrics()] if METRICS_ENABLED else []
\ No newline at end of file
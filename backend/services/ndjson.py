@@ -0,0 +1,7 @@
+from typing import Any
+
+from services.responses import dumps
+
+def encode_line(doc: Any) -> bytes:
+    """Encode one document as a newline-terminated JSON line"""
+    return dumps(doc) + b"\n"
\ No newline at end of file
@@ -0,0 +1,95 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from typing import Dict, Any, Optional
+import logging
+import os
+from datetime import datetime, timedelta
+
+from services.identity import EMAIL_COLLATION
+from services.user_cache import invalidate_user
+
+logger = logging.getLogger(__name__)
+
+# Order lifecycle: pending -> paid -> applied. Pending orders that are never
+# paid are removed by the TTL index on expires_at; paying an order clears it.
+# Orders from before this lifecycle are "completed" and already applied.
+ORDER_PENDING = "pending"
+ORDER_PAID = "paid"
+ORDER_APPLIED = "applied"
+
+PENDING_ORDER_TTL_MINUTES = int(os.environ.get("PENDING_ORDER_TTL_MINUTES", 60))
+
+# Duration for orders created before they recorded their tier's duration
+SUBSCRIPTION_DAYS = 30
+
+def pending_order_expiry(now: datetime) -> datetime:
+    """When an unpaid order created at `now` is abandoned"""
+    return now + timedelta(minutes=PENDING_ORDER_TTL_MINUTES)
+
+def subscription_expiry(order: Dict[str, Any]) -> datetime:
+    """Subscription end granted by a paid order, derived from its payment time"""
+    paid_at = order.get("paid_at") or order.get("completed_at") or datetime.utcnow()
+    return paid_at + timedelta(days=order.get("duration_days", SUBSCRIPTION_DAYS))
+
+async def mark_order_paid(
+    db: AsyncIOMotorDatabase,
+    order_id: str,
+    payment_id: str
+) -> Optional[Dict[str, Any]]:
+    """Move an order from pending to paid in one conditional update.
+
+    Retries and concurrent callbacks lose the transition and get the already
+    paid order back; callers compare its payment_id with their own. Returns
+    None if the order does not exist (or was abandoned and expired).
+    """
+    now = datetime.utcnow()
+    order = await db.pending_orders.find_one_and_update(
+        {"_id": order_id, "status": ORDER_PENDING},
+        {
+            "$set": {"status": ORDER_PAID, "payment_id": payment_id, "paid_at": now},
+            "$unset": {"expires_at": ""}
+        },
+        return_document=ReturnDocument.AFTER
+    )
+    if order:
+        return order
+
+    return await db.pending_orders.find_one({"_id": order_id})
+
+async def activate_subscription(db: AsyncIOMotorDatabase, order: Dict[str, Any]) -> bool:
+    """Apply a paid order to its user, at most once per order.
+
+    Only orders still in the paid state are applied, so retrying an older
+    order after a newer one was paid cannot roll the subscription back. The
+    user records every order applied to it, which keeps a retry after a
+    failure between the two writes below from applying it twice. Returns
+    whether this call applied it.
+    """
+    if order.get("status") != ORDER_PAID:
+        return False
+    email = order["email"]
+    order_id = order["_id"]
+
+    result = await db.users.update_one(
+        {"email": email, "applied_orders": {"$ne": order_id}},
+        {
+            "$set": {
+                "is_premium": True,
+                "subscription_expires": subscription_expiry(order),
+                "last_active": datetime.utcnow(),
+                # Reset usage limits
+                "report_views_used": 0,
+                "votes_cast": 0,
+                "forum_posts": 0
+            },
+            "$addToSet": {"applied_orders": order_id}
+        },
+        collation=EMAIL_COLLATION
+    )
+    invalidate_user(email)
+
+    await db.pending_orders.update_one(
+        {"_id": order_id, "status": ORDER_PAID},
+        {"$set": {"status": ORDER_APPLIED, "applied_at": datetime.utcnow()}}
+    )
+    return result.modified_count == 1
\ No newline at end of file
@@ -0,0 +1,107 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Dict, Any, AsyncIterator, List, Optional
+import logging
+
+from services.ndjson import encode_line
+from services.identity import EMAIL_COLLATION
+
+logger = logging.getLogger(__name__)
+
+# Fields each profile-type endpoint needs from users and user_engagement
+PROFILE_FIELDS = {
+    "user": [
+        "email", "name", "mobile", "location", "role", "created_at", "last_active",
+        "is_premium", "subscription_expires", "trial_used", "onboarding_step"
+    ],
+    "engagement": ["action_count"]
+}
+
+UPGRADE_PROMPT_FIELDS = {
+    "user": [
+        "is_premium", "trial_used",
+        "report_views_used", "report_views_limit", "votes_cast", "votes_limit"
+    ],
+    "engagement": ["action_count"]
+}
+
+async def fetch_user_with_engagement(
+    db: AsyncIOMotorDatabase,
+    email: str,
+    fields: Dict[str, list]
+) -> Optional[Dict[str, Any]]:
+    """Fetch a user joined with their engagement summary in one aggregation.
+
+    Only the requested fields are projected on both sides; the joined
+    summary is returned under `engagement` (None if the user has none).
+    """
+    pipeline = [
+        {"$match": {"email": email}},
+        {"$limit": 1},
+        {
+            "$lookup": {
+                "from": "user_engagement",
+                "localField": "email",
+                "foreignField": "email",
+                "as": "engagement"
+            }
+        },
+        {
+            "$project": {
+                **{field: 1 for field in fields["user"]},
+                "engagement": {"$arrayElemAt": ["$engagement", 0]}
+            }
+        },
+        {
+            "$project": {
+                **{field: 1 for field in fields["user"]},
+                **{f"engagement.{field}": 1 for field in fields["engagement"]}
+            }
+        }
+    ]
+
+    # The collation also applies to the $lookup, keeping both sides on the email indexes
+    result = await db.users.aggregate(pipeline, collation=EMAIL_COLLATION).to_list(1)
+    return result[0] if result else None
+
+def build_profile(user: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the profile payload from a user joined with their engagement summary"""
+    engagement = user.get("engagement")
+
+    return {
+        "email": user["email"],
+        "name": user.get("name"),
+        "mobile": user.get("mobile"),
+        "location": user.get("location"),
+        "role": user.get("role", "member"),
+        "member_since": user["created_at"],
+        "last_active": user.get("last_active"),
+        "is_premium": user.get("is_premium", False),
+        "subscription_expires": user.get("subscription_expires"),
+        "trial_used": user.get("trial_used", False),
+        "onboarding_step": user.get("onboarding_step", 1),
+        "profile_complete": bool(user.get("name")),
+        "engagement_score": engagement.get("action_count", 0) if engagement else 0
+    }
+
+async def stream_profiles(db: AsyncIOMotorDatabase, emails: List[str]) -> AsyncIterator[bytes]:
+    """Stream NDJSON profiles for a batch of emails with one $in query per collection"""
+    engagement_projection = {"_id": 0, "email": 1, **{field: 1 for field in PROFILE_FIELDS["engagement"]}}
+    engagement = {
+        doc["email"]: doc
+        async for doc in db.user_engagement.find(
+            {"email": {"$in": emails}}, engagement_projection, collation=EMAIL_COLLATION
+        )
+    }
+
+    user_projection = {"_id": 0, **{field: 1 for field in PROFILE_FIELDS["user"]}}
+    found = set()
+    async for user in db.users.find(
+        {"email": {"$in": emails}}, user_projection, batch_size=500, collation=EMAIL_COLLATION
+    ):
+        found.add(user["email"])
+        user["engagement"] = engagement.get(user["email"])
+        yield encode_line({"email": user["email"], "found": True, "profile": build_profile(user)})
+
+    for email in emails:
+        if email not in found:
+            yield encode_line({"email": email, "found": False})
\ No newline at end of file
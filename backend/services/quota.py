@@ -0,0 +1,94 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from typing import Dict, Any, Optional, Tuple
+import logging
+from datetime import datetime
+
+from services.user_cache import get_user, invalidate_user
+from services.identity import EMAIL_COLLATION
+
+logger = logging.getLogger(__name__)
+
+# Freemium-metered resources:
+# resource -> (usage field, limit field, default limit, count usage while premium)
+METERED_RESOURCES = {
+    "report_views": ("report_views_used", "report_views_limit", 3, False),
+    "votes": ("votes_cast", "votes_limit", 5, True),
+    "forum_posts": ("forum_posts", "forum_posts_limit", 1, False),
+}
+
+# User fields returned alongside a quota decision
+QUOTA_FIELDS = {
+    "email": 1,
+    "is_premium": 1,
+    "report_views_used": 1,
+    "report_views_limit": 1,
+    "votes_cast": 1,
+    "votes_limit": 1,
+    "forum_posts": 1,
+    "forum_posts_limit": 1
+}
+
+IS_PREMIUM = {"$eq": ["$is_premium", True]}
+
+def _usage_pipeline(resource: str, delta: int, now: Optional[datetime] = None):
+    """Pipeline update that moves a usage counter by `delta` (never below zero)"""
+    used_field, _, _, count_premium = METERED_RESOURCES[resource]
+    used = {"$ifNull": [f"${used_field}", 0]}
+    changed = {"$max": [0, {"$add": [used, delta]}]}
+
+    fields = {used_field: changed if count_premium else {"$cond": [IS_PREMIUM, used, changed]}}
+    if now is not None:
+        fields["last_active"] = now
+    return [{"$set": fields}]
+
+async def consume_quota(
+    db: AsyncIOMotorDatabase,
+    email: str,
+    resource: str
+) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """Check and consume one unit of a metered resource in a single atomic round trip.
+
+    The `$expr` guard only matches while the user is premium or still under
+    their limit, so concurrent requests can never push usage past the limit.
+    Returns (allowed, user) where user reflects the counters after the
+    decision, or (False, None) if the user does not exist.
+    """
+    used_field, limit_field, default_limit, _ = METERED_RESOURCES[resource]
+
+    user = await db.users.find_one_and_update(
+        {
+            "email": email,
+            "$expr": {
+                "$or": [
+                    IS_PREMIUM,
+                    {"$lt": [
+                        {"$ifNull": [f"${used_field}", 0]},
+                        {"$ifNull": [f"${limit_field}", default_limit]}
+                    ]}
+                ]
+            }
+        },
+        _usage_pipeline(resource, 1, now=datetime.utcnow()),
+        projection=QUOTA_FIELDS,
+        return_document=ReturnDocument.AFTER,
+        collation=EMAIL_COLLATION
+    )
+    if user:
+        invalidate_user(email)
+        return True, user
+
+    # Rejected or unknown - only this slow path pays for a second read
+    return False, await get_user(db, email)
+
+async def refund_quota(db: AsyncIOMotorDatabase, email: str, resource: str):
+    """Give back a unit consumed for an operation that did not go through"""
+    await db.users.update_one({"email": email}, _usage_pipeline(resource, -1), collation=EMAIL_COLLATION)
+    invalidate_user(email)
+
+def quota_status(user: Dict[str, Any], resource: str) -> Dict[str, Any]:
+    """Usage, limit and remaining units of a resource for a user document"""
+    used_field, limit_field, default_limit, _ = METERED_RESOURCES[resource]
+    used = user.get(used_field, 0)
+    limit = user.get(limit_field, default_limit)
+    return {"used": used, "limit": limit, "remaining": max(0, limit - used)}
\ No newline at end of file
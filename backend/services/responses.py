@@ -0,0 +1,35 @@
+from bson import ObjectId
+from fastapi.responses import Response
+from typing import Any
+import os
+
+import orjson
+
+from models import ApiResponse
+
+# Opt-in: encode the response envelope directly with orjson instead of
+# validating an ApiResponse model and walking it with jsonable_encoder
+FAST_JSON_RESPONSES = os.environ.get("FAST_JSON_RESPONSES", "false").lower() in ("1", "true", "yes")
+
+def _default(value: Any):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(value: Any) -> bytes:
+    """Encode to compact JSON bytes; datetimes as ISO 8601, ObjectIds as strings"""
+    return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def api_response(success: bool, message: str, data: Any = None):
+    """Build the standard {success, message, data} response envelope"""
+    if FAST_JSON_RESPONSES:
+        return FastJSONResponse({"success": success, "message": message, "data": data})
+    return ApiResponse(success=success, message=message, data=data)
\ No newline at end of file
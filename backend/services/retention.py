@@ -0,0 +1,161 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from bson import json_util
+from typing import Dict, Any, List, Tuple
+from collections import defaultdict
+from pathlib import Path
+import asyncio
+import gzip
+import logging
+import os
+from datetime import datetime, timedelta
+
+from services.engagement import counter_key, COUNTERS_VERSION
+from services.scheduler import acquire_lease
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "engagement_compaction"
+
+class RetentionSettings:
+    """Engagement retention configuration, read from the environment"""
+
+    def __init__(self):
+        self.horizon_days = int(os.environ.get("ENGAGEMENT_RETENTION_DAYS", 90))
+        self.archive_dir = Path(os.environ.get("ENGAGEMENT_ARCHIVE_DIR", "archive/engagement"))
+        self.batch_size = int(os.environ.get("ENGAGEMENT_COMPACTION_BATCH_SIZE", 200))
+        self.batch_pause_seconds = float(os.environ.get("ENGAGEMENT_COMPACTION_PAUSE_SECONDS", 0.5))
+        self.interval_hours = float(os.environ.get("ENGAGEMENT_COMPACTION_INTERVAL_HOURS", 24))
+
+def _append_archive(path: Path, lines: List[str]):
+    """Append NDJSON lines to a gzip archive as a new gzip member"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "ab") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="ab") as archive:
+            archive.write(("\n".join(lines) + "\n").encode("utf-8"))
+        # Events are deleted from Mongo right after, so make sure they are on disk
+        raw.flush()
+        os.fsync(raw.fileno())
+
+def _day(timestamp: datetime) -> datetime:
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+async def _rolled_through(db: AsyncIOMotorDatabase, docs: List[Dict[str, Any]]) -> Dict[Tuple[str, datetime], datetime]:
+    """Latest event already counted in each daily summary the batch touches"""
+    emails = list({doc["email"] for doc in docs})
+    days = list({_day(event["timestamp"]) for doc in docs for event in doc["actions"]})
+    cursor = db.user_engagement_daily.find(
+        {"email": {"$in": emails}, "day": {"$in": days}, "rolled_through": {"$exists": True}},
+        {"email": 1, "day": 1, "rolled_through": 1, "_id": 0}
+    )
+    return {(summary["email"], summary["day"]): summary["rolled_through"] async for summary in cursor}
+
+def _rollup(docs: List[Dict[str, Any]], rolled_through: Dict[Tuple[str, datetime], datetime]) -> List[UpdateOne]:
+    """Build daily per-user summary upserts for a batch of expired events.
+
+    Events at or before a summary's `rolled_through` were counted by an
+    earlier run that stopped before pulling them, and are skipped.
+    """
+    daily = defaultdict(lambda: defaultdict(int))
+    latest: Dict[Tuple[str, datetime], datetime] = {}
+    for doc in docs:
+        for event in doc["actions"]:
+            key = (doc["email"], _day(event["timestamp"]))
+            if key in rolled_through and event["timestamp"] <= rolled_through[key]:
+                continue
+            daily[key][counter_key(event.get("action"))] += 1
+            latest[key] = max(latest.get(key, event["timestamp"]), event["timestamp"])
+
+    operations = []
+    for (email, day), counts in daily.items():
+        inc = {f"actions.{action}": count for action, count in counts.items()}
+        inc["total"] = sum(counts.values())
+        operations.append(UpdateOne(
+            {"email": email, "day": day},
+            {
+                "$inc": inc,
+                "$max": {"rolled_through": latest[(email, day)]},
+                "$setOnInsert": {"email": email, "day": day}
+            },
+            upsert=True
+        ))
+    return operations
+
+async def compact_engagement(db: AsyncIOMotorDatabase, settings: RetentionSettings) -> Dict[str, int]:
+    """Move engagement events older than the retention horizon out of the hot collection.
+
+    Each batch is archived to compressed NDJSON first, then rolled into
+    `user_engagement_daily`, then pulled from `user_engagement`, pausing
+    between batches to keep the load on the primary low. The daily
+    summaries record the latest event they counted, so a run that stopped
+    before its pull does not count those events again on the next one.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=settings.horizon_days)
+    archive_path = settings.archive_dir / f"engagement-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.ndjson.gz"
+    stats = {"users": 0, "events": 0, "daily_summaries": 0}
+    last_id = None
+
+    while True:
+        # Records awaiting the counter backfill keep their full history until it runs
+        match = {"actions.timestamp": {"$lt": cutoff}, "counters_version": COUNTERS_VERSION}
+        if last_id is not None:
+            match["_id"] = {"$gt": last_id}
+
+        # Only ship the expired events, never the full history
+        docs = await db.user_engagement.aggregate([
+            {"$match": match},
+            {"$sort": {"_id": 1}},
+            {"$limit": settings.batch_size},
+            {
+                "$project": {
+                    "email": 1,
+                    "actions": {
+                        "$filter": {
+                            "input": "$actions",
+                            "as": "a",
+                            "cond": {"$lt": ["$$a.timestamp", cutoff]}
+                        }
+                    }
+                }
+            }
+        ]).to_list(settings.batch_size)
+
+        if not docs:
+            break
+        last_id = docs[-1]["_id"]
+
+        lines = [
+            json_util.dumps({"email": doc["email"], **event}, json_options=json_util.RELAXED_JSON_OPTIONS)
+            for doc in docs
+            for event in doc["actions"]
+        ]
+        await asyncio.get_running_loop().run_in_executor(None, _append_archive, archive_path, lines)
+
+        summaries = _rollup(docs, await _rolled_through(db, docs))
+        if summaries:
+            await db.user_engagement_daily.bulk_write(summaries, ordered=False)
+
+        await db.user_engagement.bulk_write([
+            UpdateOne({"_id": doc["_id"]}, {"$pull": {"actions": {"timestamp": {"$lt": cutoff}}}})
+            for doc in docs
+        ], ordered=False)
+
+        stats["users"] += len(docs)
+        stats["events"] += len(lines)
+        stats["daily_summaries"] += len(summaries)
+
+        await asyncio.sleep(settings.batch_pause_seconds)
+
+    logger.info(
+        f"Engagement compaction done: {stats['events']} events from {stats['users']} users "
+        f"older than {cutoff.date()} archived to {archive_path if stats['events'] else 'nothing'}"
+    )
+    return stats
+
+async def run_compaction_job(db: AsyncIOMotorDatabase, settings: RetentionSettings):
+    """Scheduled entry point - runs at most once per interval across all workers"""
+    # The lease is held for the whole interval rather than released after the run
+    if not await acquire_lease(db, JOB_NAME, settings.interval_hours * 3600):
+        logger.info("Engagement compaction already handled by another worker this interval")
+        return
+    await compact_engagement(db, settings)
\ No newline at end of file
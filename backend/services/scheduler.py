@@ -0,0 +1,63 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+from typing import Awaitable, Callable, Optional
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process as the holder of a job lease
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+async def acquire_lease(db: AsyncIOMotorDatabase, name: str, lease_seconds: float) -> bool:
+    """Take a cluster-wide lease so only one worker runs a scheduled job at a time"""
+    now = datetime.utcnow()
+    try:
+        lease = await db.job_leases.find_one_and_update(
+            {
+                "_id": name,
+                "$or": [
+                    {"holder": WORKER_ID},
+                    {"locked_until": {"$lt": now}}
+                ]
+            },
+            {"$set": {"holder": WORKER_ID, "locked_until": now + timedelta(seconds=lease_seconds)}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # Another worker holds an unexpired lease
+        return False
+    return True
+
+async def run_periodically(
+    name: str,
+    interval_seconds: float,
+    job: Callable[[], Awaitable],
+    initial_delay: Optional[float] = None
+):
+    """Run `job` every `interval_seconds` until cancelled, logging but surviving failures"""
+    await asyncio.sleep(interval_seconds if initial_delay is None else initial_delay)
+    while True:
+        try:
+            await job()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Scheduled job '{name}' failed: {str(e)}")
+        await asyncio.sleep(interval_seconds)
+
+def start_periodic(
+    name: str,
+    interval_seconds: float,
+    job: Callable[[], Awaitable],
+    initial_delay: Optional[float] = None
+) -> asyncio.Task:
+    """Schedule a periodic background job on the running event loop"""
+    logger.info(f"Scheduling '{name}' every {interval_seconds:.0f}s")
+    return asyncio.create_task(
+        run_periodically(name, interval_seconds, job, initial_delay),
+        name=name
+    )
\ No newline at end of file
@@ -0,0 +1,122 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+async def seed_sample_data(db: AsyncIOMotorDatabase):
+    """Seed sample data for demonstration"""
+    try:
+        # Check if sample reports exist
+        sample_count = await db.sample_reports.count_documents({})
+        if sample_count == 0:
+            logger.info("Seeding sample reports...")
+            
+            sample_reports = [
+                {
+                    "product_name": "Amul Taaza Milk",
+                    "brand": "Amul",
+                    "category": "Dairy",
+                    "purity_score": 8.5,
+                    "test_date": "2024-01-15",
+                    "tested_by": "FSSAI Certified Lab - Mumbai",
+                    "image": "/images/amul-milk.jpg",
+                    "key_findings": [
+                        "No harmful additives detected",
+                        "Fat content matches label claims",
+                        "Safe bacterial levels",
+                        "No antibiotic residues"
+                    ],
+                    "safety_status": "Safe",
+                    "is_featured": True
+                },
+                {
+                    "product_name": "Parle-G Biscuits",
+                    "brand": "Parle",
+                    "category": "Snacks",
+                    "purity_score": 7.2,
+                    "test_date": "2024-01-10",
+                    "tested_by": "NABL Certified Lab - Delhi",
+                    "image": "/images/parle-g.jpg",
+                    "key_findings": [
+                        "Trans fat within safe limits",
+                        "Sugar content as per label",
+                        "No harmful preservatives",
+                        "Slight excess sodium detected"
+                    ],
+                    "safety_status": "Caution",
+                    "is_featured": True
+                },
+                {
+                    "product_name": "Mother Dairy Butter",
+                    "brand": "Mother Dairy",
+                    "category": "Dairy",
+                    "purity_score": 9.1,
+                    "test_date": "2024-01-20",
+                    "tested_by": "FSSAI Certified Lab - Bangalore",
+                    "image": "/images/mother-dairy-butter.jpg",
+                    "key_findings": [
+                        "100% pure milk fat",
+                        "No artificial colors",
+                        "Excellent quality standards",
+                        "No harmful additives"
+                    ],
+                    "safety_status": "Safe",
+                    "is_featured": True
+                }
+            ]
+            
+            # The dashboard and community activity feeds read created_at
+            now = datetime.utcnow()
+            for report in sample_reports:
+                report["created_at"] = now
+            
+            await db.sample_reports.insert_many(sample_reports)
+            logger.info("Sample reports seeded successfully")
+        
+        # Check if voting options exist
+        voting_count = await db.voting_options.count_documents({})
+        if voting_count == 0:
+            logger.info("Seeding voting options...")
+            
+            voting_options = [
+                {
+                    "product_name": "Maggi Noodles",
+                    "category": "Instant Food",
+                    "description": "Test for MSG, lead content, and preservatives in popular instant noodles",
+                    "votes": 245,
+                    "funding_raised": 12000,
+                    "funding_target": 15000,
+                    "estimated_test_date": "2024-02-15",
+                    "status": "voting",
+                    "voters": []
+                },
+                {
+                    "product_name": "Britannia Bread",
+                    "category": "Bakery",
+                    "description": "Check for harmful preservatives and gluten quality in packaged bread",
+                    "votes": 189,
+                    "funding_raised": 8500,
+                    "funding_target": 12000,
+                    "estimated_test_date": "2024-02-20",
+                    "status": "voting",
+                    "voters": []
+                },
+                {
+                    "product_name": "Amul Cheese",
+                    "category": "Dairy",
+                    "description": "Verify milk quality and check for artificial additives in processed cheese",
+                    "votes": 156,
+                    "funding_raised": 6200,
+                    "funding_target": 10000,
+                    "estimated_test_date": "2024-02-25",
+                    "status": "voting",
+                    "voters": []
+                }
+            ]
+            
+            await db.voting_options.insert_many(voting_options)
+            logger.info("Voting options seeded successfully")
+            
+    except Exception as e:
+        logger.error(f"Error seeding sample data: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,230 @@
+from fastapi import Request
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import monitoring
+from typing import Dict, Any, List, Optional
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Commands worth recording, and the fields of each that describe its shape
+SHAPE_FIELDS = {
+    "find": ("filter", "sort", "projection", "hint"),
+    "aggregate": ("pipeline", "hint"),
+    "count": ("query", "hint"),
+    "distinct": ("key", "query"),
+    "findAndModify": ("query", "sort", "update"),
+    "update": ("updates",),
+    "delete": ("deletes",),
+}
+
+# Shape fields made of field names with 0/1 flags or -1/1 directions
+_SHAPE_SPEC_FIELDS = {"sort", "projection", "hint"}
+
+# Driver and session fields that must not be sent back inside an explain
+_DRIVER_FIELDS = {
+    "lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "autocommit",
+    "startTransaction", "readConcern", "writeConcern"
+}
+
+# Plan fields that can carry query values
+_PLAN_VALUE_FIELDS = {"filter", "indexBounds", "parsedQuery"}
+
+def redact(value: Any) -> Any:
+    """Replace every literal in a command fragment with '?', keeping field names and operators"""
+    if isinstance(value, dict):
+        return {key: redact(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # Arrays of literals (e.g. $in lists) collapse to one placeholder
+        shapes = []
+        for item in value:
+            shape = redact(item)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    return "?"
+
+def redact_spec(value: Any) -> Any:
+    """Keep field names with inclusion flags or directions; redact anything else (e.g. $elemMatch values)"""
+    if isinstance(value, dict):
+        return {
+            key: item if isinstance(item, (bool, int)) and item in (-1, 0, 1) else redact(item)
+            for key, item in value.items()
+        }
+    # An index name
+    return value if isinstance(value, str) else redact(value)
+
+def command_shape(command_name: str, command: Dict[str, Any]) -> Dict[str, Any]:
+    shape = {}
+    for field in SHAPE_FIELDS[command_name]:
+        if field not in command:
+            continue
+        value = command[field]
+        if field in ("updates", "deletes"):
+            # Only the statements' filters and update operators matter
+            value = [{"q": statement.get("q"), "u": statement.get("u")} for statement in value]
+        if field == "key":
+            # distinct's field name
+            shape[field] = value
+        elif field in _SHAPE_SPEC_FIELDS:
+            shape[field] = redact_spec(value)
+        else:
+            shape[field] = redact(value)
+    return shape
+
+def redact_plan(plan: Any) -> Any:
+    if isinstance(plan, dict):
+        return {
+            key: redact(item) if key in _PLAN_VALUE_FIELDS else redact_plan(item)
+            for key, item in plan.items()
+        }
+    if isinstance(plan, list):
+        return [redact_plan(item) for item in plan]
+    return plan
+
+class SlowQuerySettings:
+    """Slow-query recorder configuration, read from the environment"""
+
+    def __init__(self):
+        self.threshold_ms = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", 100))
+        self.top_n = int(os.environ.get("SLOW_QUERY_TOP_N", 50))
+        self.explain = os.environ.get("SLOW_QUERY_EXPLAIN", "true").lower() in ("1", "true", "yes")
+        self.explain_interval_seconds = float(os.environ.get("SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS", 600))
+
+class SlowQueryRecorder(monitoring.CommandListener):
+    """Keeps the N slowest command shapes seen, each with its winning plan.
+
+    Commands slower than the threshold are reduced to a redacted shape and
+    aggregated per shape. When the table is full a slower shape evicts the
+    fastest one. Each shape is explained in the background at most once per
+    interval, and only one explain runs at a time.
+    """
+
+    def __init__(self, settings: SlowQuerySettings):
+        self.settings = settings
+        self._started: Dict[int, Dict[str, Any]] = {}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._db: Optional[AsyncIOMotorDatabase] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._explaining = False
+        # Held so the running explain is not garbage-collected mid-flight
+        self._explain_task: Optional[asyncio.Task] = None
+
+    def attach(self, db: AsyncIOMotorDatabase, loop: asyncio.AbstractEventLoop):
+        """Give the recorder a database and loop to run explains on"""
+        self._db, self._loop = db, loop
+
+    def detach(self):
+        self._db, self._loop = None, None
+        self._explaining = False
+
+    # CommandListener interface; called on driver threads
+
+    def started(self, event):
+        if event.command_name in SHAPE_FIELDS:
+            self._started[event.request_id] = event.command
+
+    def succeeded(self, event):
+        command = self._started.pop(event.request_id, None)
+        if command is not None and event.duration_micros >= self.settings.threshold_ms * 1000:
+            self._record(event.command_name, event.database_name, command, event.duration_micros / 1000)
+
+    def failed(self, event):
+        self._started.pop(event.request_id, None)
+
+    def _record(self, command_name: str, database_name: str, command: Dict[str, Any], duration_ms: float):
+        collection = command.get(command_name)
+        shape = command_shape(command_name, command)
+        key = json.dumps([command_name, collection, shape], sort_keys=True, default=str)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.settings.top_n:
+                    fastest = min(self._entries, key=lambda k: self._entries[k]["max_ms"])
+                    if self._entries[fastest]["max_ms"] >= duration_ms:
+                        return
+                    del self._entries[fastest]
+                entry = self._entries[key] = {
+                    "command": command_name,
+                    "collection": collection,
+                    "shape": shape,
+                    "count": 0,
+                    "total_ms": 0.0,
+                    "max_ms": 0.0,
+                    "first_seen": now,
+                    "last_seen": now,
+                    "plan": None,
+                    "explained_at": None
+                }
+            entry["count"] += 1
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+            entry["last_seen"] = now
+
+            explain_due = (
+                self.settings.explain
+                and self._loop is not None
+                and not self._explaining
+                and (entry["explained_at"] is None or now - entry["explained_at"] >= self.settings.explain_interval_seconds)
+            )
+            if explain_due:
+                self._explaining = True
+                entry["explained_at"] = now
+
+        if explain_due:
+            explain_command = {k: v for k, v in command.items() if k not in _DRIVER_FIELDS}
+            # A fresh context, so the explain is not counted against the slow request's
+            # round-trip stats (Motor hands driver threads the caller's context)
+            self._loop.call_soon_threadsafe(
+                self._start_explain, key, explain_command, context=contextvars.Context()
+            )
+
+    def _start_explain(self, key: str, command: Dict[str, Any]):
+        if self._loop is None:
+            # Detached while the callback was queued
+            self._explaining = False
+            return
+        self._explain_task = self._loop.create_task(self._explain(key, command))
+
+    async def _explain(self, key: str, command: Dict[str, Any]):
+        try:
+            result = await self._db.command({"explain": command, "verbosity": "queryPlanner"})
+            planner = result.get("queryPlanner") or result.get("stages", [{}])[0].get("$cursor", {}).get("queryPlanner", {})
+            plan = redact_plan(planner.get("winningPlan"))
+            with self._lock:
+                if key in self._entries:
+                    self._entries[key]["plan"] = plan
+        except Exception as e:
+            logger.warning(f"Explain of slow query failed: {str(e)}")
+        finally:
+            self._explaining = False
+
+    def top(self) -> List[Dict[str, Any]]:
+        """Recorded shapes, slowest first"""
+        with self._lock:
+            entries = [dict(entry) for entry in self._entries.values()]
+        for entry in entries:
+            entry["avg_ms"] = round(entry["total_ms"] / entry["count"], 3)
+            entry["max_ms"] = round(entry["max_ms"], 3)
+            entry["total_ms"] = round(entry["total_ms"], 3)
+            for field in ("first_seen", "last_seen", "explained_at"):
+                if entry[field] is not None:
+                    entry[field] = datetime.utcfromtimestamp(entry[field])
+        return sorted(entries, key=lambda entry: entry["max_ms"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+def get_slow_query_recorder(request: Request) -> SlowQueryRecorder:
+    """Dependency returning the slow-query recorder of the app serving the request"""
+    return request.app.state.slow_query_recorder
\ No newline at end of file
@@ -0,0 +1,137 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Dict, Any, AsyncIterator, List
+import asyncio
+import logging
+import os
+from datetime import datetime
+
+from services.ndjson import encode_line
+from services.identity import EMAIL_COLLATION
+from services.scheduler import acquire_lease
+from services.user_cache import invalidate_user
+
+logger = logging.getLogger(__name__)
+
+SWEEP_JOB_NAME = "subscription_expiry_sweep"
+
+class ExpirySweepSettings:
+    """Subscription expiry sweeper configuration, read from the environment"""
+
+    def __init__(self):
+        self.interval_seconds = float(os.environ.get("SUBSCRIPTION_SWEEP_INTERVAL_SECONDS", 60))
+        self.batch_size = int(os.environ.get("SUBSCRIPTION_SWEEP_BATCH_SIZE", 1000))
+        self.batch_pause_seconds = float(os.environ.get("SUBSCRIPTION_SWEEP_PAUSE_SECONDS", 0.1))
+
+# User fields needed to describe a subscription
+STATUS_FIELDS = {
+    "_id": 0,
+    "email": 1,
+    "is_premium": 1,
+    "subscription_expires": 1,
+    "trial_used": 1,
+    "report_views_used": 1,
+    "report_views_limit": 1,
+    "votes_cast": 1,
+    "votes_limit": 1,
+    "forum_posts": 1,
+    "forum_posts_limit": 1
+}
+
+def build_subscription_status(user: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the subscription status payload for a user document.
+
+    `is_premium` is trusted as stored; the expiry sweeper downgrades users
+    whose subscription has run out.
+    """
+    is_premium = user.get("is_premium", False)
+    subscription_expires = user.get("subscription_expires")
+    trial_used = user.get("trial_used", False)
+
+    # Calculate days remaining
+    days_remaining = 0
+    if is_premium and subscription_expires:
+        days_remaining = max(0, (subscription_expires - datetime.utcnow()).days)
+
+    # Get current usage
+    usage_stats = {
+        "report_views": {
+            "used": user.get("report_views_used", 0),
+            "limit": "unlimited" if is_premium else user.get("report_views_limit", 3)
+        },
+        "votes": {
+            "used": user.get("votes_cast", 0),
+            "limit": "unlimited" if is_premium else user.get("votes_limit", 5)
+        },
+        "forum_posts": {
+            "used": user.get("forum_posts", 0),
+            "limit": "unlimited" if is_premium else user.get("forum_posts_limit", 1)
+        }
+    }
+
+    return {
+        "email": user["email"],
+        "is_premium": is_premium,
+        "subscription_expires": subscription_expires,
+        "days_remaining": days_remaining,
+        "trial_used": trial_used,
+        "trial_available": not trial_used and not is_premium,
+        "usage_stats": usage_stats,
+        "upgrade_recommended": not is_premium and (
+            user.get("report_views_used", 0) >= user.get("report_views_limit", 3) * 0.8 or
+            user.get("votes_cast", 0) >= user.get("votes_limit", 5) * 0.8
+        )
+    }
+
+async def stream_subscription_statuses(db: AsyncIOMotorDatabase, emails: List[str]) -> AsyncIterator[bytes]:
+    """Stream NDJSON subscription statuses for a batch of emails from one $in query"""
+    found = set()
+    async for user in db.users.find(
+        {"email": {"$in": emails}}, STATUS_FIELDS, batch_size=500, collation=EMAIL_COLLATION
+    ):
+        found.add(user["email"])
+        yield encode_line({"email": user["email"], "found": True, "status": build_subscription_status(user)})
+
+    for email in emails:
+        if email not in found:
+            yield encode_line({"email": email, "found": False})
+
+async def sweep_expired_subscriptions(db: AsyncIOMotorDatabase, settings: ExpirySweepSettings) -> int:
+    """Downgrade every premium user whose subscription has expired, in batches.
+
+    Each batch reads the next expired users off the partial
+    `subscription_expires` index and downgrades them with one update_many.
+    The expiry condition is repeated in the update so a subscription renewed
+    between the read and the write is left alone.
+    """
+    now = datetime.utcnow()
+    expired = {"is_premium": True, "subscription_expires": {"$lt": now}}
+    downgraded = 0
+
+    while True:
+        batch = await db.users.find(
+            expired, {"_id": 1, "email": 1}
+        ).sort("subscription_expires", 1).limit(settings.batch_size).to_list(settings.batch_size)
+        if not batch:
+            break
+
+        result = await db.users.update_many(
+            {"_id": {"$in": [user["_id"] for user in batch]}, **expired},
+            {"$set": {"is_premium": False, "subscription_expires": None}}
+        )
+        downgraded += result.modified_count
+        for user in batch:
+            invalidate_user(user["email"])
+
+        if len(batch) < settings.batch_size:
+            break
+        await asyncio.sleep(settings.batch_pause_seconds)
+
+    if downgraded:
+        logger.info(f"Expired {downgraded} premium subscriptions")
+    return downgraded
+
+async def run_expiry_sweep_job(db: AsyncIOMotorDatabase, settings: ExpirySweepSettings):
+    """Scheduled entry point - runs at most once per interval across all workers"""
+    if not await acquire_lease(db, SWEEP_JOB_NAME, settings.interval_seconds):
+        return
+    await sweep_expired_subscriptions(db, settings)
\ No newline at end of file
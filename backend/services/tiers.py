@@ -0,0 +1,143 @@
+from fastapi import Request
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from typing import Dict, Any, List, Optional
+import asyncio
+import hashlib
+import logging
+import os
+
+from services.responses import dumps
+
+logger = logging.getLogger(__name__)
+
+# Built-in catalogue, used unless TIER_CATALOGUE_SOURCE=mongo finds tiers in
+# the subscription_tiers collection. Tiers with a price can be ordered.
+DEFAULT_TIERS: List[Dict[str, Any]] = [
+    {
+        "id": "free",
+        "name": "Free",
+        "price": 0,
+        "duration_days": 30,
+        "features": [
+            "3 test report views per month",
+            "5 votes per month",
+            "1 forum post per month",
+            "Basic community access"
+        ],
+        "is_trial": False,
+        "popular": False,
+        "limitations": {
+            "report_views": 3,
+            "votes": 5,
+            "forum_posts": 1
+        }
+    },
+    {
+        "id": "premium",
+        "name": "Premium",
+        "price": 99,
+        "duration_days": 30,
+        "features": [
+            "Unlimited test report access",
+            "Detailed lab parameters",
+            "Unlimited voting",
+            "Priority voting on new tests",
+            "Unlimited forum participation",
+            "Expert Q&A sessions",
+            "Early access to new features"
+        ],
+        "is_trial": False,
+        "popular": True,
+        "trial_available": True,
+        "trial_days": 7
+    },
+    {
+        "id": "premium_annual",
+        "name": "Premium Annual",
+        "price": 999,
+        "duration_days": 365,
+        "features": [
+            "All Premium features",
+            "Two months free compared to monthly billing"
+        ],
+        "is_trial": False,
+        "popular": False
+    },
+    {
+        "id": "premium_trial",
+        "name": "Premium Trial",
+        "price": 0,
+        "duration_days": 7,
+        "features": [
+            "All Premium features",
+            "7-day free trial",
+            "Cancel anytime"
+        ],
+        "is_trial": True,
+        "popular": False
+    }
+]
+
+class TierCatalogue:
+    """Subscription tiers held in memory, with the tiers response pre-serialised.
+
+    Readers get whichever snapshot was current when they looked; `load`
+    swaps in a complete new snapshot, so a reload never exposes a partial one.
+    """
+
+    def __init__(self, source: str, load_timeout_seconds: float = 5):
+        self.source = source
+        # Startup waits this long for the source before serving the built-in tiers
+        self.load_timeout_seconds = load_timeout_seconds
+        self.tiers: List[Dict[str, Any]] = []
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        self.response_body = b""
+        self.etag = ""
+        self._apply(DEFAULT_TIERS)
+
+    def get(self, tier_id: str) -> Optional[Dict[str, Any]]:
+        return self.by_id.get(tier_id)
+
+    def purchasable(self, tier_id: str) -> Optional[Dict[str, Any]]:
+        """The tier if it can be bought, otherwise None"""
+        tier = self.by_id.get(tier_id)
+        return tier if tier and tier["price"] > 0 and not tier.get("is_trial") else None
+
+    def _apply(self, tiers: List[Dict[str, Any]]):
+        body = dumps({"success": True, "message": "Subscription tiers retrieved", "data": {"tiers": tiers}})
+        self.tiers, self.by_id = tiers, {tier["id"]: tier for tier in tiers}
+        self.response_body, self.etag = body, f'"{hashlib.sha1(body).hexdigest()}"'
+
+    async def load(self, db: AsyncIOMotorDatabase):
+        """(Re)load the catalogue, keeping the current one if the source fails"""
+        tiers = DEFAULT_TIERS
+        if self.source == "mongo":
+            try:
+                stored = await db.subscription_tiers.find(
+                    {"active": {"$ne": False}}, {"_id": 0, "active": 0}
+                ).sort("sort_order", 1).to_list(None)
+            except Exception as e:
+                logger.error(f"Error loading subscription tiers, keeping current catalogue: {str(e)}")
+                return
+            if stored:
+                tiers = [{k: v for k, v in tier.items() if k != "sort_order"} for tier in stored]
+            else:
+                logger.warning("No subscription tiers stored in Mongo, using built-in catalogue")
+
+        self._apply(tiers)
+        logger.info(f"Loaded {len(tiers)} subscription tiers ({self.source})")
+
+    def reload_in_background(self, db: AsyncIOMotorDatabase) -> asyncio.Task:
+        """Reload from a signal handler without blocking the event loop"""
+        return asyncio.create_task(self.load(db), name="tier_catalogue_reload")
+
+def create_tier_catalogue() -> TierCatalogue:
+    """A catalogue configured from the environment, one per app"""
+    return TierCatalogue(
+        source=os.environ.get("TIER_CATALOGUE_SOURCE", "builtin"),
+        load_timeout_seconds=float(os.environ.get("TIER_CATALOGUE_LOAD_TIMEOUT_SECONDS", 5))
+    )
+
+def get_tier_catalogue(request: Request) -> TierCatalogue:
+    """Dependency returning the tier catalogue of the app serving the request"""
+    return request.app.state.tier_catalogue
\ No newline at end of file
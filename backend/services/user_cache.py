@@ -0,0 +1,114 @@
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from collections import OrderedDict
+from contextvars import ContextVar, Token
+from typing import Dict, Any, Optional, Tuple
+import itertools
+import logging
+import os
+import time
+
+from services.identity import EMAIL_COLLATION
+
+logger = logging.getLogger(__name__)
+
+class UserCache:
+    """Size-bounded LRU of user documents keyed by email, with a short TTL.
+
+    The TTL bounds how long another worker's write can go unnoticed; writes
+    made by this process invalidate their entry immediately. Cached
+    documents are shared between requests and must not be mutated.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # Per-email invalidation stamps (email -> (stamp, monotonic time)), so a
+        # read that raced a write to the same user is not cached. Stamps older
+        # than the TTL are pruned; reads that took longer than that are never
+        # cached, so pruning cannot let a stale read through.
+        self._stamps: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._counter = itertools.count(1)
+
+    def generation(self, email: str) -> Tuple[int, float]:
+        """Token to take before reading `email` from Mongo and hand back to `put`"""
+        stamp = self._stamps.get(email)
+        return (stamp[0] if stamp else 0, time.monotonic())
+
+    def get(self, email: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(email)
+        if entry is None:
+            return None
+
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self._entries[email]
+            return None
+
+        self._entries.move_to_end(email)
+        return user
+
+    def put(self, email: str, user: Dict[str, Any], generation: Tuple[int, float]):
+        stamp, read_at = generation
+        if self.max_size <= 0 or time.monotonic() - read_at > self.ttl_seconds \
+                or stamp != self.generation(email)[0]:
+            return
+        self._entries[email] = (time.monotonic() + self.ttl_seconds, user)
+        self._entries.move_to_end(email)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, email: str):
+        now = time.monotonic()
+        self._stamps[email] = (next(self._counter), now)
+        self._stamps.move_to_end(email)
+        while self._stamps:
+            oldest = next(iter(self._stamps.values()))
+            if now - oldest[1] <= self.ttl_seconds:
+                break
+            self._stamps.popitem(last=False)
+        self._entries.pop(email, None)
+
+    def clear(self):
+        self._entries.clear()
+
+user_cache = UserCache(
+    max_size=int(os.environ.get("USER_CACHE_SIZE", 10000)),
+    ttl_seconds=float(os.environ.get("USER_CACHE_TTL_SECONDS", 5))
+)
+
+# Users already resolved during the current request (email -> document or None)
+_request_users: ContextVar[Optional[Dict[str, Optional[Dict[str, Any]]]]] = ContextVar(
+    "request_users", default=None
+)
+
+def begin_request_scope() -> Token:
+    """Start a fresh per-request user memo"""
+    return _request_users.set({})
+
+def end_request_scope(token: Token):
+    _request_users.reset(token)
+
+async def get_user(db: AsyncIOMotorDatabase, email: str) -> Optional[Dict[str, Any]]:
+    """Look up a user by email via the request memo, then the LRU, then Mongo"""
+    memo = _request_users.get()
+    if memo is not None and email in memo:
+        return memo[email]
+
+    user = user_cache.get(email)
+    if user is None:
+        generation = user_cache.generation(email)
+        user = await db.users.find_one({"email": email}, collation=EMAIL_COLLATION)
+        if user is not None:
+            user_cache.put(email, user, generation)
+
+    if memo is not None:
+        memo[email] = user
+    return user
+
+def invalidate_user(email: str):
+    """Drop a user from every cache layer; call after any write to the user"""
+    user_cache.invalidate(email)
+    memo = _request_users.get()
+    if memo is not None:
+        memo.pop(email, None)
\ No newline at end of file
@@ -0,0 +1 @@
+# Test helpers package
\ No newline at end of file
@@ -0,0 +1,57 @@
+"""Assertions on per-request Mongo round trips, for use in endpoint tests.
+
+The app must run with DEBUG=true so DbBudgetMiddleware reports its counters
+as response headers. Any HTTP client works (httpx, requests, TestClient):
+
+    response = client.get(f"/api/v2/users/dashboard/{email}")
+    assert_db_budget(response)
+
+    # Fixed-shape endpoints should all declare a budget; the NDJSON batch
+    # endpoints scale with their input and are left undeclared
+    assert set(undeclared_routes(app)) <= {
+        ("POST", "/api/v2/users/profiles/batch"),
+        ("POST", "/api/v2/subscriptions/status/batch"),
+    }
+"""
+from typing import Dict, List, Optional, Tuple
+
+from services.db_budget import ROUND_TRIPS_HEADER, BUDGET_HEADER, route_budget
+
+def round_trips(response) -> int:
+    """Mongo round trips the server reported for a response"""
+    value = response.headers.get(ROUND_TRIPS_HEADER)
+    if value is None:
+        raise AssertionError(f"Response has no {ROUND_TRIPS_HEADER} header - run the app with DEBUG=true")
+    return int(value)
+
+def assert_db_budget(response, max_round_trips: Optional[int] = None):
+    """Fail if a response used more round trips than allowed.
+
+    The limit defaults to the budget declared on the endpoint with @db_budget.
+    """
+    used = round_trips(response)
+    if max_round_trips is None:
+        declared = response.headers.get(BUDGET_HEADER)
+        if declared is None:
+            raise AssertionError("Endpoint declares no round-trip budget and none was given")
+        max_round_trips = int(declared)
+
+    if used > max_round_trips:
+        request = getattr(response, "request", None)
+        target = f"{request.method} {request.url}" if request is not None else "request"
+        raise AssertionError(f"{target} issued {used} Mongo round trips, budget is {max_round_trips}")
+
+def route_budgets(app) -> Dict[Tuple[str, str], Optional[int]]:
+    """Declared budget of every API route, keyed by (method, path template)"""
+    budgets = {}
+    for route in app.routes:
+        for method in sorted(getattr(route, "methods", None) or ()):
+            budgets[(method, route.path_format)] = route_budget(route)
+    return budgets
+
+def undeclared_routes(app, prefix: str = "/api/") -> List[Tuple[str, str]]:
+    """API routes under `prefix` without a declared budget"""
+    return [
+        key for key, budget in route_budgets(app).items()
+        if budget is None and key[1].startswith(prefix)
+    ]
\ No newline at end of file
@@ -0,0 +1,104 @@
+"""Every API route declares a Mongo round-trip budget and stays within it.
+
+Run from the backend directory (needs pytest and httpx, and a MongoDB on
+MONGO_URL for the round-trip test; it is skipped when none answers):
+
+    python -m pytest tests
+
+Each endpoint case of the benchmark suite (benchmarks/endpoints.py) is sent
+once through the app, with its lifespan and DbBudgetMiddleware, against a
+small generated dataset in the TEST_DB_NAME database, which is dropped
+afterwards.
+"""
+import asyncio
+import os
+
+import pytest
+
+# Round-trip headers are only sent in debug mode; read at import time
+os.environ["DEBUG"] = "true"
+os.environ["DB_NAME"] = os.environ.get("TEST_DB_NAME", "choosepure_test_db_budget")
+os.environ.setdefault("ADMIN_TOKEN", "test-admin-token")
+
+httpx = pytest.importorskip("httpx")
+
+from testing.db_budget import BUDGET_HEADER, round_trips, undeclared_routes
+
+# Routes whose round trips scale with their input or data, so no fixed budget applies
+UNBUDGETED_ROUTES = {
+    ("POST", "/api/v2/users/profiles/batch"),
+    ("POST", "/api/v2/subscriptions/status/batch"),
+    # Known N+1: one count per category
+    ("GET", "/api/v2/samples/categories"),
+}
+
+def _mongo_available() -> bool:
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+    client = MongoClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"), serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+    finally:
+        client.close()
+
+async def _drive_cases():
+    """(case, response) for one request per benchmark case"""
+    import server
+    from benchmarks.endpoints import BENCH_DOMAIN, CASES, BenchContext
+    from services.datagen import DataGenSpec, generate_dataset
+
+    app = server.app
+    async with server.lifespan(app):
+        db = app.state.db
+        users = 200
+        spec = DataGenSpec(
+            users=users,
+            options=3,
+            reports=10,
+            domain=BENCH_DOMAIN,
+            voters_per_option=20,
+            pending_orders=0
+        )
+        try:
+            await generate_dataset(db, spec, drop=True)
+
+            context = BenchContext(users)
+            option = await db.voting_options.find_one({"status": "voting"}, {"_id": 1})
+            report = await db.sample_reports.find_one({}, {"_id": 1})
+            context.option_id = str(option["_id"])
+            context.report_id = str(report["_id"])
+
+            responses = []
+            transport = httpx.ASGITransport(app=app)
+            headers = {"X-Admin-Token": os.environ["ADMIN_TOKEN"]}
+            async with httpx.AsyncClient(transport=transport, base_url="http://test", headers=headers) as client:
+                for i, (name, build) in enumerate(CASES.items()):
+                    method, path, body = await build(client, context, i)
+                    responses.append((name, await client.request(method, path, json=body)))
+            return responses
+        finally:
+            await db.client.drop_database(db.name)
+
+def test_api_routes_declare_budgets():
+    import server
+
+    assert set(undeclared_routes(server.app)) <= UNBUDGETED_ROUTES
+
+def test_routes_stay_within_budget():
+    if not _mongo_available():
+        pytest.skip("No MongoDB on MONGO_URL")
+
+    failed, over_budget = [], []
+    for name, response in asyncio.run(_drive_cases()):
+        if response.status_code >= 400:
+            failed.append(f"{name}: {response.status_code}")
+            continue
+        budget = response.headers.get(BUDGET_HEADER)
+        if budget is not None and round_trips(response) > int(budget):
+            over_budget.append(f"{name}: {round_trips(response)} round trips, budget {budget}")
+
+    assert not failed, "Requests failed: " + "; ".join(failed)
+    assert not over_budget, "Over budget: " + "; ".join(over_budget)
\ No newline at end of file
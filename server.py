@@ -19,5 +19,5 @@ if __name__ == "__main__":
     # Get port from environment variable (for production deployment)
     port = int(os.environ.get("PORT", 8001))
     
-    # Run the server
-    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
+    # Run the server; log_config=None sends uvicorn's logs through the app's logging queue
+    uvicorn.run(app, host="0.0.0.0", port=port, log_config=None)
\ No newline at end of file